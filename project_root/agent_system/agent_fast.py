@@ -0,0 +1,55 @@
+import json
+import re
+
+from langchain_core.messages import SystemMessage, HumanMessage
+
+from .sections import build_agent_context
+from .llm_client import call_model, create_chat_model
+
+
+class FastAgent:
+    """Агент быстрого режима: рубрикация, ключевые слова и резюме одним вызовом без критиков."""
+
+    def __init__(self, auth_key: str):
+        self.auth_key = auth_key
+        self.model = create_chat_model(auth_key)
+
+    @staticmethod
+    def _parse(response: str) -> dict:
+        """Достаёт JSON из ответа модели (в т.ч. из блока ```json)."""
+        match = re.search(r"\{.*\}", response, re.DOTALL)
+        if not match:
+            raise ValueError(f"Модель вернула ответ без JSON: {response[:200]}")
+        return json.loads(match.group(0))
+
+    @staticmethod
+    def _as_text(value) -> str:
+        """Списки из JSON превращаем в текст по строке на элемент."""
+        if isinstance(value, list):
+            return "\n".join(str(item) for item in value)
+        return str(value or "")
+
+    def run(self, state: dict) -> dict:
+
+        article_text = build_agent_context(state, "fast")
+        prompt = """Ты — научный редактор и библиограф. Проанализируй научную статью и за один ответ подготовь:
+1) "rubric" — рубрикацию статьи: иерархию кратких терминологичных заголовков (по строке на заголовок, с нумерацией уровней);
+2) "keywords" — список из 10-15 ключевых слов и фраз в именительном падеже, каждый элемент в формате "термин | прямое | 0.95" (тип: прямое/косвенное, оценка релевантности от 0.0 до 1.0);
+3) "summary" — резюме на 150-300 слов: проблема, методология, ключевые результаты, ограничения. Не выдумывай факты.
+
+Верни ТОЛЬКО JSON-объект без пояснений:
+{"rubric": "...", "keywords": ["...", "..."], "summary": "..."}"""
+
+        messages = [
+            SystemMessage(content=prompt),
+            HumanMessage(content=article_text)
+        ]
+
+        result = self._parse(call_model(self.model, messages, state, "fast"))
+
+        return {
+            "rubric_result_rubricator": self._as_text(result.get("rubric")),
+            "rubric_result_keyword": self._as_text(result.get("keywords")),
+            "rubric_result_summariser": self._as_text(result.get("summary")),
+            "status": ["completed"]
+        }
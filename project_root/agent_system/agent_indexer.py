@@ -1,6 +1,14 @@
 import json
 from datetime import datetime
 
+# Ветка графа -> поле в индексе
+BRANCH_FIELDS = {
+    "rubricator": "rubric",
+    "keyword": "keywords",
+    "normal": "normalized",
+    "summariser": "summary",
+}
+
 
 class IndexerAgent:
     def __init__(self, auth_key: str = None):
@@ -17,6 +25,11 @@ class IndexerAgent:
             "normalized": state.get("rubric_result_normal", ""),
             "timestamp": datetime.now().isoformat()
         }
+        # Незапрошенные ветки не выполнялись и остаются пустыми; недостающими
+        # считаются только запрошенные ветки без результата (например, не успевшие к SLA)
+        requested = state.get("outputs") or list(BRANCH_FIELDS)
+        data["outputs"] = requested
+        data["missing"] = [branch for branch in requested if not data[BRANCH_FIELDS[branch]]]
 
         print(f"✅ [Indexer] Готово")
         return {"indexed_data": json.dumps(data, ensure_ascii=False), "status": ["indexed"]}
@@ -1,36 +1,50 @@
-from logging import critical
+import time
 
-from langchain_gigachat.chat_models import GigaChat
 from langchain_core.messages import SystemMessage, HumanMessage
 
+from .revision import use_delta, full_revision_prompt, delta_revision_messages, revision_record
+from .llm_client import call_model, create_chat_model
+
 
 class NormalAgent:
     """Агент для нормализации научной статьи."""
 
     def __init__(self, auth_key: str):
         self.auth_key = auth_key
-        self.model = GigaChat(credentials=auth_key, verify_ssl_certs=False)
+        self.model = create_chat_model(auth_key)
 
     def run(self, state: dict) -> dict:
 
         article_text = state.get("article_text", "")
-        critique = state.get("critique_normal", "")
+        critique = state.get("critique_nor", "")
         prompt = open('./agent_system/prompt_normal.txt', 'r', encoding='utf-8').read()
         revision_count = state.get("revision_count_nor", 0)
 
-        if critique:
-            prompt += f"\n\n⚠️ ВНИМАНИЕ! Предыдущая попытка была отклонена:\n{critique}\n\nУчти эти замечания и исправь ошибки!"
+        draft = state.get("rubric_result_normal", "")
+        delta = use_delta(state, draft, critique)
+
+        if delta:
+            # Ревизия дельтой: черновик + критика + фрагмент статьи вместо всего текста
+            messages = delta_revision_messages(prompt, draft, critique, state)
+        else:
+            if critique:
+                prompt = full_revision_prompt(prompt, critique)
 
-        messages = [
-            SystemMessage(content=prompt),
-            HumanMessage(content=article_text)
-        ]
+            messages = [
+                SystemMessage(content=prompt),
+                HumanMessage(content=article_text)
+            ]
 
-        result = self.model.invoke(messages).content
+        started = time.time()
+        result = call_model(self.model, messages, state, "normal", stream=True)
 
-        return {
+        update = {
             "rubric_result_normal": result,
-            "critique_normal": "",
+            "critique_nor": "",
             "revision_count_nor": revision_count + 1,
             "status": ["completed"]
         }
+        if critique:
+            update["revision_log"] = [revision_record("normal", delta, messages, started)]
+
+        return update
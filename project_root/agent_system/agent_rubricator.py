@@ -1,38 +1,51 @@
-from langchain_gigachat.chat_models import GigaChat
+import time
+
 from langchain_core.messages import SystemMessage, HumanMessage
 
+from .sections import build_agent_context
+from .revision import use_delta, full_revision_prompt, delta_revision_messages, revision_record
+from .llm_client import call_model, create_chat_model
+
 
 class RubricatorAgent:
     """Агент для создания рубрикации научной статьи."""
 
     def __init__(self, auth_key: str):
         self.auth_key = auth_key
-        self.model = GigaChat(credentials=auth_key, verify_ssl_certs=False)
+        self.model = create_chat_model(auth_key)
 
     def run(self, state: dict) -> dict:
 
-        article_text = state.get("article_text", "")
+        article_text = build_agent_context(state, "rubricator")
         prompt = f"Ты — редактор-верстальщик и библиограф; задача: построить рубрикацию научной статьи как систему взаимосвязанных и соподчинённых заголовков, где заголовки старших уровней логически включают младшие, а одноуровневые заголовки равнозначны и не пересекаются; правила: 1) один признак деления на каждом уровне (не смешивай основания деления внутри одного уровня); 2) полнота: сумма подразделов покрывает содержание родительского раздела, «пустых» или дублирующих пунктов нет; 3) одноуровневые разделы не пересекаются и не включают друг друга; 4)заголовки краткие, терминологичные, без лишних слов"
         critique = state.get("critique", "")  # Получаем критику
         revision_count = state.get("revision_count", 0)
 
+        draft = state.get("rubric_result_rubricator", "")
+        delta = use_delta(state, draft, critique)
 
-        # Если есть критика, добавляем её в промпт
-        if critique:
-            prompt += f"\n\n⚠️ ВНИМАНИЕ! Предыдущая попытка была отклонена:\n{critique}\n\nУчти эти замечания и исправь ошибки!"
-
-        messages = [
-        SystemMessage(content=prompt),
-        HumanMessage(content=article_text)
-        ]
+        if delta:
+            # Ревизия дельтой: черновик + критика + фрагмент статьи вместо всего текста
+            messages = delta_revision_messages(prompt, draft, critique, state)
+        else:
+            if critique:
+                prompt = full_revision_prompt(prompt, critique)
 
+            messages = [
+                SystemMessage(content=prompt),
+                HumanMessage(content=article_text)
+            ]
 
-        result = self.model.invoke(messages).content
+        started = time.time()
+        result = call_model(self.model, messages, state, "rubricator", stream=True)
 
-
-        return {
+        update = {
             "rubric_result_rubricator": result,
             "critique": "",
             "revision_count": revision_count + 1,
             "status": ["completed"]
         }
+        if critique:
+            update["revision_log"] = [revision_record("rubricator", delta, messages, started)]
+
+        return update
@@ -1,34 +1,51 @@
-from langchain_gigachat.chat_models import GigaChat
+import time
+
 from langchain_core.messages import SystemMessage, HumanMessage
 
+from .sections import build_agent_context
+from .revision import use_delta, full_revision_prompt, delta_revision_messages, revision_record
+from .llm_client import call_model, create_chat_model
+
 
 class SummariserAgent:
     """Агент для проверки корректности отевта."""
 
     def __init__(self, auth_key: str):
         self.auth_key = auth_key
-        self.model = GigaChat(credentials=auth_key, verify_ssl_certs=False)
+        self.model = create_chat_model(auth_key)
 
     def run(self, state: dict) -> dict:
 
-        article_text = state.get("article_text", "")
+        article_text = build_agent_context(state, "summariser")
         prompt = open('./agent_system/prompt_summariser.txt', 'r', encoding='utf-8').read()
         critique = state.get("critique_sum", "")
         revision_count = state.get("revision_count_sum", 0)
 
-        if critique:
-            prompt += f"\n\n⚠️ ВНИМАНИЕ! Предыдущая попытка была отклонена:\n{critique}\n\nУчти эти замечания и исправь ошибки!"
+        draft = state.get("rubric_result_summariser", "")
+        delta = use_delta(state, draft, critique)
 
-        messages = [
-            SystemMessage(content=prompt),
-            HumanMessage(content=article_text)
-        ]
+        if delta:
+            # Ревизия дельтой: черновик + критика + фрагмент статьи вместо всего текста
+            messages = delta_revision_messages(prompt, draft, critique, state)
+        else:
+            if critique:
+                prompt = full_revision_prompt(prompt, critique)
 
-        result = self.model.invoke(messages).content
+            messages = [
+                SystemMessage(content=prompt),
+                HumanMessage(content=article_text)
+            ]
 
-        return {
+        started = time.time()
+        result = call_model(self.model, messages, state, "summariser", stream=True)
+
+        update = {
             "rubric_result_summariser": result,
             "critique_sum": "",
             "revision_count_sum": revision_count + 1,
             "status": ["completed"]
         }
+        if critique:
+            update["revision_log"] = [revision_record("summariser", delta, messages, started)]
+
+        return update
@@ -0,0 +1,94 @@
+"""
+Best-of-N: генератор выдаёт несколько кандидатов параллельно вместо
+последовательного цикла «генерация → критика → переделка».
+
+Кандидаты получаются с разной температурой, лучший выбирается дешёвым
+скорером (число нарушений по пре-критикам, см. precritics.py), и только
+он уходит к LLM-критику. Ревизия нужна, лишь если отклонён и лучший.
+
+Скорер различает кандидатов только по жёстким правилам; у рубрикации
+и нормализации их мало, и кандидаты обычно равны (0 нарушений). При
+равенстве выбирается первый кандидат — с первой температурой из
+CANDIDATE_TEMPERATURES, по умолчанию самой низкой.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .precritics import find_problems
+from .sections import build_agent_context, CHARS_PER_TOKEN
+from .timings import in_node_context
+
+# Число кандидатов на первый проход генератора (1 — режим выключен)
+CANDIDATES = int(os.getenv("CANDIDATES", 1))
+# Верхняя граница числа кандидатов из запроса: каждый — отдельный поток и вызов модели
+MAX_CANDIDATES = int(os.getenv("MAX_CANDIDATES", 5))
+CANDIDATE_TEMPERATURES = [
+    float(t) for t in os.getenv("CANDIDATE_TEMPERATURES", "0.3,0.7,1.0").split(",")
+]
+
+
+def score_candidate(branch: str, state: dict, update: dict) -> int:
+    """Число нарушений жёстких правил (меньше — лучше; равные — по порядку кандидатов)."""
+    return len(find_problems(branch, {**state, **update}))
+
+
+def generate_candidates(run, agent, branch: str, state: dict, n: int, result_key: str) -> dict:
+    """
+    Запускает агента n раз параллельно и возвращает обновление лучшего кандидата.
+
+    Args:
+        run: Функция запуска агента (saferun)
+        agent: Генератор ветки
+        branch: Название ветки (для скорера и журнала)
+        state: Состояние графа
+        n: Число кандидатов
+        result_key: Ключ результата ветки в состоянии
+
+    Raises:
+        Exception: Ошибка первого кандидата, если не удался ни один
+    """
+    temperatures = [CANDIDATE_TEMPERATURES[i % len(CANDIDATE_TEMPERATURES)] for i in range(n)]
+    started = time.time()
+
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        futures = [pool.submit(in_node_context(run), agent.run, {**state, "temperature": t}) for t in temperatures]
+    candidates = [(t, f.result()) for t, f in zip(temperatures, futures) if f.exception() is None]
+    if not candidates:
+        raise futures[0].exception()
+
+    scores = [score_candidate(branch, state, update) for _, update in candidates]
+    chosen = scores.index(min(scores))
+    temperature, update = candidates[chosen]
+
+    # Лишние вызовы: вход каждого кандидата и выход отброшенных
+    input_tokens = len(build_agent_context(state, branch)) // CHARS_PER_TOKEN
+    discarded_output = sum(len(u.get(result_key, "")) for i, (_, u) in enumerate(candidates) if i != chosen)
+    extra_tokens = (len(candidates) - 1) * input_tokens + discarded_output // CHARS_PER_TOKEN
+
+    print(f"🎯 [{branch}] Кандидатов: {len(candidates)}, нарушений: {scores}, выбран №{chosen + 1} (t={temperature})")
+
+    return {
+        **update,
+        "status": update.get("status", []) + ["candidates_generated"],
+        "candidate_log": [{
+            "agent": branch,
+            "candidates": len(candidates),
+            "scores": scores,
+            "chosen_temperature": temperature,
+            "extra_tokens": extra_tokens,
+            "latency": time.time() - started,
+        }]
+    }
+
+
+def candidate_summary(state: dict) -> dict:
+    """Сводка best-of-N: число вызовов, лишние токены и время."""
+    log = state.get("candidate_log") or []
+    return {
+        "branches": len(log),
+        "calls": sum(record["candidates"] for record in log),
+        "extra_tokens": sum(record["extra_tokens"] for record in log),
+        "latency": sum(record["latency"] for record in log),
+    }
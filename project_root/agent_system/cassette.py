@@ -0,0 +1,190 @@
+"""
+Кассеты вызовов модели: запись и воспроизведение для детерминированных бенчмарков.
+
+В режиме record каждый вызов (агент, хеш запроса, начало каждого сообщения
+запроса, ответ, токены, задержка) пишется в кассету — JSONL, сжатый gzip.
+В режиме replay ответы берутся из кассеты по хешу запроса без обращения
+к GigaChat, с исходной или нулевой задержкой, так что две версии кода
+сравниваются на одной и той же нагрузке. При промахе CassetteMiss
+показывает, чем запрос отличается от ближайшего записанного.
+
+Одинаковые запросы (например, повторный вызов критика) воспроизводятся
+в том порядке, в котором были записаны.
+"""
+
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+CASSETTE_MODES = ("off", "record", "replay")
+LLM_CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "off")
+LLM_CASSETTE_PATH = os.getenv("LLM_CASSETTE_PATH", "llm_cassette.jsonl.gz")
+# Задержка при воспроизведении: original — как при записи, zero — без задержки
+LLM_REPLAY_LATENCY = os.getenv("LLM_REPLAY_LATENCY", "original")
+# Сколько символов каждого сообщения запроса хранить для разбора промахов
+REQUEST_PREVIEW_CHARS = 200
+
+
+class CassetteMiss(KeyError):
+    """В кассете нет ответа на такой запрос."""
+
+
+def request_key(messages, agent: str = "", temperature: float = None) -> str:
+    """Хеш запроса: агент, температура и сообщения (тип и текст)."""
+    payload = json.dumps(
+        [agent, temperature, [(getattr(m, "type", ""), m.content) for m in messages]],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def request_preview(messages) -> list:
+    """Сообщения запроса для кассеты: тип, длина и начало текста."""
+    return [
+        {"type": getattr(m, "type", ""), "chars": len(m.content), "head": m.content[:REQUEST_PREVIEW_CHARS]}
+        for m in messages
+    ]
+
+
+class Cassette:
+    """Кассета вызовов модели в режиме записи или воспроизведения."""
+
+    def __init__(self, path: str, mode: str, latency: str = LLM_REPLAY_LATENCY):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Неизвестный режим кассеты: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self._records = []
+        self._replay = defaultdict(list)
+        self._positions = defaultdict(int)
+        self._lock = threading.Lock()
+
+        if mode == "replay":
+            self._load()
+
+    def _load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self._replay[record["key"]].append(record)
+        print(f"📼 Кассета {self.path}: {sum(len(r) for r in self._replay.values())} ответов для воспроизведения")
+
+    def record(self, key: str, agent: str, response: str, latency: float, messages,
+               usage: dict = None, temperature: float = None):
+        """Запоминает вызов (записывается в файл при save())."""
+        request = request_preview(messages)
+        with self._lock:
+            self._records.append({
+                "key": key,
+                "agent": agent,
+                "temperature": temperature,
+                "request": request,
+                "response": response,
+                "usage": usage,
+                "latency": round(latency, 4),
+                "request_chars": sum(m["chars"] for m in request),
+            })
+
+    def replay(self, key: str, agent: str = "", messages=None) -> tuple:
+        """
+        Возвращает записанный ответ и usage (или None) на запрос, выдерживая задержку записи.
+
+        Raises:
+            CassetteMiss: Если запрос не записан (в сообщении — чем он отличается
+                от ближайшего записанного запроса того же агента)
+        """
+        with self._lock:
+            records = self._replay.get(key)
+            if not records:
+                raise CassetteMiss(
+                    f"В кассете {self.path} нет ответа на запрос агента {agent or '?'}: "
+                    f"{self._describe_miss(agent, messages)}"
+                )
+            # Повторы одного запроса идут по порядку, последний ответ повторяется
+            position = self._positions[key]
+            self._positions[key] = position + 1
+            record = records[min(position, len(records) - 1)]
+
+        if self.latency == "original":
+            time.sleep(record["latency"])
+        return record["response"], record.get("usage")
+
+    def _describe_miss(self, agent: str, messages=None) -> str:
+        """Чем запрос отличается от ближайшего записанного запроса того же агента."""
+        recorded = [records[0] for records in self._replay.values() if records[0]["agent"] == agent]
+        if not recorded:
+            return "этот агент в кассете не записан"
+        if messages is None or not any(r.get("request") for r in recorded):
+            return f"записано других запросов агента: {len(recorded)}"
+
+        current = request_preview(messages)
+
+        def matching(record):
+            count = 0
+            for old, new in zip(record.get("request") or [], current):
+                if old != new:
+                    break
+                count += 1
+            return count
+
+        closest = max(recorded, key=matching)
+        position = matching(closest)
+        old_messages = closest.get("request") or []
+        if position >= min(len(old_messages), len(current)):
+            return (f"ближайший записанный запрос (из {len(recorded)}) совпадает по началу сообщений, "
+                    f"но было {len(old_messages)} сообщений, сейчас {len(current)}; "
+                    f"различие дальше первых {REQUEST_PREVIEW_CHARS} символов или в температуре")
+        old, new = old_messages[position], current[position]
+        return (f"ближайший записанный запрос (из {len(recorded)}) расходится в сообщении №{position + 1}: "
+                f"было {old['chars']} символов «{old['head'][:80]}», "
+                f"сейчас {new['chars']} символов «{new['head'][:80]}»")
+
+    def save(self):
+        """Дописывает накопленные вызовы в файл кассеты."""
+        with self._lock:
+            records, self._records = self._records, []
+        if not records:
+            return
+        with gzip.open(self.path, "at", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        print(f"📼 В кассету {self.path} записано вызовов: {len(records)}")
+
+
+_cassette = None
+
+
+def configure_cassette(mode: str = LLM_CASSETTE_MODE, path: str = LLM_CASSETTE_PATH,
+                       latency: str = LLM_REPLAY_LATENCY):
+    """Включает кассету для всех вызовов модели в процессе ("off" — выключает)."""
+    global _cassette
+    if _cassette is not None and _cassette.mode == "record":
+        _cassette.save()
+    if mode == "record" and os.path.exists(path):
+        # Новая запись начинается с чистой кассеты
+        os.remove(path)
+    _cassette = Cassette(path, mode, latency) if mode != "off" else None
+    return _cassette
+
+
+def active_cassette():
+    """Текущая кассета или None."""
+    return _cassette
+
+
+def _save_on_exit():
+    if _cassette is not None and _cassette.mode == "record":
+        _cassette.save()
+
+
+atexit.register(_save_on_exit)
+
+if LLM_CASSETTE_MODE != "off":
+    configure_cassette()
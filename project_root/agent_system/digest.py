@@ -0,0 +1,142 @@
+"""
+Экстрактивный дайджест статьи для критиков (TextRank по предложениям).
+
+Считается один раз на статью без вызовов LLM и покрывает весь текст,
+а не только его начало.
+"""
+
+import math
+import os
+import re
+from collections import defaultdict
+from typing import List
+
+from .sections import CHARS_PER_TOKEN
+
+DIGEST_TOKEN_BUDGET = int(os.getenv("DIGEST_TOKEN_BUDGET", 1000))
+DAMPING = 0.85
+MAX_ITERATIONS = 50
+TOLERANCE = 1e-4
+# Обрезка слов до основы: дешёвая замена стеммингу для русской морфологии
+STEM_LENGTH = 6
+# Сколько символов начала статьи получают критики, если дайджеста нет в состоянии
+EXCERPT_FALLBACK_CHARS = 5000
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+(?=[«\"(\[]?[A-ZА-ЯЁ0-9])|\n\s*\n")
+_WORD = re.compile(r"[a-zа-яё0-9]+", re.IGNORECASE)
+
+STOPWORDS = {
+    "и", "в", "во", "не", "что", "он", "на", "я", "с", "со", "как", "а", "то", "все", "она", "так",
+    "его", "но", "да", "ты", "к", "у", "же", "вы", "за", "бы", "по", "только", "ее", "её", "мне",
+    "было", "вот", "от", "меня", "еще", "ещё", "нет", "о", "из", "ему", "для", "при", "это", "этот",
+    "эта", "эти", "который", "которые", "которая", "также", "или", "их", "был", "была", "были",
+    "быть", "может", "чем", "где", "когда", "между", "после", "над", "под", "без", "через",
+    "the", "a", "an", "of", "and", "or", "to", "in", "on", "for", "with", "is", "are", "was",
+    "were", "be", "by", "as", "at", "that", "this", "it", "from", "we", "our",
+}
+
+
+def split_sentences(text: str) -> List[str]:
+    """Делит текст на предложения (и абзацы) без пустых фрагментов."""
+    parts = _SENTENCE_END.split(text)
+    return [" ".join(part.split()) for part in parts if part and part.strip()]
+
+
+def _terms(sentence: str) -> set:
+    return {
+        word[:STEM_LENGTH]
+        for word in _WORD.findall(sentence.lower())
+        if len(word) > 2 and word not in STOPWORDS
+    }
+
+
+def rank_sentences(sentences: List[str]) -> List[float]:
+    """
+    TextRank: вес предложения по сходству с остальными.
+
+    Сходство — число общих основ, нормированное на log длин предложений.
+    Пары считаются только через общие основы (инвертированный индекс).
+    """
+    terms = [_terms(s) for s in sentences]
+    n = len(sentences)
+
+    index = defaultdict(list)
+    for i, sentence_terms in enumerate(terms):
+        for term in sentence_terms:
+            index[term].append(i)
+
+    overlaps = defaultdict(int)
+    for postings in index.values():
+        for a in range(len(postings)):
+            for b in range(a + 1, len(postings)):
+                overlaps[(postings[a], postings[b])] += 1
+
+    edges = defaultdict(dict)
+    for (i, j), common in overlaps.items():
+        norm = math.log(len(terms[i]) + 1) + math.log(len(terms[j]) + 1)
+        if norm > 0:
+            weight = common / norm
+            edges[i][j] = weight
+            edges[j][i] = weight
+
+    out_weight = [sum(edges[i].values()) for i in range(n)]
+    scores = [1.0] * n
+    for _ in range(MAX_ITERATIONS):
+        new_scores = [
+            (1 - DAMPING) + DAMPING * sum(
+                scores[j] * weight / out_weight[j] for j, weight in edges[i].items() if out_weight[j]
+            )
+            for i in range(n)
+        ]
+        converged = max(abs(a - b) for a, b in zip(scores, new_scores)) < TOLERANCE
+        scores = new_scores
+        if converged:
+            break
+
+    return scores
+
+
+def build_digest(text: str, token_budget: int = DIGEST_TOKEN_BUDGET) -> str:
+    """
+    Строит экстрактивный дайджест в пределах бюджета токенов.
+
+    Первое предложение (обычно заголовок) включается всегда (обрезанное
+    до бюджета, если длиннее него), остальные выбираются по убыванию веса TextRank и выводятся в исходном порядке.
+
+    Args:
+        text: Текст статьи
+        token_budget: Приблизительный лимит токенов дайджеста
+
+    Returns:
+        Дайджест; короткие тексты возвращаются целиком
+    """
+    char_budget = token_budget * CHARS_PER_TOKEN
+    if len(text) <= char_budget:
+        return text.strip()
+
+    sentences = split_sentences(text)
+    if not sentences:
+        return ""
+
+    sentences[0] = sentences[0][:char_budget]
+    scores = rank_sentences(sentences)
+    ranked = sorted(range(1, len(sentences)), key=lambda i: scores[i], reverse=True)
+
+    selected = [0]
+    used = len(sentences[0])
+    for i in ranked:
+        length = len(sentences[i]) + 1
+        if used + length > char_budget:
+            continue
+        selected.append(i)
+        used += length
+
+    return "\n".join(sentences[i] for i in sorted(selected))
+
+
+def article_excerpt(state: dict) -> str:
+    """
+    Текст статьи для критиков: дайджест из состояния графа, а если его
+    нет — начало статьи (EXCERPT_FALLBACK_CHARS символов).
+    """
+    return state.get("article_digest") or state.get("article_text", "")[:EXCERPT_FALLBACK_CHARS]
@@ -1,10 +1,16 @@
 # graph_orchestrator.py
 
-from typing import TypedDict, Annotated, List, Literal
+from typing import TypedDict, Annotated, List, Literal, get_type_hints
 from langgraph.graph import StateGraph, START, END
 import time
 import operator
+import math
+import json
+from concurrent.futures import ThreadPoolExecutor
 import os
+import sqlite3
+import threading
+import uuid
 from dotenv import load_dotenv
 
 # Исправленные импорты - относительные пути
@@ -17,70 +23,269 @@ from .rubricator_critic import CriticAgent
 from .keyword_critic import CriticKeywordAgent
 from .summariser_critic import CriticSumAgent
 from .normal_critic import CriticNormalAgent
+from .joint_critic import JointCriticAgent
+from .agent_fast import FastAgent
 from .agent_indexer import IndexerAgent
+from .precritics import precheck, PRECRITIC_POLICY, PRECRITIC_POLICIES
+from .digest import build_digest
+from .sections import segment_article
+from .revision import REVISION_MODES
+from .candidates import CANDIDATES, MAX_CANDIDATES, generate_candidates
+from .jobs import record_partial, record_review
+from .timings import timed_node, note_attempt, in_node_context
+from .metrics import SAFERUN_RETRIES, SAFERUN_SLEEP_SECONDS
+from .tracing import current_traceparent, start_span
+from .resilience import (ARTICLE_DEADLINE, CircuitOpenError, DeadlineExceeded, is_rate_limit,
+                         record, remaining_time)
 
 load_dotenv()
 
+# Файл SQLite для чекпоинтов графа (по одному треду на задачу/job_id)
+CHECKPOINT_DB = os.getenv("CHECKPOINT_DB", "checkpoints.db")
+# Повторы узла при ошибке агента: число попыток и начальная пауза (удваивается)
+SAFERUN_MAX_ATTEMPTS = int(os.getenv("SAFERUN_MAX_ATTEMPTS", 3))
+SAFERUN_BACKOFF = float(os.getenv("SAFERUN_BACKOFF", 1))
+# Пауза перед каждым вызовом (раньше была жёстко 5 сек); 0 — без паузы
+SAFERUN_DELAY = float(os.getenv("SAFERUN_DELAY", 0))
+
+
+# Ветки графа: узел критика и ключи состояния, принадлежащие ветке
+BRANCHES = {
+    "rubricator": {
+        "critic": "critic_r",
+        "result": "rubric_result_rubricator",
+        "critique": "critique",
+        "revision_count": "revision_count",
+    },
+    "keyword": {
+        "critic": "critic_k",
+        "result": "rubric_result_keyword",
+        "critique": "critique_key",
+        "revision_count": "revision_count_key",
+    },
+    "normal": {
+        "critic": "critic_nor",
+        "result": "rubric_result_normal",
+        "critique": "critique_nor",
+        "revision_count": "revision_count_nor",
+    },
+    "summariser": {
+        "critic": "critic_sum",
+        "result": "rubric_result_summariser",
+        "critique": "critique_sum",
+        "revision_count": "revision_count_sum",
+    },
+}
+
+# Поля ответа (результаты для клиента) и ветки, которые их производят
+OUTPUT_BRANCHES = {
+    "rubrics": "rubricator",
+    "keywords": "keyword",
+    "normalization": "normal",
+    "summary": "summariser",
+}
+
+# Режим критика: "separate" — четыре отдельных критика, "joint" — один вызов на все ветки
+CRITIC_MODES = ("separate", "joint")
+CRITIC_MODE = os.getenv("CRITIC_MODE", "separate")
+
+# Сколько раз по умолчанию можно переделать результат ветки после отказа критика
+MAX_REVISIONS = int(os.getenv("MAX_REVISIONS", 1))
+
+# Уровни качества/задержки:
+#   fast — один структурированный вызов без критиков,
+#   standard — полный граф с критиками,
+#   thorough — полный граф с увеличенным бюджетом ревизий
+TIERS = ("fast", "standard", "thorough")
+# Ветки, которые даёт один вызов FastAgent (нормализации в fast нет)
+FAST_BRANCHES = ["rubricator", "keyword", "summariser"]
+THOROUGH_MAX_REVISIONS = int(os.getenv("THOROUGH_MAX_REVISIONS", 3))
+
+# Бюджет токенов на статью (0 — без ограничения): после него ревизии не запускаются
+ARTICLE_TOKEN_BUDGET = int(os.getenv("ARTICLE_TOKEN_BUDGET", 0))
+
+
+def resolve_revision_budget(revision_budget=None, default: int = MAX_REVISIONS) -> dict:
+    """
+    Приводит бюджет ревизий к словарю {ветка: число переделок}.
+
+    Args:
+        revision_budget: None, одно число для всех веток или словарь по веткам
+        default: Бюджет для веток, не указанных явно
+    """
+    if isinstance(revision_budget, int):
+        return {branch: revision_budget for branch in BRANCHES}
+
+    budget = {branch: default for branch in BRANCHES}
+    for branch, value in (revision_budget or {}).items():
+        if branch not in BRANCHES:
+            raise ValueError(f"Неизвестная ветка в бюджете ревизий: {branch}")
+        budget[branch] = int(value)
+    return budget
+
+
+def tokens_spent(state: dict) -> int:
+    """Сколько токенов (вход + выход) уже потрачено на статью."""
+    return sum(u["prompt_tokens"] + u["completion_tokens"] for u in state.get("token_usage") or [])
+
+
+def token_budget_spent(state: dict) -> bool:
+    """Исчерпан ли бюджет токенов статьи."""
+    budget = state.get("token_budget")
+    return bool(budget) and tokens_spent(state) >= budget
+
+
+def token_summary(state: dict) -> dict:
+    """Расход токенов по агентам и всего на статью (по usage провайдера)."""
+    by_agent = {}
+    for usage in state.get("token_usage") or []:
+        agent = by_agent.setdefault(usage["agent"], {
+            "calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "estimated_calls": 0
+        })
+        agent["calls"] += 1
+        agent["prompt_tokens"] += usage["prompt_tokens"]
+        agent["completion_tokens"] += usage["completion_tokens"]
+        agent["total_tokens"] += usage["prompt_tokens"] + usage["completion_tokens"]
+        agent["estimated_calls"] += bool(usage.get("estimated"))
+
+    total = {key: sum(agent[key] for agent in by_agent.values())
+             for key in ("calls", "prompt_tokens", "completion_tokens", "total_tokens", "estimated_calls")}
+    return {
+        "total": total,
+        "budget": state.get("token_budget") or None,
+        "by_agent": by_agent
+    }
 
-def should_continue_or_revise(state: dict) -> Literal["continue", "revise", "max_retries"]:
-    """Решает, продолжать дальше или вернуться на переделку."""
 
-    # Проверяем счетчик попыток
-    try:
-        revision_count = state.get("revision_count", 0)
-    except:
-        pass
+def sla_expired(state: dict) -> bool:
+    """Истёк ли SLA статьи (мягкий дедлайн ответа клиенту)."""
+    sla_deadline = state.get("sla_deadline")
+    return bool(sla_deadline) and time.time() >= sla_deadline
 
-    try:
-        revision_count = state.get("revision_count_key", 0)
-    except:
-        pass
 
-    try:
-        revision_count = state.get("revision_count_sum", 0)
-    except:
-        pass
+def resolve_outputs(outputs=None) -> List[str]:
+    """
+    Приводит запрошенные клиентом результаты к списку веток.
 
-    try:
-        revision_count = state.get("revision_count_nor", 0)
-    except:
-        pass
+    Args:
+        outputs: None/пусто — все ветки; иначе список или строка через запятую
+            из полей ответа ("summary", "keywords", ...) или названий веток
 
+    Raises:
+        ValueError: Если запрошен неизвестный результат
+    """
+    if isinstance(outputs, str):
+        outputs = [name.strip() for name in outputs.split(",")]
+    outputs = [name for name in (outputs or []) if name]
+    if not outputs:
+        return list(BRANCHES)
 
-    MAX_REVISIONS = 1
+    branches = set()
+    for name in outputs:
+        branch = OUTPUT_BRANCHES.get(name, name)
+        if branch not in BRANCHES:
+            raise ValueError(f"Неизвестный результат: {name}")
+        branches.add(branch)
+    # Порядок веток как в BRANCHES
+    return [branch for branch in BRANCHES if branch in branches]
 
-    if revision_count >= MAX_REVISIONS:
-        return "max_retries"
 
-    # Проверяем статус критика
-    status_list = state.get("status", [])
+def should_continue_or_revise(state: dict, branch: str, revision_budget: dict) -> Literal["continue", "revise", "max_retries"]:
+    """
+    Решает, продолжать дальше или вернуть ветку на переделку.
+
+    Смотрит только на вердикт и счётчик своей ветки: критик оставляет
+    непустую критику при отказе, а генератор считает свои запуски.
+    Бюджет статьи (state["revision_budget"]) важнее бюджета графа.
+    """
+    keys = BRANCHES[branch]
 
-    if "critic_rejected" in status_list:
-        return "revise"
-    elif "critic_approved" in status_list:
+    if not state.get(keys["critique"]):
         return "continue"
 
-    return "continue"
+    # После SLA или исчерпания бюджета токенов ревизии не запускаются:
+    # ветка уходит в индексатор как есть
+    if sla_expired(state) or token_budget_spent(state):
+        return "continue"
+
+    budget = (state.get("revision_budget") or {}).get(branch, revision_budget[branch])
+    # Первый запуск генератора — не ревизия
+    revisions_done = state.get(keys["revision_count"], 0) - 1
+    if revisions_done >= budget:
+        return "max_retries"
+
+    return "revise"
+
+
+def revision_stats(state: dict) -> dict:
+    """Статистика ревизий по запрошенным веткам (незапрошенные не выполнялись)."""
+    budget = state.get("revision_budget") or {}
+    skipped = state.get("sla_skipped") or []
+    stats = {}
+    for branch in resolve_outputs(state.get("outputs")):
+        keys = BRANCHES[branch]
+        attempts = state.get(keys["revision_count"], 0)
+        reviewed = branch not in skipped
+        stats[branch] = {
+            "attempts": attempts,
+            "revisions": max(attempts - 1, 0),
+            "reviewed": reviewed,
+            "approved": attempts > 0 and reviewed and not state.get(keys["critique"]),
+            "budget": budget.get(branch),
+        }
+    return stats
 
 
 def saferun(func, state: dict):
-    """Безопасное выполнение функции агента с повторами."""
-    while True:
+    """
+    Безопасное выполнение функции агента с ограниченными повторами.
+
+    Пауза между попытками растёт экспоненциально (при 429 — вдвое дольше)
+    и не выходит за дедлайн статьи. Разомкнутый circuit breaker и
+    исчерпанный дедлайн не повторяются, а сразу пробрасываются.
+    """
+    deadline = state.get("deadline")
+    delay = SAFERUN_BACKOFF
+
+    for attempt in range(1, SAFERUN_MAX_ATTEMPTS + 1):
         try:
-            time.sleep(5)
+            if SAFERUN_DELAY:
+                time.sleep(SAFERUN_DELAY)
             return func(state)
+        except (CircuitOpenError, DeadlineExceeded):
+            raise
         except Exception as e:
-            if 429 in e:
-                continue
-            print(f"⚠️  Ошибка в saferun: {e}")
-            print(func)
-            continue
+            name = getattr(func, "__self__", func).__class__.__name__
+            print(f"⚠️  Ошибка в {name} (попытка {attempt}/{SAFERUN_MAX_ATTEMPTS}): {e}")
+            if attempt == SAFERUN_MAX_ATTEMPTS:
+                raise
+
+            pause = delay * 2 if is_rate_limit(e) else delay
+            left = remaining_time(deadline)
+            if left is not None and left <= pause:
+                record("deadline_exceeded")
+                raise DeadlineExceeded(f"Дедлайн статьи не оставляет времени на повтор {name}") from e
+
+            record("retries")
+            SAFERUN_RETRIES.inc(reason="rate_limit" if is_rate_limit(e) else "error")
+            SAFERUN_SLEEP_SECONDS.inc(pause)
+            note_attempt(pause)
+            time.sleep(pause)
+            delay *= 2
 
 
 # Определяем состояние графа
 class GraphState(TypedDict):
     """Общее состояние для всех узлов графа."""
+    job_id: str
+    # Контекст трассы (W3C traceparent) для спанов узлов
+    traceparent: str
+    deadline: float
+    sla_deadline: float
+    outputs: List[str]
     article_text: str
+    article_digest: str
+    article_sections: List[dict]
 
     indexed_data: str
 
@@ -98,11 +303,450 @@ class GraphState(TypedDict):
     revision_count_key: int
     revision_count_sum: int
     revision_count_nor: int
+    revision_budget: dict
+    revision_mode: str
+    revision_log: Annotated[List[dict], operator.add]
+    candidate_log: Annotated[List[dict], operator.add]
+    node_timings: Annotated[List[dict], operator.add]
+    token_usage: Annotated[List[dict], operator.add]
+    token_budget: int
+    pending_review: List[str]
+    # Ветки, проверка которых пропущена по SLA: их результат критик не видел
+    sla_skipped: Annotated[List[str], operator.add]
     status: Annotated[List[str], operator.add]
 
 
-def create_multi_agent_graph(auth_key: str):
-    """Создаёт многоагентный граф обработки статей."""
+# Поля, которые LangGraph не перезаписывает, а дописывает (Annotated[..., operator.add])
+APPENDED_FIELDS = tuple(
+    name for name, hint in get_type_hints(GraphState, include_extras=True).items()
+    if getattr(hint, "__metadata__", None) == (operator.add,)
+)
+
+
+def build_initial_state(article_text: str, status: List[str] = None, revision_budget=None,
+                        revision_mode: str = None, job_id: str = "", deadline: float = None,
+                        sla: float = None, outputs=None, token_budget: int = None,
+                        tier: str = None) -> dict:
+    """
+    Формирует начальное состояние графа для статьи.
+
+    Args:
+        article_text: Текст статьи
+        status: Начальный список статусов
+        revision_budget: Бюджет ревизий для этой статьи (число или словарь
+            по веткам); если не задан, используется бюджет графа
+        revision_mode: "delta" или "full" (см. revision.py); если не задан,
+            используется REVISION_MODE
+        job_id: Идентификатор задачи (канал событий для потоковой передачи)
+        deadline: Бюджет времени на статью в секундах; по умолчанию ARTICLE_DEADLINE
+        sla: Мягкий бюджет в секундах: после него критики и ревизии
+            пропускаются, а клиент получает частичный ответ
+        outputs: Запрошенные результаты (см. resolve_outputs); по умолчанию все
+        token_budget: Бюджет токенов на статью, после которого ревизии не
+            запускаются; по умолчанию ARTICLE_TOKEN_BUDGET (0 — без ограничения)
+        tier: Уровень обработки; при "fast" по умолчанию запрошены только
+            ветки FAST_BRANCHES, чтобы нормализация не считалась недостающей
+    """
+    state = {
+        "job_id": job_id,
+        # Абсолютный дедлайн статьи: все вызовы модели укладываются в него
+        "deadline": time.time() + (ARTICLE_DEADLINE if deadline is None else deadline),
+        "article_text": article_text,
+        # Экстрактивный дайджест для критиков считается один раз на статью
+        "article_digest": build_digest(article_text),
+        # Разметка разделов: генераторы получают только нужные им части статьи
+        "article_sections": segment_article(article_text),
+        "rubric_result_rubricator": "",
+        "rubric_result_keyword": "",
+        "rubric_result_normal": "",
+        "rubric_result_summariser": "",
+        "critique": "",
+        "critique_key": "",
+        "critique_sum": "",
+        "critique_nor": "",
+        "revision_count": 0,
+        "revision_count_key": 0,
+        "revision_count_sum": 0,
+        "revision_count_nor": 0,
+        "indexed_data": "",
+        "status": status or ["started"]
+    }
+    token_budget = ARTICLE_TOKEN_BUDGET if token_budget is None else token_budget
+    if token_budget < 0:
+        raise ValueError(f"Бюджет токенов не может быть отрицательным: {token_budget}")
+    if token_budget:
+        state["token_budget"] = token_budget
+    if outputs:
+        state["outputs"] = resolve_outputs(outputs)
+    elif tier == "fast":
+        state["outputs"] = list(FAST_BRANCHES)
+    if sla is not None:
+        if not math.isfinite(sla) or sla <= 0:
+            raise ValueError(f"SLA должен быть положительным конечным числом: {sla}")
+        state["sla_deadline"] = time.time() + sla
+    if revision_budget is not None:
+        state["revision_budget"] = resolve_revision_budget(revision_budget)
+    if revision_mode is not None:
+        if revision_mode not in REVISION_MODES:
+            raise ValueError(f"Неизвестный режим ревизий: {revision_mode}")
+        state["revision_mode"] = revision_mode
+    return state
+
+
+_checkpoint_connections = {}
+_checkpoint_lock = threading.Lock()
+
+
+def _checkpoint_connection(db_path: str) -> sqlite3.Connection:
+    """Одно соединение с файлом чекпоинтов на процесс (а не на запрос)."""
+    with _checkpoint_lock:
+        conn = _checkpoint_connections.get(db_path)
+        if conn is None:
+            conn = sqlite3.connect(db_path, check_same_thread=False)
+            # ID статьи в БД для завершённых задач: повторный запуск не сохраняет её снова
+            conn.execute("CREATE TABLE IF NOT EXISTS job_articles (job_id TEXT PRIMARY KEY, article_id INTEGER)")
+            # Параметры графа задачи (JSON): возобновление собирает тот же граф, что и исходный запуск
+            conn.execute("CREATE TABLE IF NOT EXISTS job_graph_params (job_id TEXT PRIMARY KEY, params TEXT)")
+            conn.commit()
+            _checkpoint_connections[db_path] = conn
+        return conn
+
+
+_checkpointers = {}
+
+
+def get_checkpointer(db_path: str = CHECKPOINT_DB):
+    """Общий SQLite-чекпоинтер процесса: состояние сохраняется после каждого шага графа."""
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    conn = _checkpoint_connection(db_path)
+    with _checkpoint_lock:
+        saver = _checkpointers.get(db_path)
+        if saver is None:
+            saver = _checkpointers[db_path] = SqliteSaver(conn)
+        return saver
+
+
+def saved_article_id(job_id: str, db_path: str = CHECKPOINT_DB):
+    """ID статьи, уже сохранённой по итогам задачи, или None."""
+    conn = _checkpoint_connection(db_path)
+    with _checkpoint_lock:
+        row = conn.execute("SELECT article_id FROM job_articles WHERE job_id = ?", (job_id,)).fetchone()
+    return row[0] if row else None
+
+
+def remember_article_id(job_id: str, article_id: int, db_path: str = CHECKPOINT_DB):
+    """Запоминает ID статьи, сохранённой по итогам задачи."""
+    conn = _checkpoint_connection(db_path)
+    with _checkpoint_lock:
+        conn.execute("INSERT OR REPLACE INTO job_articles (job_id, article_id) VALUES (?, ?)", (job_id, article_id))
+        conn.commit()
+
+
+def saved_graph_params(job_id: str, db_path: str = CHECKPOINT_DB):
+    """Параметры create_multi_agent_graph, с которыми запускалась задача, или None."""
+    conn = _checkpoint_connection(db_path)
+    with _checkpoint_lock:
+        row = conn.execute("SELECT params FROM job_graph_params WHERE job_id = ?", (job_id,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def remember_graph_params(job_id: str, params: dict, db_path: str = CHECKPOINT_DB):
+    """Запоминает параметры графа задачи (tier, critic_mode, outputs и т.д.)."""
+    conn = _checkpoint_connection(db_path)
+    with _checkpoint_lock:
+        conn.execute("INSERT OR REPLACE INTO job_graph_params (job_id, params) VALUES (?, ?)",
+                     (job_id, json.dumps(params)))
+        conn.commit()
+
+
+def new_job_id() -> str:
+    """Генерирует идентификатор задачи (thread_id чекпоинтера)."""
+    return uuid.uuid4().hex
+
+
+def job_config(job_id: str) -> dict:
+    """Конфиг запуска графа, привязывающий чекпоинты к задаче."""
+    return {"configurable": {"thread_id": job_id}}
+
+
+def job_finished(graph, job_id: str) -> bool:
+    """Завершён ли уже запуск задачи (есть чекпоинт без следующих узлов)."""
+    if getattr(graph, "checkpointer", None) is None:
+        return False
+    snapshot = graph.get_state(job_config(job_id))
+    return bool(snapshot and snapshot.values and not snapshot.next)
+
+
+def refresh_deadline(graph, config: dict, budget: float = ARTICLE_DEADLINE):
+    """
+    Возобновлённая задача получает новый бюджет времени вместо истёкшего,
+    а её узлы — контекст трассы текущего запроса.
+    """
+    if hasattr(graph, "update_state"):
+        graph.update_state(config, {"deadline": time.time() + budget, "traceparent": current_traceparent()})
+
+
+def run_graph(graph, initial_state: dict, job_id: str = None) -> dict:
+    """
+    Запускает граф для статьи.
+
+    Если граф скомпилирован с чекпоинтером и для job_id уже есть
+    незавершённый запуск, продолжает его вместо повторного запуска
+    с нуля. Если запуск уже завершён, возвращает сохранённый результат.
+    """
+    with start_span("graph.run", job_id=job_id):
+        return _run_graph(graph, {**initial_state, "traceparent": current_traceparent()}, job_id)
+
+
+def _run_graph(graph, initial_state: dict, job_id: str = None) -> dict:
+    if job_id is None or getattr(graph, "checkpointer", None) is None:
+        return graph.invoke(initial_state)
+
+    config = job_config(job_id)
+    snapshot = graph.get_state(config)
+
+    if snapshot and snapshot.values:
+        if snapshot.next:
+            print(f"♻️  Возобновление задачи {job_id} с узлов: {', '.join(snapshot.next)}")
+            refresh_deadline(graph, config)
+            return graph.invoke(None, config)
+        print(f"♻️  Задача {job_id} уже завершена, используем сохранённый результат")
+        return snapshot.values
+
+    return graph.invoke(initial_state, config)
+
+
+def resume_graph(graph, job_id: str) -> dict:
+    """
+    Продолжает запуск задачи с последнего завершённого узла.
+
+    Raises:
+        KeyError: Если для задачи нет сохранённого состояния
+    """
+    with start_span("graph.resume", job_id=job_id):
+        return _resume_graph(graph, job_id)
+
+
+def _resume_graph(graph, job_id: str) -> dict:
+    if getattr(graph, "checkpointer", None) is None:
+        raise ValueError("Граф скомпилирован без чекпоинтера")
+
+    config = job_config(job_id)
+    snapshot = graph.get_state(config)
+    if not snapshot or not snapshot.values:
+        raise KeyError(f"Нет сохранённого состояния для задачи {job_id}")
+
+    if not snapshot.next:
+        return snapshot.values
+
+    print(f"♻️  Возобновление задачи {job_id} с узлов: {', '.join(snapshot.next)}")
+    refresh_deadline(graph, config)
+    return graph.invoke(None, config)
+
+
+def run_generator(agent, state: dict, branch: str = None, candidates: int = 1) -> dict:
+    """
+    Узел генератора: результат ветки сразу попадает в реестр задачи.
+
+    При candidates > 1 первый проход ветки делается best-of-N
+    (см. candidates.py); ревизии всегда идут одним вызовом.
+    """
+    if branch and candidates > 1 and not state.get(BRANCHES[branch]["critique"]):
+        update = generate_candidates(saferun, agent, branch, state, candidates, BRANCHES[branch]["result"])
+    else:
+        update = saferun(agent.run, state)
+    record_partial(state.get("job_id"), update)
+    return update
+
+
+def record_verdicts(state: dict, update: dict, branches: List[str]):
+    """Отмечает в реестре задачи, какие результаты веток одобрены критиком."""
+    skipped = update.get("sla_skipped", [])
+    record_review(state.get("job_id"), {
+        BRANCHES[branch]["result"]: branch not in skipped and not update[BRANCHES[branch]["critique"]]
+        for branch in branches
+        if BRANCHES[branch]["critique"] in update
+    })
+
+
+def run_critic(branch: str, critic, state: dict, precritic_policy: str) -> dict:
+    """
+    Узел критика ветки с детерминированным пре-критиком перед LLM.
+
+    При нарушении жёстких правил ветка сразу отклоняется с точной критикой;
+    при политике "skip" и соблюдённых правилах LLM-критик не вызывается.
+    После SLA критик не вызывается: результат принимается без проверки
+    и помечается в sla_skipped.
+    """
+    update = _run_critic(branch, critic, state, precritic_policy)
+    record_verdicts(state, update, [branch])
+    return update
+
+
+def _run_critic(branch: str, critic, state: dict, precritic_policy: str) -> dict:
+    if sla_expired(state):
+        print(f"⏱️  [{branch}] SLA истёк, проверка пропущена")
+        return {BRANCHES[branch]["critique"]: "", "sla_skipped": [branch], "status": ["critic_skipped_sla"]}
+
+    if precritic_policy != "off":
+        critique = precheck(branch, state)
+        critique_key = BRANCHES[branch]["critique"]
+        if critique:
+            print(f"📏 [{branch}] Пре-критик отклонил результат")
+            return {critique_key: critique, "status": ["precritic_rejected"]}
+        if precritic_policy == "skip":
+            return {critique_key: "", "status": ["precritic_approved"]}
+
+    return saferun(critic.run, state)
+
+
+def run_joint_critic(critic, state: dict, precritic_policy: str, branches: List[str] = None) -> dict:
+    """Совместный критик: пре-критики отсекают ветки до общего вызова LLM."""
+    branches = state.get("pending_review") or branches or list(BRANCHES)
+    update = {"status": [], "pending_review": []}
+
+    if sla_expired(state):
+        print("⏱️  SLA истёк, совместная проверка пропущена")
+        update["sla_skipped"] = list(branches)
+        for branch in branches:
+            update[BRANCHES[branch]["critique"]] = ""
+            update["status"].append("critic_skipped_sla")
+        record_verdicts(state, update, branches)
+        return update
+
+    if precritic_policy != "off":
+        remaining = []
+        for branch in branches:
+            critique = precheck(branch, state)
+            critique_key = BRANCHES[branch]["critique"]
+            if critique:
+                update[critique_key] = critique
+                update["status"].append("precritic_rejected")
+            elif precritic_policy == "skip":
+                update[critique_key] = ""
+                update["status"].append("precritic_approved")
+            else:
+                remaining.append(branch)
+        branches = remaining
+
+    if branches:
+        result = saferun(critic.run, {**state, "pending_review": branches})
+        update["status"] += result.pop("status", [])
+        update.update(result)
+
+    record_verdicts(state, update, list(BRANCHES))
+    return update
+
+
+def revise_branches(state: dict, generators: dict, revision_budget: dict) -> dict:
+    """
+    Узел совместного режима: параллельно переделывает отклонённые ветки.
+
+    Переделанные ветки попадают в pending_review, чтобы совместный критик
+    на следующем проходе проверял только их.
+    """
+    branches = [
+        branch for branch in generators
+        if should_continue_or_revise(state, branch, revision_budget) == "revise"
+    ]
+    print(f"🔁 Переделка веток: {', '.join(branches)}")
+
+    update = {"pending_review": branches}
+    with ThreadPoolExecutor(max_workers=max(len(branches), 1)) as pool:
+        results = pool.map(in_node_context(lambda branch: run_generator(generators[branch], state)), branches)
+        for result in results:
+            # Журналы и статусы веток складываются, как их сложил бы редьюсер графа
+            for field in APPENDED_FIELDS:
+                if field in result:
+                    update[field] = update.get(field, []) + result.pop(field)
+            update.update(result)
+    update.setdefault("status", [])
+    return update
+
+
+def should_revise_any(state: dict, branches, revision_budget: dict) -> Literal["revise", "continue"]:
+    """Маршрут совместного критика: есть ли хотя бы одна ветка на переделку."""
+    for branch in branches:
+        if should_continue_or_revise(state, branch, revision_budget) == "revise":
+            return "revise"
+    return "continue"
+
+
+def create_fast_graph(auth_key: str, checkpointer=None):
+    """Граф уровня fast: один структурированный вызов модели и индексатор."""
+
+    print("📍 Инициализация агентов (fast)...")
+    try:
+        fast = FastAgent(auth_key=auth_key)
+        print("✅ FastAgent инициализирован")
+
+        indexer = IndexerAgent()
+        print("✅ IndexerAgent инициализирован")
+    except Exception as e:
+        print(f"❌ Ошибка инициализации агентов: {e}")
+        raise
+
+    workflow = StateGraph(GraphState)
+    workflow.add_node("fast", timed_node("fast", lambda state: run_generator(fast, state)))
+    workflow.add_node("indexer", timed_node("indexer", lambda state: saferun(indexer.run, state)))
+
+    workflow.add_edge(START, "fast")
+    workflow.add_edge("fast", "indexer")
+    workflow.add_edge("indexer", END)
+
+    print("🔧 Компиляция графа...")
+    graph = workflow.compile(checkpointer=checkpointer)
+    print("✅ Граф успешно скомпилирован (уровень: fast)")
+
+    return graph
+
+
+def create_multi_agent_graph(auth_key: str, checkpointer=None, revision_budget=None,
+                             critic_mode: str = None, tier: str = "standard",
+                             precritic_policy: str = None, candidates: int = None, outputs=None):
+    """
+    Создаёт многоагентный граф обработки статей.
+
+    Args:
+        auth_key: Ключ авторизации GigaChat
+        checkpointer: Чекпоинтер LangGraph (например, get_checkpointer()).
+            Если задан, состояние сохраняется после каждого шага и запуск
+            можно продолжить по job_id через run_graph/resume_graph.
+        revision_budget: Бюджет ревизий по умолчанию (число или словарь
+            по веткам, см. resolve_revision_budget)
+        critic_mode: "separate" — свой критик у каждой ветки,
+            "joint" — один вызов критика на все ветки сразу
+        tier: Уровень качества/задержки: "fast", "standard" или "thorough"
+        precritic_policy: Политика детерминированных пре-критиков:
+            "off", "reject" или "skip" (см. precritics.py)
+        candidates: Сколько кандидатов генерировать параллельно на первом
+            проходе ветки (best-of-N, см. candidates.py), от 1 до MAX_CANDIDATES; 1 — без кандидатов
+        outputs: Запрошенные результаты (см. resolve_outputs): в граф попадают
+            только нужные ветки и их критики; по умолчанию все. В tier="fast"
+            граф не меняется (фильтруется только ответ), normalization недоступна
+    """
+    tier = tier or "standard"
+    if tier not in TIERS:
+        raise ValueError(f"Неизвестный уровень обработки: {tier}")
+
+    branches = resolve_outputs(outputs)
+    if tier == "fast":
+        # Один вызов FastAgent всегда даёт рубрики, ключевые слова и резюме:
+        # outputs здесь только фильтрует ответ, а нормализации в fast нет
+        if outputs and "normal" in branches:
+            raise ValueError("Уровень fast не делает нормализацию: уберите normalization из outputs")
+        return create_fast_graph(auth_key, checkpointer=checkpointer)
+    if tier == "thorough" and revision_budget is None:
+        revision_budget = THOROUGH_MAX_REVISIONS
+
+    critic_mode = critic_mode or CRITIC_MODE
+    if critic_mode not in CRITIC_MODES:
+        raise ValueError(f"Неизвестный режим критика: {critic_mode}")
+
+    precritic_policy = precritic_policy or PRECRITIC_POLICY
+    if precritic_policy not in PRECRITIC_POLICIES:
+        raise ValueError(f"Неизвестная политика пре-критиков: {precritic_policy}")
 
     print("📍 Инициализация агентов...")
 
@@ -121,17 +765,21 @@ def create_multi_agent_graph(auth_key: str):
         summariser = SummariserAgent(auth_key=auth_key)
         print("✅ SummariserAgent инициализирован")
 
-        critic_r = CriticAgent(auth_key=auth_key)
-        print("✅ CriticAgent инициализирован")
+        if critic_mode == "joint":
+            critic_joint = JointCriticAgent(auth_key=auth_key)
+            print("✅ JointCriticAgent инициализирован")
+        else:
+            critic_r = CriticAgent(auth_key=auth_key)
+            print("✅ CriticAgent инициализирован")
 
-        critic_k = CriticKeywordAgent(auth_key=auth_key)
-        print("✅ CriticKeyAgent инициализирован")
+            critic_k = CriticKeywordAgent(auth_key=auth_key)
+            print("✅ CriticKeyAgent инициализирован")
 
-        critic_sum = CriticSumAgent(auth_key=auth_key)
-        print("✅ CriticSumAgent инициализирован")
+            critic_sum = CriticSumAgent(auth_key=auth_key)
+            print("✅ CriticSumAgent инициализирован")
 
-        critic_nor = CriticNormalAgent(auth_key=auth_key)
-        print("✅ CriticNormalAgent инициализирован")
+            critic_nor = CriticNormalAgent(auth_key=auth_key)
+            print("✅ CriticNormalAgent инициализирован")
 
         indexer = IndexerAgent()
         print("✅ IndexerAgent инициализирован")
@@ -141,78 +789,88 @@ def create_multi_agent_graph(auth_key: str):
         print(f"❌ Ошибка инициализации агентов: {e}")
         raise
 
+    revision_budget = resolve_revision_budget(revision_budget)
+
+    candidates = CANDIDATES if candidates is None else int(candidates)
+    if not 1 <= candidates <= MAX_CANDIDATES:
+        raise ValueError(f"Число кандидатов должно быть от 1 до {MAX_CANDIDATES}: {candidates}")
+
+    generators = {
+        "rubricator": rubricator,
+        "keyword": keyword,
+        "normal": normal,
+        "summariser": summariser,
+    }
+    # В граф попадают только запрошенные ветки
+    generators = {branch: agent for branch, agent in generators.items() if branch in branches}
+
     # Создаем граф состояний
     workflow = StateGraph(GraphState)
 
-    # Добавляем узлы (агентов) в граф
-    # workflow.add_node("bibliographer", lambda state: saferun(bibliographer.run, state))
-    workflow.add_node("rubricator", lambda state: saferun(rubricator.run, state))
-    workflow.add_node("critic_r", lambda state: saferun(critic_r.run, state))
-    workflow.add_node("keyword", lambda state: saferun(keyword.run, state))
-    workflow.add_node("critic_k", lambda state: saferun(critic_k.run, state))
-    workflow.add_node("normal", lambda state: saferun(normal.run, state))
-    workflow.add_node("critic_nor", lambda state: saferun(critic_nor.run, state))
-    workflow.add_node("summariser", lambda state: saferun(summariser.run, state))
-    workflow.add_node("critic_sum", lambda state: saferun(critic_sum.run, state))
-    workflow.add_node("indexer", lambda state: saferun(indexer.run, state))
-
-    # Определяем последовательность выполнения
-    # workflow.add_edge(START, "bibliographer")
-    workflow.add_edge(START, "rubricator")
-    workflow.add_edge("rubricator", "critic_r")
-    workflow.add_conditional_edges(
-        "critic_r",
-        should_continue_or_revise,
-        {
-            "revise": "rubricator",  # Возврат на переделку
-            "continue": "indexer",  # Переход к следующему агенту
-            "max_retries": "indexer"  # Если превышен лимит, идём дальше
-        }
-    )
-
-    # Параллельные пути от библиографа
-    workflow.add_edge(START, "keyword")
-    workflow.add_edge("keyword", "critic_k")
-    workflow.add_conditional_edges(
-        "critic_k",
-        should_continue_or_revise,
-        {
-            "revise": "keyword",  # Возврат на переделку
-            "continue": "indexer",  # Переход к следующему агенту
-            "max_retries": "indexer"  # Если превышен лимит, идём дальше
-        }
-    )
-
-    workflow.add_edge(START, "normal")
-    workflow.add_edge("normal", "critic_nor")
-    workflow.add_conditional_edges(
-        "critic_nor",
-        should_continue_or_revise,
-        {
-            "revise": "normal",  # Возврат на переделку
-            "continue": "indexer",  # Переход к следующему агенту
-            "max_retries": "indexer"  # Если превышен лимит, идём дальше
-        }
-    )
-
-    workflow.add_edge(START, "summariser")
-    workflow.add_edge("summariser", "critic_sum")
-    workflow.add_conditional_edges(
-        "critic_sum",
-        should_continue_or_revise,
-        {
-            "revise": "summariser",  # Возврат на переделку
-            "continue": "indexer",  # Переход к следующему агенту
-            "max_retries": "indexer"  # Если превышен лимит, идём дальше
+    # Генераторы веток работают параллельно от START
+    for branch, agent in generators.items():
+        workflow.add_node(branch, timed_node(
+            branch,
+            lambda state, branch=branch, agent=agent: run_generator(agent, state, branch, candidates)
+        ))
+        workflow.add_edge(START, branch)
+
+    workflow.add_node("indexer", timed_node("indexer", lambda state: saferun(indexer.run, state)))
+
+    if critic_mode == "joint":
+        # Все ветки проверяются одним вызовом критика после завершения генераторов
+        workflow.add_node("critic_joint", timed_node(
+            "critic_joint",
+            lambda state: run_joint_critic(critic_joint, state, precritic_policy, list(generators))
+        ))
+        workflow.add_node("revise", timed_node(
+            "revise",
+            lambda state: revise_branches(state, generators, revision_budget)
+        ))
+
+        workflow.add_edge(list(generators), "critic_joint")
+        workflow.add_conditional_edges(
+            "critic_joint",
+            lambda state: should_revise_any(state, generators, revision_budget),
+            {
+                "revise": "revise",  # Переделываем только отклонённые ветки
+                "continue": "indexer"
+            }
+        )
+        workflow.add_edge("revise", "critic_joint")
+    else:
+        critics = {
+            "rubricator": critic_r,
+            "keyword": critic_k,
+            "normal": critic_nor,
+            "summariser": critic_sum,
         }
-    )
+        for branch, critic in critics.items():
+            if branch not in generators:
+                continue
+            critic_node = BRANCHES[branch]["critic"]
+            workflow.add_node(critic_node, timed_node(
+                critic_node,
+                lambda state, branch=branch, critic=critic: run_critic(branch, critic, state, precritic_policy)
+            ))
+            workflow.add_edge(branch, critic_node)
+            workflow.add_conditional_edges(
+                critic_node,
+                lambda state, branch=branch: should_continue_or_revise(state, branch, revision_budget),
+                {
+                    "revise": branch,  # Возврат на переделку
+                    "continue": "indexer",  # Переход к следующему агенту
+                    "max_retries": "indexer"  # Если превышен лимит, идём дальше
+                }
+            )
 
     workflow.add_edge("indexer", END)
 
     # Компилируем граф
     print("🔧 Компиляция графа...")
-    graph = workflow.compile()
-    print("✅ Граф успешно скомпилирован")
+    graph = workflow.compile(checkpointer=checkpointer)
+    print(f"✅ Граф успешно скомпилирован (уровень: {tier}, режим критика: {critic_mode}, "
+          f"кандидатов: {candidates}, ветки: {', '.join(generators)})")
 
     return graph
 
@@ -223,24 +881,7 @@ if __name__ == "__main__":
 
     graph = create_multi_agent_graph(AUTH_KEY)
 
-    initial_state = {
-        "article_text": "",
-        "rubric_result_rubricator": "",
-        "rubric_result_keyword": "",
-        "rubric_result_normal": "",
-        "rubric_result_summariser": "",
-
-        "critique": "",
-        "critique_key": "",
-        "critique_sum": "",
-        "critique_normal": "",
-
-        "revision_count": 0,
-        "revision_count_key": 0,
-        "revision_count_sum": 0,
-        "revision_count_nor": 0,
-        "status": ["started"]
-    }
+    initial_state = build_initial_state("")
 
     # Выполняем граф
     final_state = graph.invoke(initial_state)
@@ -259,6 +900,7 @@ if __name__ == "__main__":
     print("=" * 80)
     print(f"Рубрицирование:\n{final_state['rubric_result_rubricator']}\n")
     print(f"Количество ревизий: {final_state['revision_count']}")
+    print(f"Статистика ревизий: {revision_stats(final_state)}")
 
     print(f"Саммари:\n{final_state['rubric_result_summariser']}\n")
     print(f"Количество ревизий: {final_state['revision_count_sum']}")
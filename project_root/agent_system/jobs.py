@@ -0,0 +1,133 @@
+"""
+Задачи (job_id): каналы событий и реестр результатов.
+
+Через канал агенты передают токены клиенту. Канал открывает сервер на
+время обработки статьи; если канала нет, публикация ничего не делает и
+агенты работают как обычно.
+
+Реестр хранит готовые результаты веток по мере их появления, чтобы при
+истёкшем SLA отдать клиенту частичный ответ, а итог — позже по job_id.
+"""
+
+import os
+import queue
+import threading
+from collections import OrderedDict
+
+from .metrics import Gauge
+
+# Событие-маркер конца потока
+DONE = {"type": "done"}
+# Сколько последних задач держать в реестре
+JOB_REGISTRY_SIZE = int(os.getenv("JOB_REGISTRY_SIZE", 1000))
+
+_channels = {}
+_lock = threading.Lock()
+
+_jobs = OrderedDict()
+_jobs_lock = threading.Lock()
+
+
+def open_channel(job_id: str) -> queue.Queue:
+    """Открывает канал событий задачи и возвращает очередь для чтения."""
+    channel = queue.Queue()
+    with _lock:
+        _channels[job_id] = channel
+    return channel
+
+
+def close_channel(job_id: str):
+    """Закрывает канал: читатель получит DONE."""
+    with _lock:
+        channel = _channels.pop(job_id, None)
+    if channel is not None:
+        channel.put(DONE)
+
+
+def has_channel(job_id: str) -> bool:
+    """Есть ли у задачи открытый канал."""
+    return bool(job_id) and job_id in _channels
+
+
+def publish(job_id: str, event: dict):
+    """Публикует событие в канал задачи (если он открыт)."""
+    channel = _channels.get(job_id) if job_id else None
+    if channel is not None:
+        channel.put(event)
+
+
+def start_job(job_id: str, **info):
+    """Регистрирует задачу в реестре (старые задачи вытесняются); info — параметры запуска."""
+    with _jobs_lock:
+        _jobs[job_id] = {"state": "running", "partial": {}, "approved": {}, "result": None, "error": None, **info}
+        _jobs.move_to_end(job_id)
+        while len(_jobs) > JOB_REGISTRY_SIZE:
+            _jobs.popitem(last=False)
+
+
+def record_partial(job_id: str, update: dict):
+    """
+    Запоминает результаты веток (ключи rubric_result_*) из обновления узла.
+
+    Новый результат ветки ещё не проверен критиком (см. record_review).
+    """
+    if not job_id:
+        return
+    results = {k: v for k, v in update.items() if k.startswith("rubric_result_") and v}
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is not None and results:
+            job["partial"].update(results)
+            job["approved"].update(dict.fromkeys(results, False))
+
+
+def record_review(job_id: str, verdicts: dict):
+    """Запоминает вердикты критика: ключ rubric_result_* -> одобрен ли результат."""
+    if not job_id or not verdicts:
+        return
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is not None:
+            job["approved"].update(verdicts)
+
+
+def finish_job(job_id: str, result: dict):
+    """Сохраняет итоговый ответ задачи."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is not None:
+            job.update(state="done", result=result)
+
+
+def fail_job(job_id: str, error: str):
+    """Помечает задачу упавшей."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is not None:
+            job.update(state="failed", error=error)
+
+
+def get_job(job_id: str) -> dict:
+    """Копия записи задачи или None, если задачи нет в реестре."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        return {**job, "partial": dict(job["partial"]), "approved": dict(job["approved"])}
+
+
+def running_jobs() -> int:
+    """Сколько задач реестра сейчас в работе."""
+    with _jobs_lock:
+        return sum(1 for job in _jobs.values() if job["state"] == "running")
+
+
+def queued_events() -> int:
+    """Сколько событий ждут отправки клиентам во всех открытых каналах."""
+    with _lock:
+        channels = list(_channels.values())
+    return sum(channel.qsize() for channel in channels)
+
+
+Gauge("jobs_in_flight", "Задачи (статьи) в обработке", running_jobs)
+Gauge("job_events_queued", "События в каналах задач, ещё не отправленные клиентам", queued_events)
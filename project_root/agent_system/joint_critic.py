@@ -0,0 +1,138 @@
+import json
+import re
+
+from langchain_core.messages import SystemMessage
+
+from .digest import article_excerpt
+from .llm_client import call_model, create_chat_model
+
+
+# Что проверяется в каждой ветке: (ключ результата, ключ критики, название, критерии)
+JOINT_BRANCHES = {
+    "rubricator": (
+        "rubric_result_rubricator",
+        "critique",
+        "Рубрикация",
+        "рубрикация точно отражает научную область и структуру статьи, не слишком общая и не слишком узкая; "
+        "одноуровневые разделы не пересекаются"
+    ),
+    "keyword": (
+        "rubric_result_keyword",
+        "critique_key",
+        "Ключевые слова",
+        "от 5 до 15 специфичных ключевых фраз в именительном падеже, отражающих текст; "
+        "без общих слов, целых предложений и дубликатов"
+    ),
+    "normal": (
+        "rubric_result_normal",
+        "critique_nor",
+        "Нормализованный текст",
+        "научный стиль, единая терминология, заголовки без точки в конце, последовательная нумерация, "
+        "оформленный список литературы, нет артефактов распознавания и новых фактов"
+    ),
+    "summariser": (
+        "rubric_result_summariser",
+        "critique_sum",
+        "Резюме",
+        "полнота (проблема, методология, результаты), точность без галлюцинаций, "
+        "лаконичность (150-300 слов), связность, научный стиль"
+    ),
+}
+
+
+class JointCriticAgent:
+    """Агент-критик, проверяющий результаты всех веток одним запросом."""
+
+    def __init__(self, auth_key: str):
+        self.auth_key = auth_key
+        self.model = create_chat_model(auth_key)
+
+    @staticmethod
+    def _parse_verdicts(response: str) -> dict:
+        """Достаёт JSON с вердиктами из ответа модели (в т.ч. из блока ```json)."""
+        match = re.search(r"\{.*\}", response, re.DOTALL)
+        if not match:
+            raise ValueError(f"Критик вернул ответ без JSON: {response[:200]}")
+        verdicts = json.loads(match.group(0))
+        if not isinstance(verdicts, dict):
+            raise ValueError(f"Критик вернул не JSON-объект: {response[:200]}")
+        return verdicts
+
+    @staticmethod
+    def _read_verdict(verdict) -> tuple:
+        """
+        Вердикт ветки как (одобрено, критика).
+
+        Принимает объект {"verdict": ..., "critique": ...} или строку
+        ("APPROVED", "REJECT: ..."). Отсутствующий или нераспознанный вердикт
+        считается отказом: непроверенный результат не должен пройти дальше.
+        """
+        critique = ""
+        if isinstance(verdict, dict):
+            critique = str(verdict.get("critique") or "")
+            verdict = verdict.get("verdict")
+        text = str(verdict or "").strip()
+
+        if text.upper().startswith("APPROVED"):
+            return True, ""
+        if text.upper().startswith("REJECT"):
+            return False, critique or text[len("REJECT"):].lstrip(" :-") or "результат не прошёл проверку"
+        return False, "критик не вынес вердикт по этой ветке; проверь результат по всем критериям"
+
+    def run(self, state: dict) -> dict:
+        article_text = article_excerpt(state)
+
+        # На повторных проходах проверяем только переделанные ветки
+        branches = state.get("pending_review") or list(JOINT_BRANCHES)
+
+        criteria = []
+        candidates = []
+        for branch in branches:
+            result_key, _, title, rules = JOINT_BRANCHES[branch]
+            criteria.append(f"- {branch} ({title}): {rules}")
+            candidates.append(f"=== {branch} ({title}) ===\n{state.get(result_key, '')}")
+
+        critique_prompt = """Ты — строгий научный редактор. Проверь сразу несколько результатов обработки одной научной статьи.
+
+КРИТЕРИИ ПО ВЕТКАМ:
+{criteria}
+
+ИНСТРУКЦИЯ:
+Верни ТОЛЬКО JSON-объект без пояснений, где ключ — название ветки, а значение:
+{{"verdict": "APPROVED"}} если результат корректен, или
+{{"verdict": "REJECT", "critique": "<краткий список конкретных ошибок и как исправить>"}}
+
+Пример:
+{{"keyword": {{"verdict": "APPROVED"}}, "summariser": {{"verdict": "REJECT", "critique": "Не описана методология"}}}}
+
+ВХОДНЫЕ ДАННЫЕ:
+Фрагмент статьи: {article}
+
+{candidates}
+
+Твой вердикт (JSON):"""
+
+        messages = [
+            SystemMessage(content=critique_prompt.format(
+                criteria="\n".join(criteria),
+                article=article_text,
+                candidates="\n\n".join(candidates)
+            ))
+        ]
+
+        response = call_model(self.model, messages, state, "critic_joint").strip()
+        verdicts = self._parse_verdicts(response)
+
+        update = {"status": [], "pending_review": []}
+        for branch in branches:
+            _, critique_key, _, _ = JOINT_BRANCHES[branch]
+            approved, critique = self._read_verdict(verdicts.get(branch))
+
+            if approved:
+                update[critique_key] = ""
+                update["status"].append("critic_approved")
+            else:
+                update[critique_key] = "REJECT: " + critique
+                update["status"].append("critic_rejected")
+
+        return update
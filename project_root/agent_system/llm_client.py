@@ -0,0 +1,202 @@
+"""Единая точка вызова модели для всех агентов."""
+
+import os
+import threading
+import time
+import weakref
+
+from langchain_gigachat.chat_models import GigaChat
+
+from .cassette import active_cassette, request_key
+from .jobs import has_channel, publish
+from .resilience import LLM_CALL_TIMEOUT, call_with_resilience
+from .sections import CHARS_PER_TOKEN
+from .timings import current_attempt, note_usage
+from .tracing import in_trace_context, start_span
+
+# Адрес локальной заглушки GigaChat (fake_gigachat.py), например
+# http://localhost:5003/api/v1; если задан, агенты работают без сети и ключа
+FAKE_GIGACHAT_URL = os.getenv("FAKE_GIGACHAT_URL", "")
+
+
+def create_chat_model(auth_key: str = None):
+    """
+    Создаёт чат-модель для агента.
+
+    При заданном FAKE_GIGACHAT_URL модель ходит в локальную заглушку:
+    авторизация не нужна, токен подставляется фиктивный.
+
+    Таймаут HTTP-клиента равен таймауту вызова: запрос, который
+    call_with_resilience перестал ждать, обрывается и не держит поток пула.
+    """
+    if FAKE_GIGACHAT_URL:
+        return GigaChat(base_url=FAKE_GIGACHAT_URL, access_token="fake-token", verify_ssl_certs=False,
+                        timeout=LLM_CALL_TIMEOUT)
+    return GigaChat(credentials=auth_key, verify_ssl_certs=False, timeout=LLM_CALL_TIMEOUT)
+
+
+def _field(obj, name: str, default=0):
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+def extract_usage(message) -> dict:
+    """
+    Токены из ответа модели (usage_metadata или response_metadata["token_usage"]).
+
+    Returns:
+        {"prompt_tokens": ..., "completion_tokens": ...} или None, если usage нет
+    """
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        return {"prompt_tokens": _field(usage, "input_tokens"), "completion_tokens": _field(usage, "output_tokens")}
+
+    metadata = getattr(message, "response_metadata", None) or {}
+    usage = metadata.get("token_usage") or metadata.get("usage")
+    if usage:
+        return {"prompt_tokens": _field(usage, "prompt_tokens"), "completion_tokens": _field(usage, "completion_tokens")}
+    return None
+
+
+def record_usage(agent: str, messages, text: str, usage: dict = None) -> dict:
+    """Записывает токены вызова в учёт текущего узла; без usage — оценка по символам."""
+    estimated = usage is None
+    if estimated:
+        usage = {
+            "prompt_tokens": sum(len(m.content) for m in messages) // CHARS_PER_TOKEN,
+            "completion_tokens": len(text) // CHARS_PER_TOKEN,
+        }
+    usage = {"agent": agent, **usage, "estimated": estimated}
+    note_usage(usage)
+    return usage
+
+
+# id(модель) -> {температура: копия модели}
+_tuned_models = {}
+_tuned_lock = threading.Lock()
+
+
+def with_temperature(model, temperature: float):
+    """
+    Копия модели с заданной температурой.
+
+    Копии кэшируются, пока жива исходная модель: запись удаляется вместе
+    с ней, поэтому кэш не растёт с каждым графом, а id новой модели
+    не находит чужие копии.
+    """
+    key = id(model)
+    with _tuned_lock:
+        copies = _tuned_models.get(key)
+        if copies is None:
+            copies = _tuned_models[key] = {}
+            # Без блокировки: финализатор может сработать в потоке, который её держит
+            weakref.finalize(model, _tuned_models.pop, key, None)
+        tuned = copies.get(temperature)
+        if tuned is None:
+            copy = getattr(model, "model_copy", None) or model.copy
+            tuned = copies[temperature] = copy(update={"temperature": temperature})
+    return tuned
+
+
+def call_model(model, messages, state: dict = None, agent: str = "", stream: bool = False) -> str:
+    """
+    Вызывает модель и возвращает текст ответа.
+
+    Если включена кассета (cassette.py), вызов записывается в неё
+    или ответ берётся из неё без обращения к модели. Токены вызова
+    (usage провайдера) записываются в учёт текущего узла графа,
+    сам вызов — в спан трассы с номером попытки saferun.
+
+    Args:
+        model: Чат-модель LangChain (GigaChat)
+        messages: Сообщения запроса
+        state: Состояние графа (job_id для потоковой передачи, deadline статьи,
+            temperature для кандидатов best-of-N)
+        agent: Имя агента для событий
+        stream: Передавать токены в канал задачи, если он открыт
+
+    Returns:
+        Текст ответа модели
+    """
+    job_id = (state or {}).get("job_id")
+    temperature = (state or {}).get("temperature")
+
+    cassette = active_cassette()
+    key = request_key(messages, agent, temperature) if cassette is not None else None
+
+    with start_span(f"llm {agent}", kind="CLIENT", agent=agent, attempt=current_attempt(),
+                    temperature=temperature, cassette=cassette.mode if cassette is not None else None) as span:
+        if cassette is not None and cassette.mode == "replay":
+            text, usage = cassette.replay(key, agent, messages)
+            # Клиент потока получает те же события, что и при живом вызове
+            if stream and temperature is None and has_channel(job_id):
+                publish(job_id, {"type": "agent_started", "agent": agent})
+                publish(job_id, {"type": "token", "agent": agent, "text": text})
+                publish(job_id, {"type": "agent_finished", "agent": agent})
+        else:
+            started = time.time()
+            text, usage = _call_model(model, messages, state, agent, stream)
+            if cassette is not None:
+                cassette.record(key, agent, text, time.time() - started, messages, usage, temperature)
+        if usage:
+            span.set_attribute("llm.prompt_tokens", usage.get("prompt_tokens"))
+            span.set_attribute("llm.completion_tokens", usage.get("completion_tokens"))
+
+    record_usage(agent, messages, text, usage)
+    return text
+
+
+def _call_model(model, messages, state: dict = None, agent: str = "", stream: bool = False) -> tuple:
+    """Вызов модели с устойчивостью (resilience.py) и потоковой передачей: (текст, usage или None)."""
+    job_id = (state or {}).get("job_id")
+    deadline = (state or {}).get("deadline")
+    temperature = (state or {}).get("temperature")
+
+    if temperature is not None:
+        model = with_temperature(model, temperature)
+        # Токены параллельных кандидатов перемешались бы в одном канале
+        stream = False
+
+    if not (stream and has_channel(job_id)):
+        # Поток пула работает в трассе вызова: его видит профайлер запроса
+        message = call_with_resilience(in_trace_context(lambda: model.invoke(messages)), agent, deadline=deadline)
+        return message.content, extract_usage(message)
+
+    # Попытка, брошенная по таймауту, продолжает читать поток в пуле:
+    # после её завершения токены в канал не идут, а чтение прерывается
+    attempt_lock = threading.Lock()
+    attempt_open = [True]
+
+    def publish_token(text: str) -> bool:
+        with attempt_lock:
+            if attempt_open[0]:
+                publish(job_id, {"type": "token", "agent": agent, "text": text})
+            return attempt_open[0]
+
+    def stream_tokens():
+        parts = []
+        usage = None
+        for chunk in model.stream(messages):
+            # usage приходит в последнем куске потока
+            usage = extract_usage(chunk) or usage
+            if chunk.content:
+                parts.append(chunk.content)
+                if not publish_token(chunk.content):
+                    break
+        return "".join(parts), usage
+
+    attempt = current_attempt()
+    if attempt > 1:
+        # Токены прошлой попытки агента клиент должен отбросить
+        publish(job_id, {"type": "agent_restarted", "agent": agent, "attempt": attempt})
+    publish(job_id, {"type": "agent_started", "agent": agent})
+    try:
+        # Дубликат потокового вызова задвоил бы токены в канале, поэтому без хеджирования
+        text, usage = call_with_resilience(in_trace_context(stream_tokens), agent, deadline=deadline, hedge=False)
+    finally:
+        with attempt_lock:
+            attempt_open[0] = False
+    publish(job_id, {"type": "agent_finished", "agent": agent})
+
+    return text, usage
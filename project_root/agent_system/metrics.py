@@ -0,0 +1,213 @@
+"""
+Метрики в текстовом формате Prometheus (/metrics на server.py и mcp_server.py).
+
+У каждой метрики один словарь значений под своей блокировкой: запись
+держит её на время сложения, сбор — на время копирования словаря.
+Память не зависит от числа потоков (Flask заводит поток на запрос).
+Гауги (очереди, задачи в работе) вычисляются функциями в момент сбора.
+"""
+
+import bisect
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+# Границы корзин по умолчанию: от HTTP-запросов в миллисекунды до вызовов LLM в минуты
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+class _Metric:
+    """Базовый класс: значения метрики по наборам меток."""
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, object] = {}
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key: Tuple, extra: str = "") -> str:
+        parts = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter(_Metric):
+    """Монотонный счётчик."""
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            totals = dict(self._values)
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{self._labels(key)} {_number(value)}" for key, value in sorted(totals.items())]
+        return lines
+
+
+class Histogram(_Metric):
+    """Гистограмма с фиксированными корзинами."""
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help_text, labelnames)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        bucket = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # [счётчики корзин..., сумма, количество]
+                series = self._values[key] = [0] * (len(self.buckets) + 2)
+            if bucket < len(self.buckets):
+                series[bucket] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def time(self, **labels):
+        """Контекстный менеджер: наблюдает длительность блока."""
+        return _Timer(self, labels)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            totals = {key: list(series) for key, series in self._values.items()}
+
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{self._labels(key, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{self._labels(key, le)} {series[-1]}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_number(series[-2])}")
+            lines.append(f"{self.name}_count{self._labels(key)} {series[-1]}")
+        return lines
+
+
+class Gauge:
+    """Гауг, значение которого вычисляется функцией в момент сбора."""
+
+    def __init__(self, name: str, help_text: str, fn: Callable[[], float]):
+        self.name = name
+        self.help = help_text
+        self.fn = fn
+        REGISTRY.register(self)
+
+    def collect(self) -> List[str]:
+        try:
+            value = self.fn()
+        except Exception:
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {_number(value)}"]
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class Registry:
+    """Набор метрик процесса."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines += metric.collect()
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REGISTRY = Registry()
+
+# ========== МЕТРИКИ ==========
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Длительность HTTP-запросов", ("app", "route", "method", "status")
+)
+LLM_CALL_SECONDS = Histogram(
+    "llm_call_duration_seconds", "Длительность вызовов модели по агентам", ("agent", "outcome")
+)
+LLM_CALL_ERRORS = Counter(
+    "llm_call_errors_total", "Ошибки вызовов модели по агентам и типу", ("agent", "kind")
+)
+SAFERUN_RETRIES = Counter(
+    "saferun_retries_total", "Повторы узлов в saferun (rate_limit — после 429)", ("reason",)
+)
+SAFERUN_SLEEP_SECONDS = Counter(
+    "saferun_sleep_seconds_total", "Время пауз между повторами в saferun"
+)
+PDF_EXTRACTION_SECONDS = Histogram(
+    "pdf_extraction_duration_seconds", "Извлечение текста из PDF"
+)
+MCP_SAVE_SECONDS = Histogram(
+    "mcp_save_duration_seconds", "Сохранение статьи через MCP (со стороны клиента)", ("outcome",)
+)
+DB_WRITE_SECONDS = Histogram(
+    "mcp_db_write_duration_seconds", "Запись статьи в SQLite на MCP-сервере"
+)
+
+
+def init_metrics(app, app_name: str):
+    """
+    Подключает к Flask-приложению замер длительности запросов по маршрутам
+    и эндпоинт /metrics.
+    """
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response):
+        started = getattr(g, "metrics_started", None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                app=app_name, route=route, method=request.method, status=response.status_code
+            )
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
@@ -1,17 +1,19 @@
-from langchain_gigachat.chat_models import GigaChat
 from langchain_core.messages import SystemMessage, HumanMessage
 
+from .digest import article_excerpt
+from .llm_client import call_model, create_chat_model
+
 
 class CriticNormalAgent:
     """Агент-критик для проверки качества рубрикации."""
 
     def __init__(self, auth_key: str):
         self.auth_key = auth_key
-        self.model = GigaChat(credentials=auth_key, verify_ssl_certs=False)
+        self.model = create_chat_model(auth_key)
 
     def run(self, state: dict) -> dict:
-        article_text = state.get("article_text", "")[:5000]  # Ограничиваем длину
-        rubric_result = state.get("rubric_result_keyword", "")
+        article_text = article_excerpt(state)
+        rubric_result = state.get("rubric_result_normal", "")
 
         # Промпт критика
         critique_prompt = """Ты — научный редактор-корректор с экспертизой в области библиографического оформления (ГОСТ Р 7.0.5-2008, ГОСТ 7.1-2003).
@@ -77,7 +79,7 @@ REJECT: <Список конкретных ошибок с указанием с
             ))
         ]
 
-        response = self.model.invoke(messages).content.strip()
+        response = call_model(self.model, messages, state, "critic_nor").strip()
 
         # Определяем, одобрено или отклонено
         if response.startswith("APPROVED"):
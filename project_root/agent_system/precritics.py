@@ -0,0 +1,170 @@
+"""
+Детерминированные пре-критики: механическая проверка жёстких правил из промптов критиков.
+
+Каждая проверка возвращает список нарушений (пустой — правила соблюдены).
+Нарушения сразу превращаются в критику без вызова LLM-критика.
+"""
+
+import os
+import re
+from typing import List
+
+KEYWORDS_MIN = int(os.getenv("PRECRITIC_KEYWORDS_MIN", 5))
+KEYWORDS_MAX = int(os.getenv("PRECRITIC_KEYWORDS_MAX", 15))
+KEYWORD_MAX_WORDS = int(os.getenv("PRECRITIC_KEYWORD_MAX_WORDS", 5))
+SUMMARY_MIN_WORDS = int(os.getenv("PRECRITIC_SUMMARY_MIN_WORDS", 150))
+SUMMARY_MAX_WORDS = int(os.getenv("PRECRITIC_SUMMARY_MAX_WORDS", 300))
+# Правила, которых нет в промптах критиков, включаются явно (0 — выключено):
+# нормализованный текст короче этой доли исходного — потеря содержания
+NORMAL_MIN_LENGTH_RATIO = float(os.getenv("PRECRITIC_NORMAL_MIN_LENGTH_RATIO", 0))
+# минимальное число заголовков в рубрикации
+RUBRIC_MIN_HEADINGS = int(os.getenv("PRECRITIC_RUBRIC_MIN_HEADINGS", 0))
+
+# Политика пре-критиков (PRECRITIC_POLICY или поле запроса precritic_policy):
+#   off — не использовать (по умолчанию: проверки включаются явно),
+#   reject — отклонять при нарушении правил, иначе звать LLM-критика,
+#   skip — отклонять при нарушении, а при соблюдении правил одобрять без LLM-критика
+PRECRITIC_POLICIES = ("off", "reject", "skip")
+PRECRITIC_POLICY = os.getenv("PRECRITIC_POLICY", "off")
+
+_LIST_MARKER = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s*")
+_WORD = re.compile(r"\w+(?:[-']\w+)*")
+_PERSONAL = re.compile(r"\b(?:я считаю|мы видим|по-моему|мне кажется)\b", re.IGNORECASE)
+_PAGE_ARTIFACT = re.compile(r"\bстр\.?\s*\d+\s*из\s*\d+\b", re.IGNORECASE)
+_BROKEN_REF = re.compile(r"\[(?:ОШИБКА|ERROR|\?\?)\]", re.IGNORECASE)
+_HEADING_NUMBER = re.compile(r"^\s*(?:#+\s*|(?:\d+(?:\.\d+)*|[IVXLC]+)\.?\s+)")
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text)
+
+
+def parse_keywords(text: str) -> List[str]:
+    """Достаёт ключевые фразы из ответа KeywordAgent ("термин | тип | оценка" или списком)."""
+    lines = [line for line in text.splitlines() if line.strip()]
+    if len(lines) == 1 and '|' not in lines[0]:
+        lines = re.split(r"[,;]", lines[0])
+
+    keywords = []
+    for line in lines:
+        term = _LIST_MARKER.sub("", line).split('|')[0].strip().strip('"«»')
+        if term:
+            keywords.append(term)
+    return keywords
+
+
+def check_keywords(result: str) -> List[str]:
+    """Количество, длина фраз и дубликаты ключевых слов."""
+    keywords = parse_keywords(result)
+    problems = []
+
+    if not (KEYWORDS_MIN <= len(keywords) <= KEYWORDS_MAX):
+        problems.append(
+            f"Количество: найдено {len(keywords)} ключевых фраз, нужно от {KEYWORDS_MIN} до {KEYWORDS_MAX}."
+        )
+
+    too_long = [k for k in keywords if len(_words(k)) > KEYWORD_MAX_WORDS]
+    if too_long:
+        problems.append(
+            f"Формат: фразы длиннее {KEYWORD_MAX_WORDS} слов похожи на предложения: " + "; ".join(too_long[:3])
+        )
+
+    seen = set()
+    duplicates = []
+    for keyword in keywords:
+        key = keyword.lower().replace('_', ' ')
+        if key in seen:
+            duplicates.append(keyword)
+        seen.add(key)
+    if duplicates:
+        problems.append("Дубликаты: " + ", ".join(duplicates[:5]))
+
+    return problems
+
+
+def check_summary(result: str) -> List[str]:
+    """Объём резюме в словах и личные местоимения."""
+    problems = []
+
+    word_count = len(_words(result))
+    if not (SUMMARY_MIN_WORDS <= word_count <= SUMMARY_MAX_WORDS):
+        problems.append(
+            f"Лаконичность: резюме содержит {word_count} слов, нужно от {SUMMARY_MIN_WORDS} до {SUMMARY_MAX_WORDS}."
+        )
+
+    personal = _PERSONAL.findall(result)
+    if personal:
+        problems.append("Научный стиль: личные обороты: " + ", ".join(sorted(set(personal))))
+
+    return problems
+
+
+def check_normal(result: str, article_text: str = "") -> List[str]:
+    """Точки в заголовках, артефакты распознавания, битые ссылки и (если включено) потеря текста."""
+    problems = []
+
+    if NORMAL_MIN_LENGTH_RATIO and article_text and len(result) < len(article_text) * NORMAL_MIN_LENGTH_RATIO:
+        problems.append(
+            f"Полнота: нормализованный текст ({len(result)} символов) заметно короче исходного "
+            f"({len(article_text)} символов), часть содержания потеряна."
+        )
+
+    dotted_headings = []
+    for line in result.splitlines():
+        stripped = line.strip()
+        if not stripped.endswith('.') or stripped.endswith('..'):
+            continue
+        body = _HEADING_NUMBER.sub("", stripped).rstrip('.')
+        is_heading = (
+            len(_words(body)) <= 8
+            and (line.lstrip().startswith('#') or (body.isupper() and any(c.isalpha() for c in body)))
+        )
+        if is_heading:
+            dotted_headings.append(stripped)
+    if dotted_headings:
+        problems.append("Заголовки: точка в конце заголовка: " + "; ".join(dotted_headings[:3]))
+
+    artifacts = _PAGE_ARTIFACT.findall(result)
+    if artifacts:
+        problems.append("Артефакты распознавания: " + ", ".join(artifacts[:3]))
+
+    if _BROKEN_REF.search(result):
+        problems.append("Битые ссылки вида [ОШИБКА] в тексте.")
+
+    return problems
+
+
+def check_rubric(result: str) -> List[str]:
+    """Рубрикация не пуста и (если включено) содержит не меньше RUBRIC_MIN_HEADINGS заголовков."""
+    headings = [line for line in result.splitlines() if line.strip()]
+    if not headings:
+        return ["Структура: рубрикация пуста."]
+    if len(headings) < RUBRIC_MIN_HEADINGS:
+        return [f"Структура: в рубрикации {len(headings)} заголовков, нужно не меньше {RUBRIC_MIN_HEADINGS}."]
+    return []
+
+
+def find_problems(branch: str, state: dict) -> List[str]:
+    """Список нарушений жёстких правил в результате ветки."""
+    if branch == "keyword":
+        return check_keywords(state.get("rubric_result_keyword", ""))
+    if branch == "summariser":
+        return check_summary(state.get("rubric_result_summariser", ""))
+    if branch == "normal":
+        return check_normal(state.get("rubric_result_normal", ""), state.get("article_text", ""))
+    if branch == "rubricator":
+        return check_rubric(state.get("rubric_result_rubricator", ""))
+    return []
+
+
+def precheck(branch: str, state: dict) -> str:
+    """
+    Проверяет результат ветки по жёстким правилам.
+
+    Returns:
+        Текст критики для генератора или "" если правила соблюдены
+    """
+    problems = find_problems(branch, state)
+    if not problems:
+        return ""
+    return "REJECT: " + " ".join(f"{i}) {p}" for i, p in enumerate(problems, 1))
@@ -0,0 +1,185 @@
+"""
+Профилирование одного запроса по требованию: сэмплирующий профайлер и пик памяти.
+
+Профайлер раз в PROFILE_INTERVAL снимает стеки потоков процесса
+(sys._current_frames) и копит их в формате collapsed stacks
+("поток;функция;функция N"), который напрямую читают flamegraph.pl
+и speedscope. С trace_id в профиль попадают только потоки, которые
+в момент сэмпла работают в трассе запроса (обработчик, узлы графа,
+пулы кандидатов и вызовов модели — см. tracing.thread_traces);
+остальные считаются в other_samples. Потоки, ждущие блокировки,
+очереди или сокета, в профиль не попадают: он показывает, где тратится
+CPU (разбор PDF, слияние состояния LangGraph, сборка JSON), а не
+ожидание GigaChat.
+
+Пик памяти считается через tracemalloc и покрывает весь процесс, а не
+только запрос (memory_scope в отчёте): параллельные запросы в него входят.
+Профилирование глобально для процесса, поэтому одновременно идёт
+не больше одного. Без флага профилирования ничего из этого не запускается.
+"""
+
+import hmac
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from .tracing import thread_traces
+
+# Токен доступа к профилированию; пустой — профилирование выключено
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", 0.005))
+PROFILE_MAX_DEPTH = int(os.getenv("PROFILE_MAX_DEPTH", 64))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+# Сколько самых горячих функций (по собственному времени) отдавать в ответе
+PROFILE_TOP = 15
+
+# Функции, в которых поток ждёт, а не работает: (файл, функция) верхнего кадра
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("socket.py", "readinto"),
+    ("socket.py", "accept"),
+    ("ssl.py", "read"),
+    ("thread.py", "_worker"),
+}
+
+_busy = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Уже идёт профилирование другого запроса."""
+
+
+def check_token(token: str) -> bool:
+    """Разрешено ли профилирование с этим токеном."""
+    return bool(PROFILE_TOKEN) and hmac.compare_digest(token or "", PROFILE_TOKEN)
+
+
+class SamplingProfiler:
+    """
+    Сэмплирующий профайлер с учётом пика памяти.
+
+    Args:
+        trace_id: Трасса запроса; None — профилируются все потоки процесса
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL, max_depth: int = PROFILE_MAX_DEPTH,
+                 trace_id: str = None):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.trace_id = trace_id
+        self.stacks = Counter()
+        self.samples = 0
+        self.idle_samples = 0
+        self.other_samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._own_tracemalloc = False
+
+    def start(self) -> "SamplingProfiler":
+        """
+        Запускает сэмплирование и учёт памяти.
+
+        Raises:
+            ProfilerBusy: Если профилирование уже идёт
+        """
+        if not _busy.acquire(blocking=False):
+            raise ProfilerBusy("Уже идёт профилирование другого запроса")
+        self._own_tracemalloc = not tracemalloc.is_tracing()
+        if self._own_tracemalloc:
+            tracemalloc.start()
+        else:
+            tracemalloc.reset_peak()
+        self.started = time.time()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            traces = thread_traces() if self.trace_id else None
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if traces is not None and traces.get(ident) != self.trace_id:
+                    self.other_samples += 1
+                    continue
+                if (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES:
+                    self.idle_samples += 1
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(_thread_group(names.get(ident, "thread")))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self) -> dict:
+        """
+        Останавливает профилирование.
+
+        Returns:
+            {"samples", "idle_samples", "other_samples", "threads": "request" или "process",
+             "interval", "duration", "peak_memory_mb", "memory_scope": "process",
+             "hot": самые горячие функции, "collapsed": строки collapsed stacks}
+        """
+        self._stop.set()
+        self._thread.join()
+        peak = tracemalloc.get_traced_memory()[1]
+        if self._own_tracemalloc:
+            tracemalloc.stop()
+        _busy.release()
+
+        return {
+            "samples": self.samples,
+            "idle_samples": self.idle_samples,
+            "other_samples": self.other_samples,
+            "threads": "request" if self.trace_id else "process",
+            "interval": self.interval,
+            "duration": round(time.time() - self.started, 3),
+            # tracemalloc не различает потоки: пик памяти всего процесса
+            "peak_memory_mb": round(peak / 1024 / 1024, 2),
+            "memory_scope": "process",
+            "hot": hot_functions(self.stacks),
+            "collapsed": [f"{stack} {count}" for stack, count in self.stacks.most_common()],
+        }
+
+
+def _thread_group(name: str) -> str:
+    """Имя потока без номера: потоки одного пула сливаются в один корень."""
+    return name.rstrip("0123456789").rstrip("-_") or name
+
+
+def hot_functions(stacks: Counter, limit: int = PROFILE_TOP) -> list:
+    """Функции с наибольшим собственным временем (верхний кадр стека)."""
+    self_time = Counter()
+    total = sum(stacks.values()) or 1
+    for stack, count in stacks.items():
+        self_time[stack.rsplit(";", 1)[-1]] += count
+    return [
+        {"function": function, "samples": count, "share": round(count / total, 3)}
+        for function, count in self_time.most_common(limit)
+    ]
+
+
+def save_profile(report: dict, name: str, directory: str = PROFILE_DIR) -> dict:
+    """
+    Сохраняет collapsed stacks в файл и возвращает отчёт без них
+    (со ссылкой на файл) — для metadata ответа.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{name}.collapsed")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(report["collapsed"]) + "\n")
+    summary = {k: v for k, v in report.items() if k != "collapsed"}
+    summary["file"] = path
+    return summary
@@ -0,0 +1,285 @@
+"""
+Устойчивость вызовов GigaChat: дедлайны, хеджирование и circuit breaker.
+
+- У каждого вызова есть таймаут, а у статьи — общий дедлайн (state["deadline"]),
+  который передаётся через граф; вызов не начинается, если время вышло.
+- Хеджирование (LLM_HEDGE=1): если вызов идёт дольше p95 последних вызовов
+  этого агента, отправляется дубликат и берётся первый ответ.
+- Circuit breaker: после серии ошибок подряд вызовы сразу падают
+  с CircuitOpenError, пока провайдер не восстановится.
+Все переходы считаются в счётчиках (resilience_stats()).
+"""
+
+import os
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from .metrics import Gauge, LLM_CALL_ERRORS, LLM_CALL_SECONDS
+
+LLM_CALL_TIMEOUT = float(os.getenv("LLM_CALL_TIMEOUT", 120))
+ARTICLE_DEADLINE = float(os.getenv("ARTICLE_DEADLINE", 900))
+HEDGE_ENABLED = os.getenv("LLM_HEDGE", "0") == "1"
+HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", 20))
+HEDGE_PERCENTILE = 0.95
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", 5))
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", 30))
+LATENCY_WINDOW = 200
+
+# Сетевые ошибки клиентов (httpx, requests) по имени класса в MRO: модуль не зависит от их пакетов
+TRANSPORT_ERROR_TYPES = ("TransportError", "ConnectionError", "Timeout")
+
+# Зависшие вызовы нельзя прервать, поэтому они выполняются в отдельном пуле,
+# а вызывающий поток перестаёт их ждать по таймауту; поток пула освобождает
+# таймаут HTTP-клиента модели (LLM_CALL_TIMEOUT, см. create_chat_model)
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_MAX_WORKERS", 32)),
+                               thread_name_prefix="llm-call")
+
+_counters = Counter()
+_counters_lock = threading.Lock()
+
+
+class DeadlineExceeded(Exception):
+    """Бюджет времени статьи исчерпан."""
+
+
+class CircuitOpenError(Exception):
+    """Провайдер недоступен: circuit breaker разомкнут."""
+
+
+def record(event: str, amount: int = 1):
+    """Увеличивает счётчик события."""
+    with _counters_lock:
+        _counters[event] += amount
+
+
+def status_code(error: Exception):
+    """HTTP-статус ошибки провайдера или None, если ошибка не HTTP."""
+    for source in (error, getattr(error, "response", None)):
+        code = getattr(source, "status_code", None)
+        if isinstance(code, int):
+            return code
+    # gigachat.exceptions.ResponseError(url, status_code, content, headers)
+    if type(error).__name__ == "ResponseError" and len(error.args) > 1 and isinstance(error.args[1], int):
+        return error.args[1]
+    return None
+
+
+def is_rate_limit(error: Exception) -> bool:
+    """Ошибка 429 от провайдера (по статусу ответа, а не по тексту ошибки)."""
+    return status_code(error) == 429
+
+
+def is_provider_failure(error: Exception) -> bool:
+    """
+    Ошибка, говорящая о недоступности провайдера: таймаут, сетевая ошибка или HTTP 5xx.
+
+    Локальные ошибки (конфигурация, сборка промпта, 4xx) здоровье провайдера не отражают.
+    """
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    if any(cls.__name__ in TRANSPORT_ERROR_TYPES for cls in type(error).__mro__):
+        return True
+    code = status_code(error)
+    return code is not None and code >= 500
+
+
+def remaining_time(deadline: float = None) -> float:
+    """Сколько секунд осталось до дедлайна (None — дедлайна нет)."""
+    if not deadline:
+        return None
+    return deadline - time.time()
+
+
+class CircuitBreaker:
+    """Circuit breaker: closed -> open (после N ошибок подряд) -> half_open (пробный вызов) -> closed."""
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def _transition(self, state: str):
+        self.state = state
+        record(f"breaker_{state}")
+        print(f"🔌 Circuit breaker GigaChat: {state}")
+
+    def before_call(self):
+        """Пропускает вызов или сразу падает, если провайдер считается недоступным."""
+        with self._lock:
+            if self.state == "open":
+                if time.time() - self.opened_at < self.reset_timeout:
+                    record("breaker_rejected")
+                    raise CircuitOpenError(
+                        f"GigaChat недоступен: circuit breaker разомкнут после {self.failures} ошибок подряд, "
+                        f"повторите через {self.reset_timeout - (time.time() - self.opened_at):.0f} сек"
+                    )
+                self._transition("half_open")
+
+            if self.state == "half_open":
+                # В полуоткрытом состоянии пропускаем только один пробный вызов
+                if self._probe_in_flight:
+                    record("breaker_rejected")
+                    raise CircuitOpenError("GigaChat недоступен: идёт пробный вызов после сбоя")
+                self._probe_in_flight = True
+
+    def on_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probe_in_flight = False
+            if self.state != "closed":
+                self._transition("closed")
+
+    def on_neutral(self):
+        """Вызов завершился без вердикта о здоровье провайдера (например, 429)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def on_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                self.opened_at = time.time()
+                self._transition("open")
+
+
+class LatencyTracker:
+    """Скользящее окно задержек по агентам для порога хеджирования."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, agent: str, latency: float):
+        with self._lock:
+            self._samples.setdefault(agent, deque(maxlen=self.window)).append(latency)
+
+    def percentile(self, agent: str, q: float) -> float:
+        """Перцентиль задержки агента или None, если данных мало."""
+        with self._lock:
+            samples = sorted(self._samples.get(agent, ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(int(len(samples) * q), len(samples) - 1)]
+
+
+breaker = CircuitBreaker()
+latencies = LatencyTracker()
+
+
+def _first_result(futures, timeout: float):
+    """Ждёт первый успешный результат из нескольких одинаковых вызовов."""
+    pending = set(futures)
+    end = time.time() + timeout
+    error = None
+    while pending:
+        done, pending = wait(pending, timeout=max(end - time.time(), 0), return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            if future.exception() is None:
+                return future
+            error = future.exception()
+    if error is not None:
+        raise error
+    raise TimeoutError(f"Вызов GigaChat не уложился в {timeout:.0f} сек")
+
+
+def call_with_resilience(fn, agent: str = "", deadline: float = None, hedge: bool = True):
+    """
+    Выполняет вызов модели с таймаутом, дедлайном статьи, хеджированием и circuit breaker.
+
+    Args:
+        fn: Функция без аргументов, делающая вызов
+        agent: Имя агента (окно задержек для хеджирования)
+        deadline: Дедлайн статьи (time.time()), None — без дедлайна
+        hedge: Разрешить дублирующий запрос (нельзя для потоковых вызовов)
+
+    Raises:
+        DeadlineExceeded: Дедлайн статьи уже прошёл
+        CircuitOpenError: Провайдер считается недоступным
+        TimeoutError: Вызов не уложился в таймаут
+    """
+    timeout = LLM_CALL_TIMEOUT
+    left = remaining_time(deadline)
+    if left is not None:
+        if left <= 0:
+            record("deadline_exceeded")
+            LLM_CALL_ERRORS.inc(agent=agent, kind="deadline")
+            raise DeadlineExceeded(f"Дедлайн статьи исчерпан до вызова {agent}")
+        timeout = min(timeout, left)
+
+    try:
+        breaker.before_call()
+    except CircuitOpenError:
+        LLM_CALL_ERRORS.inc(agent=agent, kind="circuit_open")
+        raise
+    started = time.time()
+    futures = [_executor.submit(fn)]
+
+    try:
+        threshold = latencies.percentile(agent, HEDGE_PERCENTILE) if (HEDGE_ENABLED and hedge) else None
+        if threshold is not None and threshold < timeout:
+            done, _ = wait(futures, timeout=threshold)
+            if not done:
+                record("hedges_fired")
+                futures.append(_executor.submit(fn))
+
+        winner = _first_result(futures, timeout - (time.time() - started))
+        if len(futures) > 1 and winner is futures[1]:
+            record("hedges_won")
+        result = winner.result()
+    except TimeoutError:
+        breaker.on_failure()
+        record("timeouts")
+        LLM_CALL_ERRORS.inc(agent=agent, kind="timeout")
+        LLM_CALL_SECONDS.observe(time.time() - started, agent=agent, outcome="timeout")
+        if left is not None and time.time() - started >= left:
+            record("deadline_exceeded")
+            raise DeadlineExceeded(f"Дедлайн статьи исчерпан во время вызова {agent}")
+        raise
+    except Exception as e:
+        # Сбоем провайдера считаются только сеть и 5xx; 429 (перегрузка) и
+        # локальные ошибки (конфигурация, промпт) breaker не размыкают
+        if is_provider_failure(e):
+            breaker.on_failure()
+        else:
+            breaker.on_neutral()
+        record("errors")
+        kind = "rate_limit" if is_rate_limit(e) else "error"
+        LLM_CALL_ERRORS.inc(agent=agent, kind=kind)
+        LLM_CALL_SECONDS.observe(time.time() - started, agent=agent, outcome=kind)
+        raise
+
+    breaker.on_success()
+    latencies.add(agent, time.time() - started)
+    LLM_CALL_SECONDS.observe(time.time() - started, agent=agent, outcome="ok")
+    record("calls")
+    return result
+
+
+def pending_calls() -> int:
+    """Вызовы модели, ждущие свободного потока пула."""
+    return _executor._work_queue.qsize()
+
+
+def resilience_stats() -> dict:
+    """Счётчики переходов и состояние circuit breaker."""
+    with _counters_lock:
+        counters = dict(_counters)
+    return {
+        "breaker_state": breaker.state,
+        "consecutive_failures": breaker.failures,
+        "counters": counters
+    }
+
+
+Gauge("llm_pending_calls", "Вызовы модели в очереди пула", pending_calls)
@@ -0,0 +1,76 @@
+"""
+Ревизии генераторов после отказа критика.
+
+Режимы:
+    full — по умолчанию: промпт с добавленной критикой и весь текст статьи заново;
+    delta — предыдущий черновик, критика и только релевантный фрагмент статьи
+            (дайджест), модель исправляет свой же ответ.
+"""
+
+import os
+import time
+from typing import List
+
+from langchain_core.messages import SystemMessage, HumanMessage
+
+from .digest import article_excerpt
+from .sections import CHARS_PER_TOKEN
+
+REVISION_MODES = ("full", "delta")
+REVISION_MODE = os.getenv("REVISION_MODE", "full")
+
+
+def use_delta(state: dict, draft: str, critique: str) -> bool:
+    """Можно ли ревизовать дельтой: есть критика, черновик и включён режим."""
+    mode = state.get("revision_mode") or REVISION_MODE
+    return bool(critique and draft and mode == "delta")
+
+
+def full_revision_prompt(prompt: str, critique: str) -> str:
+    """Промпт полной перегенерации: исходный промпт с критикой."""
+    return prompt + f"\n\n⚠️ ВНИМАНИЕ! Предыдущая попытка была отклонена:\n{critique}\n\nУчти эти замечания и исправь ошибки!"
+
+
+def delta_revision_messages(prompt: str, draft: str, critique: str, state: dict) -> List:
+    """
+    Сообщения дельта-ревизии: черновик + критика + фрагмент статьи.
+
+    Args:
+        prompt: Исходный системный промпт агента (задаёт формат ответа)
+        draft: Предыдущий ответ агента
+        critique: Замечания критика
+        state: Состояние графа (берётся дайджест статьи)
+    """
+    excerpt = article_excerpt(state)
+
+    return [
+        SystemMessage(content=prompt + "\n\nСейчас ты исправляешь свой предыдущий ответ по замечаниям критика. "
+                                       "Сохрани всё верное, исправь только указанные ошибки и верни "
+                                       "исправленный ответ целиком в том же формате, без пояснений."),
+        HumanMessage(content=f"Фрагмент статьи:\n{excerpt}\n\n"
+                             f"Твой предыдущий ответ:\n{draft}\n\n"
+                             f"Замечания критика:\n{critique}")
+    ]
+
+
+def revision_record(agent: str, delta: bool, messages: List, started: float) -> dict:
+    """Запись о стоимости одной ревизии для метаданных и бенчмарка."""
+    input_chars = sum(len(m.content) for m in messages)
+    return {
+        "agent": agent,
+        "mode": "delta" if delta else "full",
+        "input_chars": input_chars,
+        "input_tokens": input_chars // CHARS_PER_TOKEN,
+        "latency": time.time() - started,
+    }
+
+
+def revision_summary(state: dict) -> dict:
+    """Сводка по ревизиям: число, токены на входе и время по режимам."""
+    summary = {}
+    for record in state.get("revision_log") or []:
+        mode = summary.setdefault(record["mode"], {"revisions": 0, "input_tokens": 0, "latency": 0.0})
+        mode["revisions"] += 1
+        mode["input_tokens"] += record["input_tokens"]
+        mode["latency"] += record["latency"]
+    return summary
@@ -0,0 +1,126 @@
+"""
+Разбиение статьи на разделы и сборка контекста для каждого агента.
+
+Разметка делается один раз на статью (эвристики по заголовкам), а каждый
+агент получает только нужные ему разделы в пределах бюджета токенов.
+"""
+
+import os
+import re
+from typing import Dict, List, Optional
+
+# Грубая оценка: для кириллицы в среднем ~3 символа на токен
+CHARS_PER_TOKEN = 3
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 8000))
+# Строка длиннее этого числа слов не считается заголовком
+MAX_HEADING_WORDS = 8
+
+SECTION_PATTERNS = {
+    "abstract": r"аннотация|реферат|резюме|abstract|summary|ключевые слова|keywords",
+    "intro": r"введение|актуальность|постановка задачи|introduction|background",
+    "methods": r"материалы и методы|методы(?: исследования)?|методология|экспериментальная часть"
+               r"|materials and methods|methods?|methodology",
+    "results": r"результаты(?: исследования)?|обсуждение(?: результатов)?|эксперименты?"
+               r"|results|discussion|experiments?|evaluation",
+    "conclusion": r"заключение|выводы|conclusions?",
+    "references": r"список (?:литературы|источников)|библиографический список|литература|источники"
+                  r"|references|bibliography",
+    "appendix": r"приложени[ея]|appendix|appendices",
+}
+
+_HEADING = re.compile(
+    r"^\s*(?:#+\s*)?(?:(?:\d+(?:\.\d+)*|[IVXLC]+)[.)]?\s+)?(?P<name>[^\n:.]{2,80}?)[\s.:]*$",
+    re.IGNORECASE
+)
+_SECTION_RES = {
+    name: re.compile(rf"^(?:{pattern})$", re.IGNORECASE)
+    for name, pattern in SECTION_PATTERNS.items()
+}
+
+# Какие разделы нужны агенту, в порядке приоритета (None — весь текст)
+CONTEXT_POLICY: Dict[str, Optional[List[str]]] = {
+    "keyword": ["title", "abstract", "intro", "conclusion", "front", "results", "methods"],
+    "summariser": ["title", "abstract", "intro", "methods", "results", "conclusion", "front"],
+    "rubricator": ["title", "abstract", "front", "intro", "methods", "results", "conclusion", "appendix"],
+    "fast": ["title", "abstract", "intro", "methods", "results", "conclusion", "front"],
+    "normal": None,
+}
+
+
+def _section_of(line: str) -> Optional[str]:
+    """Возвращает тип раздела, если строка — его заголовок."""
+    if len(line.split()) > MAX_HEADING_WORDS:
+        return None
+    match = _HEADING.match(line)
+    if not match:
+        return None
+    name = " ".join(match.group("name").lower().split())
+    for section, regex in _SECTION_RES.items():
+        if regex.match(name):
+            return section
+    return None
+
+
+def segment_article(text: str) -> List[dict]:
+    """
+    Делит статью на разделы: title, front (текст до первого заголовка),
+    abstract, intro, methods, results, conclusion, references, appendix.
+
+    Returns:
+        Список {"name": ..., "text": ...} в порядке следования в статье
+    """
+    lines = text.splitlines()
+    sections = []
+
+    # Заголовок статьи — первая непустая строка
+    start = 0
+    while start < len(lines) and not lines[start].strip():
+        start += 1
+    if start < len(lines):
+        sections.append({"name": "title", "text": lines[start].strip()})
+        start += 1
+
+    current = {"name": "front", "lines": []}
+    for line in lines[start:]:
+        section = _section_of(line) if line.strip() else None
+        if section:
+            if current["lines"]:
+                sections.append({"name": current["name"], "text": "\n".join(current["lines"]).strip()})
+            current = {"name": section, "lines": [line.strip()]}
+        else:
+            current["lines"].append(line)
+    if current["lines"]:
+        sections.append({"name": current["name"], "text": "\n".join(current["lines"]).strip()})
+
+    return [s for s in sections if s["text"]]
+
+
+def build_agent_context(state: dict, agent: str, token_budget: int = CONTEXT_TOKEN_BUDGET) -> str:
+    """
+    Собирает текст для агента из нужных ему разделов в пределах бюджета.
+
+    Разделы берутся по приоритету политики агента, а выводятся в исходном
+    порядке. Если разметки нет или агенту нужен весь текст, возвращает
+    статью целиком.
+    """
+    article_text = state.get("article_text", "")
+    sections = state.get("article_sections")
+    policy = CONTEXT_POLICY.get(agent)
+    if not sections or policy is None:
+        return article_text
+
+    char_budget = token_budget * CHARS_PER_TOKEN
+    chosen = {}
+    used = 0
+    for name in policy:
+        for i, section in enumerate(sections):
+            if section["name"] != name or used >= char_budget:
+                continue
+            text = section["text"][:char_budget - used]
+            chosen[i] = text
+            used += len(text) + 2
+
+    if not chosen:
+        return article_text[:char_budget]
+
+    return "\n\n".join(chosen[i] for i in sorted(chosen))
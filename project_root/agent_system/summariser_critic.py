@@ -1,16 +1,18 @@
-from langchain_gigachat.chat_models import GigaChat
 from langchain_core.messages import SystemMessage, HumanMessage
 
+from .digest import article_excerpt
+from .llm_client import call_model, create_chat_model
+
 
 class CriticSumAgent:
     """Агент-критик для проверки качества рубрикации."""
 
     def __init__(self, auth_key: str):
         self.auth_key = auth_key
-        self.model = GigaChat(credentials=auth_key, verify_ssl_certs=False)
+        self.model = create_chat_model(auth_key)
 
     def run(self, state: dict) -> dict:
-        article_text = state.get("article_text", "")[:5000]  # Ограничиваем длину
+        article_text = article_excerpt(state)
         rubric_result = state.get("rubric_result_summariser", "")
 
         # Промпт критика
@@ -70,7 +72,7 @@ REJECT: <Краткий список конкретных ошибок с ука
             ))
         ]
 
-        response = self.model.invoke(messages).content.strip()
+        response = call_model(self.model, messages, state, "critic_sum").strip()
 
         # Определяем, одобрено или отклонено
         if response.startswith("APPROVED"):
@@ -0,0 +1,132 @@
+"""
+Тайминги и расход токенов узлов графа, критический путь.
+
+Каждый вызов узла пишет в состояние (node_timings) начало и конец,
+число попыток и время пауз между повторами в saferun, а в token_usage —
+токены всех вызовов модели внутри узла. По таймингам строится
+критический путь статьи: цепочка узлов, каждый из которых ждал
+завершения предыдущего, от START до последнего узла.
+"""
+
+import threading
+import time
+from typing import Dict, List
+
+from .tracing import current_span, in_trace_context, start_span
+
+_local = threading.local()
+
+
+def note_attempt(sleep: float = 0.0):
+    """Учитывает повтор внутри текущего узла (вызывается из saferun)."""
+    stats = getattr(_local, "stats", None)
+    if stats is not None:
+        with stats["lock"]:
+            stats["attempts"] += 1
+            stats["sleep"] += sleep
+
+
+def note_usage(usage: dict):
+    """Учитывает токены вызова модели внутри текущего узла (вызывается из call_model)."""
+    stats = getattr(_local, "stats", None)
+    if stats is not None:
+        with stats["lock"]:
+            stats["usage"].append(usage)
+
+
+def current_attempt() -> int:
+    """Номер текущей попытки saferun в узле (1 вне узла)."""
+    stats = getattr(_local, "stats", None)
+    return stats["attempts"] if stats is not None else 1
+
+
+def in_node_context(fn):
+    """
+    Привязывает функцию к учёту текущего узла, чтобы повторы, токены
+    и спаны из рабочих потоков пула (кандидаты, параллельные ревизии) не терялись.
+    """
+    stats = getattr(_local, "stats", None)
+
+    def bound(*args, **kwargs):
+        previous, _local.stats = getattr(_local, "stats", None), stats
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _local.stats = previous
+
+    return in_trace_context(bound)
+
+
+def timed_node(name: str, fn):
+    """Оборачивает функцию узла: в обновление состояния добавляется запись node_timings."""
+
+    def node(state: dict) -> dict:
+        _local.stats = {"attempts": 1, "sleep": 0.0, "usage": [], "lock": threading.Lock()}
+        # Узлы выполняются в потоках LangGraph: родитель спана берётся из состояния
+        parent = None if current_span() is not None else state.get("traceparent")
+        start = time.time()
+        try:
+            with start_span(f"node {name}", parent, job_id=state.get("job_id")) as span:
+                update = fn(state)
+                span.set_attribute("attempts", _local.stats["attempts"])
+        finally:
+            stats, _local.stats = _local.stats, None
+        end = time.time()
+
+        update = dict(update or {})
+        update["node_timings"] = [{
+            "node": name,
+            "start": start,
+            "end": end,
+            "duration": end - start,
+            "attempts": stats["attempts"],
+            "sleep": stats["sleep"],
+        }]
+        if stats["usage"]:
+            update["token_usage"] = [{**usage, "node": name} for usage in stats["usage"]]
+        return update
+
+    return node
+
+
+def critical_path(timings: List[Dict]) -> List[Dict]:
+    """
+    Критический путь: от последнего завершившегося узла назад, каждый раз
+    к узлу, который закончился последним до старта текущего.
+
+    Граф выполняется шагами: узел следующего шага стартует, только когда
+    завершились все узлы предыдущего, поэтому такой узел и был блокирующим.
+
+    Returns:
+        Записи node_timings в порядке выполнения
+    """
+    if not timings:
+        return []
+
+    remaining = sorted(timings, key=lambda t: t["end"])
+    path = [remaining.pop()]
+    while True:
+        current = path[-1]
+        before = [t for t in remaining if t["end"] <= current["start"] + 1e-3]
+        if not before:
+            break
+        blocker = before[-1]
+        remaining = [t for t in remaining if t["end"] < blocker["end"]]
+        path.append(blocker)
+
+    path.reverse()
+    return path
+
+
+def waterfall(timings: List[Dict], started: float) -> List[Dict]:
+    """Водопад узлов: смещения начала и конца относительно старта статьи."""
+    return [
+        {
+            "node": t["node"],
+            "offset": round(t["start"] - started, 3),
+            "duration": round(t["duration"], 3),
+            "attempts": t["attempts"],
+            "sleep": round(t["sleep"], 3),
+        }
+        for t in sorted(timings, key=lambda t: t["start"])
+    ]
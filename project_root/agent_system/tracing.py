@@ -0,0 +1,266 @@
+"""
+Трассировка запросов: спаны в формате OpenTelemetry (OTLP JSON) в локальный JSONL.
+
+Один trace_id покрывает запрос целиком: этапы /process_article, узлы графа,
+вызовы модели (с номером попытки saferun) и переход mcp_client → mcp_server.
+Текущий спан хранится в thread-local; в узлы графа (их выполняют потоки
+LangGraph) контекст передаётся через state["traceparent"], между
+процессами — в заголовке traceparent (W3C Trace Context).
+
+Трассировка включается TRACING=1. Каждый завершённый спан — одна строка
+TRACE_FILE; спаны копятся в памяти и дописываются пачкой (TRACE_FLUSH_SPANS
+штук или раз в TRACE_FLUSH_INTERVAL секунд), а файл больше TRACE_MAX_BYTES
+переименовывается в TRACE_FILE.1. Медленный запрос разбирается по trace_id:
+    grep <trace_id> traces.jsonl*
+"""
+
+import atexit
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+TRACING_ENABLED = os.getenv("TRACING", "0") == "1"
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+TRACE_FLUSH_SPANS = int(os.getenv("TRACE_FLUSH_SPANS", 200))
+TRACE_FLUSH_INTERVAL = float(os.getenv("TRACE_FLUSH_INTERVAL", 2))
+# Размер файла, после которого он сменяется (храним текущий и один предыдущий)
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", 50 * 1024 * 1024))
+
+SPAN_KINDS = ("INTERNAL", "SERVER", "CLIENT")
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+_local = threading.local()
+# Трасса, над которой сейчас работает поток (ident -> trace_id): по ней
+# профайлер запроса отбирает потоки своего запроса
+_thread_traces = {}
+_buffer = []
+_buffer_lock = threading.Lock()
+_last_flush = [time.time()]
+_export_lock = threading.Lock()
+_service = {"name": os.getenv("TRACE_SERVICE_NAME", "article-api")}
+
+
+class Span:
+    """Спан: операция с началом, концом, атрибутами и статусом."""
+
+    def __init__(self, name: str, trace_id: str, parent_id: str = None, kind: str = "INTERNAL",
+                 attributes: dict = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.start = time.time_ns()
+        self.end = None
+        self.error = None
+        # Спан, который был текущим до этого (восстанавливается при закрытии)
+        self.previous = None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def traceparent(self) -> str:
+        """Заголовок W3C traceparent для дочерних операций."""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_otel(self) -> dict:
+        """Спан в формате OTLP JSON."""
+        span = {
+            "resource": {"attributes": [_attribute("service.name", _service["name"])]},
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": f"SPAN_KIND_{self.kind}",
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(self.end),
+            "attributes": [_attribute(k, v) for k, v in self.attributes.items() if v is not None],
+            "status": ({"code": "STATUS_CODE_ERROR", "message": self.error}
+                       if self.error is not None else {"code": "STATUS_CODE_OK"}),
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+def parse_traceparent(header: str):
+    """(trace_id, span_id) из заголовка traceparent или None, если он некорректен."""
+    match = _TRACEPARENT.match((header or "").strip().lower())
+    if not match or match.group(1) == "0" * 32:
+        return None
+    return match.group(1), match.group(2)
+
+
+def current_span() -> Span:
+    """Текущий спан потока или None."""
+    return getattr(_local, "span", None)
+
+
+def _set_current(span: Span):
+    _local.span = span
+    if span is None:
+        _thread_traces.pop(threading.get_ident(), None)
+    else:
+        _thread_traces[threading.get_ident()] = span.trace_id
+
+
+def thread_traces() -> dict:
+    """Снимок {ident потока: trace_id его текущего спана}."""
+    return dict(_thread_traces)
+
+
+def current_traceparent() -> str:
+    """traceparent текущего спана или None."""
+    span = current_span()
+    return span.traceparent() if span is not None else None
+
+
+def open_span(name: str, parent=None, kind: str = "INTERNAL", **attributes) -> Span:
+    """
+    Начинает спан и делает его текущим (закрывается close_span).
+
+    Args:
+        parent: Span, заголовок traceparent или None — тогда текущий спан потока,
+            а если его нет, начинается новая трасса
+    """
+    if kind not in SPAN_KINDS:
+        raise ValueError(f"Неизвестный вид спана: {kind}")
+    if parent is None:
+        parent = current_span()
+    if isinstance(parent, Span):
+        trace_id, parent_id = parent.trace_id, parent.span_id
+    else:
+        trace_id, parent_id = parse_traceparent(parent) or (uuid.uuid4().hex, None)
+
+    span = Span(name, trace_id, parent_id, kind, attributes)
+    span.previous = current_span()
+    _set_current(span)
+    return span
+
+
+def close_span(span: Span, error: Exception = None):
+    """Завершает спан, возвращает предыдущий текущий спан и выгружает его."""
+    span.end = time.time_ns()
+    if error is not None:
+        span.error = f"{type(error).__name__}: {error}"
+    _set_current(span.previous)
+    export(span)
+
+
+@contextmanager
+def start_span(name: str, parent=None, kind: str = "INTERNAL", **attributes):
+    """Спан на время блока; исключение блока помечает спан ошибкой."""
+    span = open_span(name, parent, kind, **attributes)
+    try:
+        yield span
+    except BaseException as e:
+        close_span(span, e)
+        raise
+    close_span(span)
+
+
+def export(span: Span):
+    """Ставит спан в очередь на запись в TRACE_FILE (пачкой, см. flush)."""
+    if not TRACING_ENABLED:
+        return
+    line = json.dumps(span.to_otel(), ensure_ascii=False) + "\n"
+    with _buffer_lock:
+        _buffer.append(line)
+        due = len(_buffer) >= TRACE_FLUSH_SPANS or time.time() - _last_flush[0] >= TRACE_FLUSH_INTERVAL
+    if due:
+        flush()
+
+
+def flush():
+    """Дописывает накопленные спаны в TRACE_FILE, сменяя файл по TRACE_MAX_BYTES."""
+    with _buffer_lock:
+        lines = _buffer[:]
+        del _buffer[:]
+        _last_flush[0] = time.time()
+    if not lines:
+        return
+    with _export_lock:
+        try:
+            if os.path.getsize(TRACE_FILE) >= TRACE_MAX_BYTES:
+                os.replace(TRACE_FILE, TRACE_FILE + ".1")
+        except OSError:
+            pass
+        with open(TRACE_FILE, "a", encoding="utf-8") as f:
+            f.writelines(lines)
+
+
+atexit.register(flush)
+
+
+def inject(headers: dict = None) -> dict:
+    """Заголовки исходящего запроса с traceparent текущего спана."""
+    headers = dict(headers or {})
+    traceparent = current_traceparent()
+    if traceparent:
+        headers["traceparent"] = traceparent
+    return headers
+
+
+def in_trace_context(fn):
+    """Привязывает функцию к текущему спану, чтобы спаны из другого потока попали в ту же трассу."""
+    span = current_span()
+
+    def bound(*args, **kwargs):
+        previous = current_span()
+        _set_current(span)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _set_current(previous)
+
+    return bound
+
+
+def init_tracing(app, service: str):
+    """
+    Подключает к Flask-приложению серверный спан на каждый запрос;
+    родитель берётся из входящего заголовка traceparent.
+    """
+    from flask import g, request
+
+    _service["name"] = service
+
+    @app.before_request
+    def _open_request_span():
+        rule = request.url_rule.rule if request.url_rule is not None else request.path
+        g.trace_span = open_span(
+            f"{request.method} {rule}",
+            parent=request.headers.get("traceparent"),
+            kind="SERVER",
+            **{"http.method": request.method, "http.route": rule}
+        )
+
+    @app.after_request
+    def _tag_response(response):
+        span = getattr(g, "trace_span", None)
+        if span is not None:
+            span.set_attribute("http.status_code", response.status_code)
+            response.headers["traceparent"] = span.traceparent()
+        return response
+
+    @app.teardown_request
+    def _close_request_span(error=None):
+        span = g.pop("trace_span", None)
+        if span is not None:
+            close_span(span, error)
@@ -0,0 +1,89 @@
+"""LRU-кэш прочитанных статей, ограниченный по размеру в байтах."""
+
+import json
+import threading
+from collections import OrderedDict
+
+
+class ArticleCache:
+    """Потокобезопасный LRU-кэш со счётчиками попаданий, промахов и вытеснений."""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()  # key -> (value, size)
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _sizeof(value) -> int:
+        """Оценка размера значения в байтах (по его JSON-представлению)."""
+        return len(json.dumps(value, ensure_ascii=False).encode('utf-8'))
+
+    def get(self, key):
+        """Возвращает значение из кэша или None."""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, value):
+        """Кладёт значение в кэш, вытесняя самые старые записи при переполнении."""
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._size -= old[1]
+
+            self._items[key] = (value, size)
+            self._size += size
+
+            while self._size > self.max_bytes:
+                _, (_, evicted_size) = self._items.popitem(last=False)
+                self._size -= evicted_size
+                self.evictions += 1
+
+    def get_or_load(self, key, loader):
+        """
+        Read-through: возвращает значение из кэша или загружает его через loader.
+
+        Пустые результаты (None) не кэшируются.
+        """
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            if value is not None:
+                self.put(key, value)
+        return value
+
+    def invalidate(self, predicate=None):
+        """Удаляет записи, для ключей которых predicate(key) истинно (или все)."""
+        with self._lock:
+            keys = [k for k in self._items if predicate is None or predicate(k)]
+            for key in keys:
+                _, size = self._items.pop(key)
+                self._size -= size
+
+    def stats(self) -> dict:
+        """Счётчики и заполненность кэша."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0
+            }
@@ -8,48 +8,162 @@ import sys
 import time
 import json
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional
 import statistics
+import random
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import glob
 
 # Добавляем путь к модулям
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'agent_system'))
 
-from agent_system.graph_orchestrator import create_multi_agent_graph
+from agent_system.graph_orchestrator import (
+    create_multi_agent_graph, build_initial_state, revision_stats, token_summary
+)
+from agent_system.revision import revision_summary
+from agent_system.candidates import candidate_summary
+from agent_system.resilience import is_rate_limit, resilience_stats
+from agent_system.cassette import configure_cassette
+from agent_system.timings import critical_path, waterfall
+from agent_system.profiling import SamplingProfiler, save_profile
+from compare_reports import percentile
 
 # Загрузка переменных окружения
 load_dotenv()
 
+# Колено кривой нагрузки: рост пропускной способности меньше этой доли
+KNEE_MIN_GAIN = 0.1
+
 
 # ==================== МЕТРИКИ ====================
 
 class MetricsCollector:
     def __init__(self):
         self.runs: List[Dict] = []
+        self.load_levels: List[Dict] = []
 
     def add_run(self, run_data: Dict):
         """Добавляет результат запуска"""
         self.runs.append(run_data)
 
+    def add_load_level(self, level: Dict):
+        """Добавляет итог одного уровня нагрузки (см. run_load_level)"""
+        self.load_levels.append(level)
+
     def calculate_statistics(self) -> Dict:
         """Вычисляет статистику по всем запускам"""
         if not self.runs:
             return {}
 
-        latencies = [r['latency'] for r in self.runs if 'latency' in r and r['status'] == 'success']
-        tokens = [r['total_tokens'] for r in self.runs if 'total_tokens' in r and r['status'] == 'success']
         errors = [r for r in self.runs if r.get('status') == 'error']
 
-        return {
+        stats = {
             'total_runs': len(self.runs),
             'successful_runs': len(self.runs) - len(errors),
             'error_rate': len(errors) / len(self.runs) * 100 if self.runs else 0,
+            **self._summarize(self.runs),
+            'errors': errors
+        }
+
+        # Разбивка по уровням обработки (fast / standard / thorough)
+        tiers = sorted({r.get('tier', 'standard') for r in self.runs})
+        if len(tiers) > 1:
+            stats['by_tier'] = {
+                tier: self._summarize([r for r in self.runs if r.get('tier', 'standard') == tier])
+                for tier in tiers
+            }
+
+        if self.load_levels:
+            stats['load'] = self._summarize_load()
+
+        return stats
+
+    def _summarize_load(self) -> Dict:
+        """Пропускная способность и перцентили по уровням нагрузки, колено кривой"""
+        levels = []
+        for level in self.load_levels:
+            runs = [r for r in self.runs if r.get('load_level') == level['name']]
+            ok = [r for r in runs if r['status'] == 'success']
+            summary = self._summarize(runs)
+            levels.append({
+                **level,
+                'completed': len(ok),
+                'errors': len(runs) - len(ok),
+                'rate_limited': sum(1 for r in runs if r.get('rate_limited')),
+                'throughput_per_min': len(ok) / level['wall_time'] * 60 if level['wall_time'] else 0,
+                'latency': summary['latency'],
+            })
+
+        # Колено ищется на каждой кривой отдельно: по числу воркеров при
+        # фиксированном темпе и по темпу при фиксированном числе воркеров
+        knees = []
+        for sweep, fixed in (('concurrency', 'rate_per_min'), ('rate_per_min', 'concurrency')):
+            curves = {}
+            for level in levels:
+                if level[sweep] is not None:
+                    curves.setdefault((level['tier'], level[fixed]), []).append(level)
+            for (tier, fixed_value), curve in curves.items():
+                knee = self._find_knee(sorted(curve, key=lambda level: level[sweep]))
+                if knee:
+                    knees.append({'tier': tier, 'sweep': sweep, fixed: fixed_value, 'level': knee})
+
+        return {'levels': levels, 'knee': knees}
+
+    @staticmethod
+    def _find_knee(curve: List[Dict]) -> Optional[str]:
+        """
+        Колено кривой: последний уровень нагрузки, после которого её рост почти
+        не даёт прироста пропускной способности (обычно упираемся в лимиты
+        GigaChat и повторы после 429). None — колена нет или точек меньше двух.
+        """
+        for prev, cur in zip(curve, curve[1:]):
+            gain = (cur['throughput_per_min'] - prev['throughput_per_min']) / prev['throughput_per_min'] \
+                if prev['throughput_per_min'] else 0
+            if gain < KNEE_MIN_GAIN:
+                return prev['name']
+        return None
+
+    def _summarize(self, runs: List[Dict]) -> Dict:
+        """Latency и токены по успешным запускам"""
+        latencies = [r['latency'] for r in runs if 'latency' in r and r['status'] == 'success']
+        tokens = [r['total_tokens'] for r in runs if 'total_tokens' in r and r['status'] == 'success']
+
+        # Стоимость ревизий по режимам (full / delta)
+        revision_cost = {}
+        for r in runs:
+            for mode, cost in (r.get('revision_cost') or {}).items():
+                total = revision_cost.setdefault(mode, {'revisions': 0, 'input_tokens': 0, 'latency': 0.0})
+                for key in total:
+                    total[key] += cost[key]
+        for cost in revision_cost.values():
+            cost['input_tokens_per_revision'] = cost['input_tokens'] / cost['revisions'] if cost['revisions'] else 0
+            cost['latency_per_revision'] = cost['latency'] / cost['revisions'] if cost['revisions'] else 0
+
+        # Токены по агентам (usage провайдера)
+        tokens_by_agent = {}
+        for r in runs:
+            for agent, usage in ((r.get('tokens') or {}).get('by_agent') or {}).items():
+                total = tokens_by_agent.setdefault(agent, {'calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0})
+                for key in total:
+                    total[key] += usage[key]
+
+        # Best-of-N: лишние вызовы и токены кандидатов
+        candidates = {'calls': 0, 'extra_tokens': 0}
+        for r in runs:
+            for key in candidates:
+                candidates[key] += (r.get('candidates') or {}).get(key, 0)
+
+        return {
+            'runs': len(runs),
+            'revision_cost': revision_cost,
+            'candidates': candidates,
+            'nodes': self._summarize_nodes(runs),
             'latency': {
                 'mean': statistics.mean(latencies) if latencies else 0,
                 'median': statistics.median(latencies) if latencies else 0,
-                'p95': self._percentile(latencies, 0.95) if latencies else 0,
-                'p99': self._percentile(latencies, 0.99) if latencies else 0,
+                'p95': percentile(latencies, 0.95) if latencies else 0,
+                'p99': percentile(latencies, 0.99) if latencies else 0,
                 'min': min(latencies) if latencies else 0,
                 'max': max(latencies) if latencies else 0,
             },
@@ -59,18 +173,34 @@ class MetricsCollector:
                 'total': sum(tokens) if tokens else 0,
                 'min': min(tokens) if tokens else 0,
                 'max': max(tokens) if tokens else 0,
+                'by_agent': tokens_by_agent,
             },
-            'errors': errors
         }
 
-    @staticmethod
-    def _percentile(data: List[float], percentile: float) -> float:
-        """Вычисляет перцентиль"""
-        if not data:
-            return 0
-        sorted_data = sorted(data)
-        index = int(len(sorted_data) * percentile)
-        return sorted_data[min(index, len(sorted_data) - 1)]
+    def _summarize_nodes(self, runs: List[Dict]) -> Dict:
+        """Перцентили времени по узлам графа и как часто узел на критическом пути"""
+        durations, attempts, sleeps, critical = {}, {}, {}, {}
+        for r in runs:
+            for t in r.get('node_timings') or []:
+                durations.setdefault(t['node'], []).append(t['duration'])
+                attempts[t['node']] = attempts.get(t['node'], 0) + t['attempts']
+                sleeps[t['node']] = sleeps.get(t['node'], 0.0) + t['sleep']
+            for node in set(step['node'] for step in r.get('critical_path') or []):
+                critical[node] = critical.get(node, 0) + 1
+
+        return {
+            node: {
+                'calls': len(values),
+                'attempts': attempts[node],
+                'sleep': sleeps[node],
+                'total': sum(values),
+                'median': statistics.median(values),
+                'p95': percentile(values, 0.95),
+                'max': max(values),
+                'critical_path_runs': critical.get(node, 0),
+            }
+            for node, values in sorted(durations.items())
+        }
 
     def print_report(self):
         """Выводит красивый отчёт"""
@@ -99,6 +229,47 @@ class MetricsCollector:
             print(f"  • Медиана: {stats['tokens']['median']:.0f}")
             print(f"  • Всего потрачено: {stats['tokens']['total']:,}")
             print(f"  • Min / Max: {stats['tokens']['min']:.0f} / {stats['tokens']['max']:.0f}")
+            for agent, usage in sorted(stats['tokens']['by_agent'].items(), key=lambda item: -item[1]['total_tokens']):
+                print(f"  • {agent}: {usage['total_tokens']:,} ({usage['prompt_tokens']:,} вход / "
+                      f"{usage['completion_tokens']:,} выход, вызовов {usage['calls']})")
+
+        if stats['revision_cost']:
+            print("\n🔁 Ревизии:")
+            for mode, cost in stats['revision_cost'].items():
+                print(f"  • {mode}: {cost['revisions']} ревизий, "
+                      f"≈{cost['input_tokens_per_revision']:.0f} токенов и "
+                      f"{cost['latency_per_revision']:.2f} сек на ревизию")
+
+        if stats['candidates']['calls']:
+            print("\n🎯 Best-of-N кандидаты:")
+            print(f"  • Вызовов генераторов: {stats['candidates']['calls']}")
+            print(f"  • Лишних токенов: ≈{stats['candidates']['extra_tokens']:,}")
+
+        if stats['nodes']:
+            print("\n🧩 По узлам графа (P50 / P95 / всего, на критическом пути):")
+            for node, node_stats in sorted(stats['nodes'].items(), key=lambda item: -item[1]['total']):
+                print(f"  • {node}: {node_stats['median']:.2f} / {node_stats['p95']:.2f} / {node_stats['total']:.1f} сек, "
+                      f"вызовов {node_stats['calls']}, попыток {node_stats['attempts']}, "
+                      f"пауз {node_stats['sleep']:.1f} сек, на критическом пути в {node_stats['critical_path_runs']} запусках")
+
+        if stats.get('by_tier'):
+            print("\n🎚️  По уровням обработки:")
+            for tier, tier_stats in stats['by_tier'].items():
+                print(f"  • {tier}: {tier_stats['runs']} запусков, "
+                      f"latency P50 {tier_stats['latency']['median']:.2f} / P95 {tier_stats['latency']['p95']:.2f} сек, "
+                      f"токенов в среднем {tier_stats['tokens']['mean']:.0f}")
+
+        if stats.get('load'):
+            print("\n🚦 Нагрузка:")
+            for level in stats['load']['levels']:
+                print(f"  • {level['name']}: {level['throughput_per_min']:.2f} статей/мин, "
+                      f"P50 {level['latency']['median']:.2f} / P95 {level['latency']['p95']:.2f} / "
+                      f"P99 {level['latency']['p99']:.2f} сек, ошибок {level['errors']} "
+                      f"(429: {level['rate_limited']}), повторов {level['retries']}")
+            for knee in stats['load']['knee']:
+                growing = "числа воркеров" if knee['sweep'] == 'concurrency' else "темпа"
+                print(f"  • Колено кривой: {knee['level']} — дальше рост {growing} "
+                      "не увеличивает пропускную способность")
 
         if stats['errors']:
             print(f"\n❌ Ошибки ({len(stats['errors'])}):")
@@ -156,20 +327,182 @@ def load_articles_from_folder(folder_path: str = 'test_articles') -> List[Dict[s
 
 # ==================== ЗАПУСК БЕНЧМАРКА ====================
 
-def run_benchmark(num_articles: int = None):
-    """Запускает бенчмарк на статьях из папки"""
+def benchmark_article(graph, article: Dict, idx: int, total: int, tier: str = 'standard',
+                      revision_mode: str = None, profile: bool = False) -> Dict:
+    """
+    Обрабатывает одну статью графом и возвращает данные запуска.
+
+    С profile статья обрабатывается под сэмплирующим профайлером:
+    collapsed stacks сохраняются в PROFILE_DIR, сводка — в run_data['profile'].
+    """
+    print(f"\n{'─' * 80}")
+    print(f"📄 [{tier}] Статья {idx}/{total}: {article['filename']}")
+    print(f"📝 {article['title'][:70]}...")
+    print(f"{'─' * 80}")
+
+    profiler = SamplingProfiler().start() if profile else None
+    start_time = time.time()
+
+    try:
+        try:
+            initial_state = build_initial_state(article['text'], revision_mode=revision_mode, tier=tier)
+
+            # Запускаем граф
+            final_state = graph.invoke(initial_state)
+        finally:
+            report = profiler.stop() if profiler else None
+
+        latency = time.time() - start_time
+
+        # Токены по usage провайдера для каждого вызова модели (включая
+        # системные промпты, критиков, ревизии и кандидатов)
+        tokens = token_summary(final_state)
+        total_tokens = tokens['total']['total_tokens']
+        candidates = candidate_summary(final_state)
+
+        # Тайминги узлов: водопад и критический путь статьи
+        timings = final_state.get('node_timings') or []
+        path = critical_path(timings)
+
+        run_data = {
+            'article_id': idx,
+            'filename': article['filename'],
+            'title': article['title'],
+            'tier': tier,
+            'status': 'success',
+            'started_at': start_time,
+            'latency': latency,
+            'total_tokens': total_tokens,
+            'tokens': tokens,
+            'revision_count': final_state.get('revision_count', 0),
+            'revisions': revision_stats(final_state),
+            'revision_cost': revision_summary(final_state),
+            'candidates': candidates,
+            'node_timings': waterfall(timings, start_time),
+            'critical_path': waterfall(path, start_time),
+            'results': {
+                'rubric': final_state.get('rubric_result_rubricator', '')[:100],
+                'keywords': final_state.get('rubric_result_keyword', '')[:100],
+                'summary': final_state.get('rubric_result_summariser', '')[:100],
+            }
+        }
+
+        print(f"✅ Успешно обработана за {latency:.2f}с ({total_tokens:,} токенов)")
+        print(f"   🏷️  Рубрика: {run_data['results']['rubric'][:60]}...")
+        if path:
+            print(f"   🧭 Критический путь: {' → '.join(step['node'] for step in path)}")
+        if report:
+            name = f"profile_{tier}_{idx}_{os.path.splitext(article['filename'])[0]}"
+            run_data['profile'] = save_profile(report, name)
+            print(f"   🔬 Профиль: {run_data['profile']['file']} "
+                  f"(пик памяти {run_data['profile']['peak_memory_mb']} МБ)")
+
+    except Exception as e:
+        latency = time.time() - start_time
+        error_msg = str(e)
+
+        run_data = {
+            'article_id': idx,
+            'filename': article['filename'],
+            'title': article['title'],
+            'tier': tier,
+            'status': 'error',
+            'started_at': start_time,
+            'latency': latency,
+            'error_message': error_msg,
+            'rate_limited': is_rate_limit(e)
+        }
+
+        print(f"❌ Ошибка: {error_msg[:150]}")
+
+    return run_data
+
+
+def run_load_level(graph, articles: List[Dict], collector: MetricsCollector, tier: str,
+                   concurrency: int, rate: float = None, requests: int = None,
+                   revision_mode: str = None) -> Dict:
+    """
+    Один уровень нагрузки: concurrency воркеров обрабатывают requests статей.
+
+    Без rate — закрытая модель: каждый воркер берёт следующую статью сразу
+    после предыдущей. С rate (статей в минуту) — открытая модель: статьи
+    приходят пуассоновским потоком независимо от того, успевает ли система,
+    а latency считается от момента прихода (включая ожидание в очереди).
+    """
+    requests = requests or len(articles)
+    name = f"{tier}/c{concurrency}" + (f"/r{rate:g}" if rate else "")
+    retries_before = resilience_stats()['counters'].get('retries', 0)
+
+    print(f"\n🚦 Уровень нагрузки {name}: {requests} статей, {concurrency} воркеров")
+
+    def process(idx: int, arrived: float = None):
+        article = articles[idx % len(articles)]
+        run_data = benchmark_article(graph, article, idx + 1, requests, tier, revision_mode)
+        run_data['load_level'] = name
+        # В открытой модели ожидание свободного воркера входит в latency
+        run_data['queue_wait'] = run_data['started_at'] - arrived if arrived else 0.0
+        run_data['latency'] += run_data['queue_wait']
+        collector.add_run(run_data)
+
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        arrival = started
+        for idx in range(requests):
+            if rate:
+                arrival += random.expovariate(rate / 60)
+                time.sleep(max(arrival - time.time(), 0))
+                pool.submit(process, idx, arrival)
+            else:
+                pool.submit(process, idx)
+    wall_time = time.time() - started
+
+    level = {
+        'name': name,
+        'tier': tier,
+        'concurrency': concurrency,
+        'rate_per_min': rate,
+        'requests': requests,
+        'wall_time': wall_time,
+        'retries': resilience_stats()['counters'].get('retries', 0) - retries_before,
+    }
+    collector.add_load_level(level)
+    return level
+
+
+def run_benchmark(num_articles: int = None, tiers: List[str] = None, revision_mode: str = None,
+                  candidates: int = None, concurrency: List[int] = None, rates: List[float] = None,
+                  requests: int = None, record: str = None, replay: str = None,
+                  replay_latency: str = 'original', profile: bool = False):
+    """
+    Запускает бенчмарк на статьях из папки для каждого уровня обработки.
+
+    Без concurrency статьи идут последовательно (latency одного потока).
+    С concurrency — режим нагрузки: перебор уровней параллелизма (и, если
+    заданы rates, частот прихода статей в минуту) с отчётом о пропускной
+    способности и колене кривой.
+
+    record/replay — путь к кассете вызовов модели: запись ответов GigaChat
+    или их воспроизведение (replay_latency: original или zero), чтобы две
+    версии кода сравнивались на одинаковых ответах модели.
+
+    profile — профилировать каждую статью (только последовательный режим:
+    профайлер снимает стеки всех потоков процесса).
+    """
+    tiers = tiers or ['standard']
 
     print("\n" + "🚀 ЗАПУСК БЕНЧМАРКА LLM-AS-A-JUDGE" + "\n")
     print(f"Время старта: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
     # Проверка AUTH KEY
-    auth_key = os.getenv('GIGACHAT_AUTH_KEY')
+    # С FAKE_GIGACHAT_URL агенты ходят в локальную заглушку (fake_gigachat.py) без ключа
+    # При воспроизведении кассеты модель не вызывается, ключ тоже не нужен
+    auth_key = os.getenv('GIGACHAT_AUTH_KEY') or ('fake' if os.getenv('FAKE_GIGACHAT_URL') or replay else None)
     if not auth_key:
-        print("❌ GIGACHAT_AUTH_KEY не найден в .env!")
+        print("❌ GIGACHAT_AUTH_KEY не найден в .env!")
         return
 
-    # Загрузка статей
-    print("\n📁 Загрузка статей из папки 'test_articles/'...")
+    # Загрузка статей
+    print("\n📁 Загрузка статей из папки 'test_articles/'...")
     articles = load_articles_from_folder()
 
     if not articles:
@@ -179,103 +512,48 @@ def run_benchmark(num_articles: int = None):
     if num_articles:
         articles = articles[:num_articles]
 
-    print(f"✅ Загружено {len(articles)} статей\n")
+    print(f"✅ Загружено {len(articles)} статей\n")
+
+    if record:
+        configure_cassette('record', record)
+        print(f"📼 Запись вызовов модели в кассету: {record}")
+    elif replay:
+        configure_cassette('replay', replay, latency=replay_latency)
+        print(f"📼 Воспроизведение кассеты: {replay} (задержка: {replay_latency})")
 
     # Инициализация
     collector = MetricsCollector()
 
-    try:
-        # Создаём граф один раз
-        print("🔧 Инициализация графа агентов...")
-        graph = create_multi_agent_graph(auth_key=auth_key)
-        print("✅ Граф создан успешно\n")
-    except Exception as e:
-        print(f"❌ Ошибка создания графа: {e}")
-        return
-
-    # Обработка статей
-    for idx, article in enumerate(articles, 1):
-        print(f"\n{'─' * 80}")
-        print(f"📄 Статья {idx}/{len(articles)}: {article['filename']}")
-        print(f"📝 {article['title'][:70]}...")
-        print(f"{'─' * 80}")
-
-        start_time = time.time()
-
-        initial_state = {
-            "article_text": article['text'],
-            "rubric_result_rubricator": "",
-            "rubric_result_keyword": "",
-            "rubric_result_normal": "",
-            "rubric_result_summariser": "",
-            "critique": "",
-            "critique_key": "",
-            "critique_sum": "",
-            "critique_nor": "",
-            "revision_count": 0,
-            "revision_count_key": 0,
-            "revision_count_sum": 0,
-            "revision_count_nor": 0,
-            "status": ["started"]
-        }
-
+    for tier in tiers:
         try:
-            # Запускаем граф
-            final_state = graph.invoke(initial_state)
-
-            latency = time.time() - start_time
-
-            # Примерный подсчёт токенов (длина текста / 4)
-            total_tokens = (
-                                   len(article['text']) +
-                                   len(final_state.get('rubric_result_rubricator', '')) +
-                                   len(final_state.get('rubric_result_keyword', '')) +
-                                   len(final_state.get('rubric_result_normal', '')) +
-                                   len(final_state.get('rubric_result_summariser', ''))
-                           ) // 4
-
-            run_data = {
-                'article_id': idx,
-                'filename': article['filename'],
-                'title': article['title'],
-                'status': 'success',
-                'latency': latency,
-                'total_tokens': total_tokens,
-                'revision_count': final_state.get('revision_count', 0),
-                'results': {
-                    'rubric': final_state.get('rubric_result_rubricator', '')[:100],
-                    'keywords': final_state.get('rubric_result_keyword', '')[:100],
-                    'summary': final_state.get('rubric_result_summariser', '')[:100],
-                }
-            }
-
-            collector.add_run(run_data)
-
-            print(f"✅ Успешно обработана за {latency:.2f}с (≈{total_tokens:,} токенов)")
-            print(f"   🏷️  Рубрика: {run_data['results']['rubric'][:60]}...")
-
+            # Создаём граф один раз на уровень
+            print(f"🔧 Инициализация графа агентов (уровень: {tier})...")
+            graph = create_multi_agent_graph(auth_key=auth_key, tier=tier, candidates=candidates)
+            print("✅ Граф создан успешно\n")
         except Exception as e:
-            latency = time.time() - start_time
-            error_msg = str(e)
-
-            run_data = {
-                'article_id': idx,
-                'filename': article['filename'],
-                'title': article['title'],
-                'status': 'error',
-                'latency': latency,
-                'error_message': error_msg
-            }
+            print(f"❌ Ошибка создания графа: {e}")
+            continue
+
+        if concurrency:
+            if profile:
+                print("⚠️ Профилирование доступно только без --concurrency, пропускаем")
+            for level in concurrency:
+                for rate in rates or [None]:
+                    run_load_level(graph, articles, collector, tier, level, rate, requests, revision_mode)
+            continue
 
-            collector.add_run(run_data)
+        # Обработка статей
+        for idx, article in enumerate(articles, 1):
+            collector.add_run(benchmark_article(graph, article, idx, len(articles), tier, revision_mode, profile))
 
-            print(f"❌ Ошибка: {error_msg[:150]}")
+            # Небольшая пауза между запросами
+            if idx < len(articles):
+                time.sleep(2)
 
-        # Небольшая пауза между запросами
-        if idx < len(articles):
-            time.sleep(2)
+    if record:
+        configure_cassette('off')
 
-    # Итоговый отчёт
+    # Итоговый отчёт
     collector.print_report()
 
 
@@ -286,8 +564,37 @@ if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description='Бенчмарк LLM-as-a-Judge системы')
     parser.add_argument('-n', '--num', type=int, default=None,
-                        help='Количество статей для обработки (по умолчанию: все)')
+                        help='Количество статей для обработки (по умолчанию: все)')
+    parser.add_argument('--tiers', type=str, default='standard',
+                        help='Уровни обработки через запятую: fast,standard,thorough (по умолчанию: standard)')
+
+    parser.add_argument('--revision-mode', choices=['full', 'delta'], default=None,
+                        help='Режим ревизий: full (весь текст заново) или delta (черновик + критика)')
+
+    parser.add_argument('--candidates', type=int, default=None,
+                        help='Best-of-N: число параллельных кандидатов на первом проходе ветки')
+
+    parser.add_argument('--concurrency', type=str, default=None,
+                        help='Режим нагрузки: уровни параллелизма через запятую, например 1,2,4,8')
+    parser.add_argument('--rates', type=str, default=None,
+                        help='Открытая модель нагрузки: частоты прихода статей в минуту через запятую')
+    parser.add_argument('--requests', type=int, default=None,
+                        help='Статей на уровень нагрузки (по умолчанию: число статей)')
+
+    parser.add_argument('--record', type=str, default=None, metavar='CASSETTE',
+                        help='Записать все вызовы модели в кассету (например, run.jsonl.gz)')
+    parser.add_argument('--replay', type=str, default=None, metavar='CASSETTE',
+                        help='Воспроизвести вызовы модели из кассеты вместо GigaChat')
+    parser.add_argument('--replay-latency', choices=['original', 'zero'], default='original',
+                        help='Задержка при воспроизведении: как при записи или нулевая')
+    parser.add_argument('--profile', action='store_true',
+                        help='Профилировать каждую статью (collapsed stacks и пик памяти)')
 
     args = parser.parse_args()
 
-    run_benchmark(num_articles=args.num)
+    run_benchmark(num_articles=args.num, tiers=args.tiers.split(','), revision_mode=args.revision_mode,
+                  candidates=args.candidates,
+                  concurrency=[int(c) for c in args.concurrency.split(',')] if args.concurrency else None,
+                  rates=[float(r) for r in args.rates.split(',')] if args.rates else None,
+                  requests=args.requests, record=args.record, replay=args.replay,
+                  replay_latency=args.replay_latency, profile=args.profile)
@@ -0,0 +1,242 @@
+"""
+Сравнение отчётов бенчмарка (metrics_report_*.json).
+
+Первый отчёт — базовый, остальные сравниваются с ним. Запуски
+сопоставляются по уровню обработки и файлу статьи; для latency и токенов
+считается средняя разница по парам статей с бутстреп-доверительным
+интервалом, для ошибок — разница долей ошибок. Регрессия значима, если
+пар статей не меньше MIN_PAIRS и доверительный интервал целиком выше нуля,
+и превышает порог, если относительный рост больше заданного.
+
+Код возврата: 0 — регрессий сверх порогов нет, 1 — есть, 2 — нечего сравнивать.
+
+Запуск:
+    python compare_reports.py metrics_report_old.json metrics_report_new.json --max-latency-regression 10
+"""
+
+import json
+import random
+import statistics
+import sys
+from typing import Dict, List, Tuple
+
+BOOTSTRAP_RESAMPLES = 2000
+CONFIDENCE = 0.95
+# На меньшем числе пар бутстреп-интервал вырожден, и разница не считается значимой
+MIN_PAIRS = 5
+
+
+def percentile(data: List[float], q: float) -> float:
+    """
+    Квантиль с линейной интерполяцией между соседними значениями.
+
+    Общая реализация для отчётов бенчмарка (benchmark_metrics.py, microbench.py).
+    """
+    if not data:
+        return 0
+    sorted_data = sorted(data)
+    position = (len(sorted_data) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_data) - 1)
+    return sorted_data[lower] + (sorted_data[upper] - sorted_data[lower]) * (position - lower)
+
+
+def bootstrap_ci(values: List[float], rng: random.Random, resamples: int = BOOTSTRAP_RESAMPLES,
+                 confidence: float = CONFIDENCE) -> Tuple[float, float]:
+    """Бутстреп-доверительный интервал среднего (при n < 2 — вырожденный)."""
+    if len(values) < 2:
+        mean = values[0] if values else 0.0
+        return mean, mean
+    means = [
+        statistics.mean(rng.choices(values, k=len(values)))
+        for _ in range(resamples)
+    ]
+    alpha = (1 - confidence) / 2
+    return percentile(means, alpha), percentile(means, 1 - alpha)
+
+
+def is_significant(deltas: List[float], low: float) -> bool:
+    """Рост значим: пар достаточно и нижняя граница интервала выше нуля."""
+    return len(deltas) >= MIN_PAIRS and low > 0
+
+
+def load_report(path: str) -> Dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        report = json.load(f)
+    report['path'] = path
+    return report
+
+
+def group_runs(report: Dict) -> Dict[Tuple[str, str], List[Dict]]:
+    """Запуски по (уровень, файл); в режиме нагрузки у статьи несколько запусков."""
+    groups = {}
+    for run in report.get('runs', []):
+        key = (run.get('tier', 'standard'), run.get('filename', run.get('title', '?')))
+        groups.setdefault(key, []).append(run)
+    return groups
+
+
+def _mean_of(runs: List[Dict], field: str) -> float:
+    values = [r[field] for r in runs if r.get('status') == 'success' and field in r]
+    return statistics.mean(values) if values else None
+
+
+def _error_rate(runs: List[Dict]) -> float:
+    return sum(1 for r in runs if r.get('status') == 'error') / len(runs) if runs else 0.0
+
+
+def compare(base: Dict, other: Dict, rng: random.Random, resamples: int = BOOTSTRAP_RESAMPLES,
+            confidence: float = CONFIDENCE) -> Dict:
+    """
+    Сравнивает отчёт с базовым по общим статьям.
+
+    Returns:
+        {"pairs": N, "metrics": {метрика: {base, new, delta, delta_pct, ci, significant}}}
+    """
+    base_groups = group_runs(base)
+    other_groups = group_runs(other)
+    common = sorted(set(base_groups) & set(other_groups))
+
+    metrics = {}
+    for field in ('latency', 'total_tokens'):
+        pairs = []
+        for key in common:
+            old, new = _mean_of(base_groups[key], field), _mean_of(other_groups[key], field)
+            if old is not None and new is not None:
+                pairs.append((old, new))
+        if not pairs:
+            continue
+        deltas = [new - old for old, new in pairs]
+        base_mean = statistics.mean(old for old, _ in pairs)
+        low, high = bootstrap_ci(deltas, rng, resamples, confidence)
+        metrics[field] = {
+            'pairs': len(pairs),
+            'base': base_mean,
+            'new': statistics.mean(new for _, new in pairs),
+            'delta': statistics.mean(deltas),
+            'delta_pct': statistics.mean(deltas) / base_mean * 100 if base_mean else 0.0,
+            'ci': [low, high],
+            'base_p95': percentile([old for old, _ in pairs], 0.95),
+            'new_p95': percentile([new for _, new in pairs], 0.95),
+            'significant': is_significant(deltas, low),
+        }
+
+    if common:
+        # Ошибки: разница долей по статьям (бутстреп по статьям)
+        deltas = [_error_rate(other_groups[key]) - _error_rate(base_groups[key]) for key in common]
+        low, high = bootstrap_ci(deltas, rng, resamples, confidence)
+        metrics['error_rate'] = {
+            'pairs': len(common),
+            'base': statistics.mean(_error_rate(base_groups[key]) for key in common) * 100,
+            'new': statistics.mean(_error_rate(other_groups[key]) for key in common) * 100,
+            'delta': statistics.mean(deltas) * 100,
+            'ci': [low * 100, high * 100],
+            'significant': is_significant(deltas, low),
+        }
+
+    return {
+        'base': base['path'],
+        'new': other['path'],
+        'pairs': len(common),
+        'only_in_base': len(set(base_groups) - set(other_groups)),
+        'only_in_new': len(set(other_groups) - set(base_groups)),
+        'metrics': metrics,
+    }
+
+
+def find_regressions(comparison: Dict, thresholds: Dict[str, float]) -> List[str]:
+    """Значимые регрессии сверх порогов (latency/токены — в %, ошибки — в п.п.)."""
+    regressions = []
+    for field, limit in thresholds.items():
+        metric = comparison['metrics'].get(field)
+        if metric is None or limit is None or not metric['significant']:
+            continue
+        change = metric['delta'] if field == 'error_rate' else metric['delta_pct']
+        if change > limit:
+            unit = 'п.п.' if field == 'error_rate' else '%'
+            regressions.append(f"{field}: +{change:.1f} {unit} (порог {limit:g} {unit})")
+    return regressions
+
+
+def print_comparison(comparison: Dict, regressions: List[str]):
+    print("\n" + "=" * 80)
+    print(f"📊 {comparison['base']} → {comparison['new']}")
+    print("=" * 80)
+    print(f"  • Общих статей: {comparison['pairs']} "
+          f"(только в базовом: {comparison['only_in_base']}, только в новом: {comparison['only_in_new']})")
+    if comparison['pairs'] < MIN_PAIRS:
+        print(f"  ⚠️ Пар статей меньше {MIN_PAIRS}: разница не проверяется на значимость")
+
+    for field, metric in comparison['metrics'].items():
+        marker = "🔺" if metric['significant'] else "  "
+        if field == 'error_rate':
+            print(f"{marker}• Ошибки: {metric['base']:.1f}% → {metric['new']:.1f}% "
+                  f"(Δ {metric['delta']:+.1f} п.п., ДИ [{metric['ci'][0]:+.1f}; {metric['ci'][1]:+.1f}])")
+        else:
+            print(f"{marker}• {field}: {metric['base']:.2f} → {metric['new']:.2f} "
+                  f"(Δ {metric['delta']:+.2f}, {metric['delta_pct']:+.1f}%, "
+                  f"ДИ [{metric['ci'][0]:+.2f}; {metric['ci'][1]:+.2f}]), "
+                  f"P95 {metric['base_p95']:.2f} → {metric['new_p95']:.2f}")
+
+    if regressions:
+        print("\n❌ Регрессии сверх порогов:")
+        for regression in regressions:
+            print(f"  • {regression}")
+    else:
+        print("\n✅ Значимых регрессий сверх порогов нет")
+
+
+def main(argv: List[str] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Сравнение отчётов бенчмарка LLM-as-a-Judge')
+    parser.add_argument('reports', nargs='+', help='Отчёты metrics_report_*.json; первый — базовый')
+    parser.add_argument('--max-latency-regression', type=float, default=10.0,
+                        help='Допустимый рост средней latency, %% (по умолчанию: 10)')
+    parser.add_argument('--max-token-regression', type=float, default=10.0,
+                        help='Допустимый рост среднего числа токенов, %% (по умолчанию: 10)')
+    parser.add_argument('--max-error-rate-increase', type=float, default=5.0,
+                        help='Допустимый рост доли ошибок, п.п. (по умолчанию: 5)')
+    parser.add_argument('--confidence', type=float, default=CONFIDENCE,
+                        help='Уровень доверительного интервала (по умолчанию: 0.95)')
+    parser.add_argument('--resamples', type=int, default=BOOTSTRAP_RESAMPLES,
+                        help='Число бутстреп-выборок')
+    parser.add_argument('--seed', type=int, default=0, help='Seed бутстрепа (для воспроизводимости)')
+    parser.add_argument('--json', type=str, default=None, help='Сохранить сравнение в JSON-файл')
+    args = parser.parse_args(argv)
+
+    if len(args.reports) < 2:
+        print("❌ Нужно хотя бы два отчёта")
+        return 2
+
+    thresholds = {
+        'latency': args.max_latency_regression,
+        'total_tokens': args.max_token_regression,
+        'error_rate': args.max_error_rate_increase,
+    }
+
+    rng = random.Random(args.seed)
+    base = load_report(args.reports[0])
+    comparisons = []
+    failed = False
+    for path in args.reports[1:]:
+        comparison = compare(base, load_report(path), rng, args.resamples, args.confidence)
+        if not comparison['pairs']:
+            print(f"⚠️ В {path} нет статей, общих с {base['path']}")
+            return 2
+        regressions = find_regressions(comparison, thresholds)
+        comparison['regressions'] = regressions
+        print_comparison(comparison, regressions)
+        comparisons.append(comparison)
+        failed = failed or bool(regressions)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'thresholds': thresholds, 'comparisons': comparisons}, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Сравнение сохранено в: {args.json}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+"""
+Локальная заглушка GigaChat для бенчмарков и проверки оркестрации без сети.
+
+Отвечает на /api/v1/chat/completions в формате GigaChat (в т.ч. потоком SSE)
+правдоподобными шаблонными ответами: по системному промпту определяет агента,
+критикам возвращает APPROVED/REJECT с заданной долей одобрений. Задержка
+берётся из настраиваемого распределения, часть запросов завершается
+ошибками 429/5xx.
+
+Запуск:
+    python fake_gigachat.py --latency lognormal:1.5,0.5 --approve-ratio 0.7 --rate-limit-ratio 0.05
+    FAKE_GIGACHAT_URL=http://localhost:5003/api/v1 python benchmark_metrics.py
+"""
+
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+
+from flask import Flask, Response, request, jsonify
+
+from agent_system.sections import CHARS_PER_TOKEN
+
+app = Flask(__name__)
+
+FAKE_PORT = int(os.getenv("FAKE_GIGACHAT_PORT", 5003))
+# Распределение задержки: fixed:<сек>, uniform:<от>,<до>, exponential:<среднее>,
+# lognormal:<медиана>,<sigma>
+FAKE_LATENCY = os.getenv("FAKE_LATENCY", "lognormal:1.5,0.5")
+FAKE_APPROVE_RATIO = float(os.getenv("FAKE_APPROVE_RATIO", 0.7))
+FAKE_RATE_LIMIT_RATIO = float(os.getenv("FAKE_RATE_LIMIT_RATIO", 0.0))
+FAKE_SERVER_ERROR_RATIO = float(os.getenv("FAKE_SERVER_ERROR_RATIO", 0.0))
+FAKE_SEED = os.getenv("FAKE_SEED")
+# Сколько кусков отдавать в потоковом ответе
+STREAM_CHUNKS = 8
+
+_random = random.Random(int(FAKE_SEED) if FAKE_SEED else None)
+_random_lock = threading.Lock()
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+_WORD = re.compile(r"[А-Яа-яЁёA-Za-z][А-Яа-яЁёA-Za-z-]{5,}")
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+
+
+def _count(event: str):
+    with _stats_lock:
+        _stats[event] += 1
+
+
+def _roll() -> float:
+    with _random_lock:
+        return _random.random()
+
+
+def sample_latency(spec: str = None) -> float:
+    """Задержка ответа в секундах по описанию распределения."""
+    kind, _, params = (spec or FAKE_LATENCY).partition(":")
+    values = [float(v) for v in params.split(",") if v]
+    with _random_lock:
+        if kind == "fixed":
+            return values[0]
+        if kind == "uniform":
+            return _random.uniform(values[0], values[1])
+        if kind == "exponential":
+            return _random.expovariate(1 / values[0])
+        if kind == "lognormal":
+            return _random.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Неизвестное распределение задержки: {spec}")
+
+
+# ========== ШАБЛОННЫЕ ОТВЕТЫ ==========
+
+def classify(system: str) -> str:
+    """Определяет агента по системному промпту."""
+    if "Твой вердикт (JSON)" in system:
+        return "critic_joint"
+    if "APPROVED" in system:
+        return "critic"
+    if '"rubric"' in system and '"summary"' in system:
+        return "fast"
+    if "ключевых слов" in system:
+        return "keyword"
+    if "нормализованному виду" in system:
+        return "normal"
+    if "рубрикацию" in system:
+        return "rubricator"
+    return "summariser"
+
+
+def top_terms(text: str, limit: int = 12) -> list:
+    """Самые частые длинные слова текста — материал для ключевых слов и рубрик."""
+    counts = Counter(word.lower() for word in _WORD.findall(text))
+    return [word for word, _ in counts.most_common(limit)] or ["исследование"]
+
+
+def make_keywords(text: str) -> str:
+    return "\n".join(
+        f"{term} | {'прямое' if i < 6 else 'косвенное'} | {0.95 - i * 0.05:.2f}"
+        for i, term in enumerate(top_terms(text, 12))
+    )
+
+
+def make_summary(text: str, words: int = 200) -> str:
+    sentences = [s.strip() for s in _SENTENCE.split(text) if s.strip()]
+    summary = []
+    for sentence in sentences:
+        summary.append(sentence)
+        if len(" ".join(summary).split()) >= words:
+            break
+    return " ".join(summary)
+
+
+def make_rubric(text: str) -> str:
+    terms = top_terms(text, 6)
+    lines = ["1. Введение"]
+    for i, term in enumerate(terms[:4], 2):
+        lines.append(f"{i}. {term.capitalize()}")
+        lines.append(f"{i}.1. Методы: {term}")
+    lines.append(f"{len(terms[:4]) + 2}. Заключение")
+    return "\n".join(lines)
+
+
+def make_verdict() -> dict:
+    if _roll() < FAKE_APPROVE_RATIO:
+        return {"verdict": "APPROVED"}
+    return {"verdict": "REJECT", "critique": "Результат неполный: уточните терминологию и добавьте пропущенные аспекты."}
+
+
+def render(agent: str, system: str, user: str) -> str:
+    """Текст ответа для агента."""
+    text = user or system
+    if agent == "critic":
+        verdict = make_verdict()
+        return "APPROVED" if verdict["verdict"] == "APPROVED" else f"REJECT: 1) {verdict['critique']}"
+    if agent == "critic_joint":
+        branches = re.findall(r"^- (\w+) \(", system, re.MULTILINE)
+        return json.dumps({branch: make_verdict() for branch in branches}, ensure_ascii=False)
+    if agent == "fast":
+        return json.dumps({
+            "rubric": make_rubric(text),
+            "keywords": make_keywords(text).splitlines(),
+            "summary": make_summary(text)
+        }, ensure_ascii=False)
+    if agent == "keyword":
+        return make_keywords(text)
+    if agent == "normal":
+        return user
+    if agent == "rubricator":
+        return make_rubric(text)
+    return make_summary(text)
+
+
+def usage(messages: list, content: str) -> dict:
+    prompt_tokens = sum(len(m.get("content") or "") for m in messages) // CHARS_PER_TOKEN
+    completion_tokens = len(content) // CHARS_PER_TOKEN
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens
+    }
+
+
+# ========== ЭНДПОИНТЫ ==========
+
+@app.route('/api/v2/oauth', methods=['POST'])
+def oauth():
+    """Фиктивный токен (на случай, если клиент всё же пойдёт за авторизацией)."""
+    return jsonify({"access_token": "fake-token", "expires_at": int((time.time() + 3600) * 1000)})
+
+
+@app.route('/api/v1/models', methods=['GET'])
+def models():
+    return jsonify({"object": "list", "data": [{"id": "GigaChat", "object": "model", "owned_by": "fake"}]})
+
+
+@app.route('/api/v1/chat/completions', methods=['POST'])
+def chat_completions():
+    """Ответ в формате GigaChat: обычный JSON или поток SSE при stream=true."""
+    body = request.get_json(force=True)
+    messages = body.get("messages") or []
+    system = next((m.get("content") or "" for m in messages if m.get("role") == "system"), "")
+    user = "\n".join(m.get("content") or "" for m in messages if m.get("role") == "user")
+    agent = classify(system)
+    _count(f"requests_{agent}")
+
+    latency = sample_latency()
+
+    # Ошибки приходят после части задержки, как у перегруженного провайдера
+    roll = _roll()
+    if roll < FAKE_RATE_LIMIT_RATIO:
+        _count("errors_429")
+        time.sleep(latency / 4)
+        return jsonify({"status": 429, "message": "Too Many Requests"}), 429
+    if roll < FAKE_RATE_LIMIT_RATIO + FAKE_SERVER_ERROR_RATIO:
+        with _random_lock:
+            status = _random.choice((500, 502, 503))
+        _count(f"errors_{status}")
+        time.sleep(latency / 2)
+        return jsonify({"status": status, "message": "Internal Server Error"}), status
+
+    content = render(agent, system, user)
+    model = body.get("model") or "GigaChat"
+    created = int(time.time())
+    response_id = uuid.uuid4().hex
+
+    if not body.get("stream"):
+        time.sleep(latency)
+        return jsonify({
+            "id": response_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": usage(messages, content)
+        })
+
+    def events():
+        step = max(len(content) // STREAM_CHUNKS, 1)
+        pieces = [content[i:i + step] for i in range(0, len(content), step)] or [""]
+        for i, piece in enumerate(pieces):
+            time.sleep(latency / len(pieces))
+            chunk = {
+                "id": response_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"role": "assistant", "content": piece}}]
+            }
+            if i == len(pieces) - 1:
+                chunk["choices"][0]["finish_reason"] = "stop"
+                chunk["usage"] = usage(messages, content)
+            yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return Response(events(), mimetype='text/event-stream')
+
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    """Счётчики запросов по агентам и отданных ошибок."""
+    with _stats_lock:
+        counters = dict(_stats)
+    return jsonify({
+        "counters": counters,
+        "config": {
+            "latency": FAKE_LATENCY,
+            "approve_ratio": FAKE_APPROVE_RATIO,
+            "rate_limit_ratio": FAKE_RATE_LIMIT_RATIO,
+            "server_error_ratio": FAKE_SERVER_ERROR_RATIO
+        }
+    })
+
+
+@app.route('/health', methods=['GET'])
+def health():
+    return jsonify({"status": "ok"})
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Локальная заглушка GigaChat')
+    parser.add_argument('--port', type=int, default=FAKE_PORT)
+    parser.add_argument('--latency', type=str, default=FAKE_LATENCY,
+                        help='Распределение задержки: fixed:0.5, uniform:0.5,3, exponential:2, lognormal:1.5,0.5')
+    parser.add_argument('--approve-ratio', type=float, default=FAKE_APPROVE_RATIO,
+                        help='Доля вердиктов APPROVED у критиков')
+    parser.add_argument('--rate-limit-ratio', type=float, default=FAKE_RATE_LIMIT_RATIO,
+                        help='Доля ответов 429')
+    parser.add_argument('--server-error-ratio', type=float, default=FAKE_SERVER_ERROR_RATIO,
+                        help='Доля ответов 5xx')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    FAKE_LATENCY = args.latency
+    sample_latency()  # Проверяем описание распределения до запуска
+    FAKE_APPROVE_RATIO = args.approve_ratio
+    FAKE_RATE_LIMIT_RATIO = args.rate_limit_ratio
+    FAKE_SERVER_ERROR_RATIO = args.server_error_ratio
+    if args.seed is not None:
+        _random.seed(args.seed)
+
+    print(f"🧪 Заглушка GigaChat запущена на http://localhost:{args.port}/api/v1 "
+          f"(задержка {FAKE_LATENCY}, одобрений {FAKE_APPROVE_RATIO:.0%}, "
+          f"429 {FAKE_RATE_LIMIT_RATIO:.0%}, 5xx {FAKE_SERVER_ERROR_RATIO:.0%})")
+    app.run(host="0.0.0.0", port=args.port, debug=False, threaded=True)
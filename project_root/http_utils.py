@@ -0,0 +1,126 @@
+"""HTTP-утилиты для Flask-серверов: сжатие JSON-ответов и условные GET (ETag)."""
+
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Ответы меньше этого размера не сжимаем: выигрыш меньше накладных расходов
+MIN_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def choose_encoding(accept_encoding: str) -> str:
+    """
+    Выбирает кодировку сжатия по заголовку Accept-Encoding.
+
+    Args:
+        accept_encoding: Значение заголовка Accept-Encoding
+
+    Returns:
+        "br", "gzip" или "" (без сжатия)
+    """
+    accepted = {}
+    for part in accept_encoding.lower().split(','):
+        name, _, params = part.strip().partition(';')
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip()] = q
+
+    if brotli is not None and accepted.get('br', 0) > 0:
+        return "br"
+    if accepted.get('gzip', 0) > 0:
+        return "gzip"
+    return ""
+
+
+def compress_response(response):
+    """
+    after_request-хук: сжимает JSON-ответ, если клиент это поддерживает.
+
+    Args:
+        response: Ответ Flask
+
+    Returns:
+        Тот же ответ, при необходимости сжатый
+    """
+    if (response.direct_passthrough
+            or response.is_streamed
+            or response.status_code < 200
+            or response.status_code >= 300
+            or response.mimetype != 'application/json'
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    encoding = choose_encoding(request.headers.get('Accept-Encoding', ''))
+    if not encoding:
+        return response
+
+    data = response.get_data()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return response
+
+    if encoding == "br":
+        compressed = brotli.compress(data, quality=BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_compression(app):
+    """Подключает сжатие JSON-ответов к приложению Flask."""
+    app.after_request(compress_response)
+
+
+def make_etag(*parts) -> str:
+    """
+    Строит слабый ETag из дешёвых признаков версии (max id, count, created_at).
+
+    Returns:
+        Значение для заголовка ETag
+    """
+    return 'W/"' + '-'.join(str(p) for p in parts) + '"'
+
+
+def etag_matches(etag: str) -> bool:
+    """Проверяет, совпадает ли ETag с заголовком If-None-Match запроса."""
+    if_none_match = request.headers.get('If-None-Match', '')
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    # Сравнение слабое: W/"x" и "x" считаются одинаковыми
+    bare = etag[2:] if etag.startswith('W/') else etag
+    return any((c[2:] if c.startswith('W/') else c) == bare for c in candidates)
+
+
+def with_etag(response, etag: str):
+    """Добавляет ETag к ответу (кортеж (response, status) или Response)."""
+    if isinstance(response, tuple):
+        response[0].headers['ETag'] = etag
+    else:
+        response.headers['ETag'] = etag
+    return response
+
+
+def not_modified(etag: str):
+    """Пустой ответ 304 Not Modified с заданным ETag."""
+    return '', 304, {'ETag': etag}
@@ -1,40 +1,53 @@
 """HTTP MCP клиент."""
+import time
+
 import requests
 
+from agent_system.metrics import MCP_SAVE_SECONDS
+from agent_system.tracing import inject, start_span
+
 MCP_URL = "http://localhost:5002"
 
 def save_article_via_mcp(article_text: str, rubric: str = "", keywords: str = "", summary: str = "", normalized_text: str = ""):
     """Сохранение статьи через HTTP MCP сервер."""
+    started = time.perf_counter()
+    outcome = "error"
     try:
-        response = requests.post(
-            f"{MCP_URL}/save_article",
-            json={
-                "article_text": article_text,
-                "rubric": rubric,
-                "keywords": keywords,
-                "summary": summary,
-                "normalized_text": normalized_text
-            },
-            timeout=10
-        )
+        with start_span("mcp_client.save_article", kind="CLIENT"):
+            response = requests.post(
+                f"{MCP_URL}/save_article",
+                json={
+                    "article_text": article_text,
+                    "rubric": rubric,
+                    "keywords": keywords,
+                    "summary": summary,
+                    "normalized_text": normalized_text
+                },
+                headers=inject(),
+                timeout=10
+            )
 
         if response.status_code == 200:
+            outcome = "ok"
             return response.json().get('article_id')
         else:
             print(f"⚠️  Ошибка MCP: {response.text}")
             return None
     except requests.exceptions.ConnectionError:
+        outcome = "unavailable"
         print("❌ MCP сервер недоступен! Запустите: python mcp_server.py")
         return None
     except Exception as e:
         print(f"❌ Ошибка MCP: {e}")
         return None
+    finally:
+        MCP_SAVE_SECONDS.observe(time.perf_counter() - started, outcome=outcome)
 
 
 def get_article_via_mcp(article_id: int):
     """Получение статьи по ID из MCP."""
     try:
-        response = requests.get(f"{MCP_URL}/get_article/{article_id}", timeout=5)
+        response = requests.get(f"{MCP_URL}/get_article/{article_id}", headers=inject(), timeout=5)
 
         if response.status_code == 200:
             return response.json().get('article')
@@ -46,18 +59,35 @@ def get_article_via_mcp(article_id: int):
 
 
 def get_all_articles_via_mcp(limit: int = 100):
-    """Получение всех статей из MCP."""
+    """Получение всех статей из MCP; None при ошибке (не путать с пустым списком)."""
     try:
         response = requests.get(
             f"{MCP_URL}/list_articles",
             params={"limit": limit},
+            headers=inject(),
             timeout=10
         )
 
         if response.status_code == 200:
             return response.json().get('articles', [])
         else:
-            return []
+            print(f"⚠️  Ошибка MCP: {response.text}")
+            return None
     except Exception as e:
         print(f"❌ Ошибка MCP: {e}")
-        return []
+        return None
+
+
+def get_articles_version_via_mcp():
+    """Получение версии списка статей (max_id, count) из MCP без чтения строк."""
+    try:
+        response = requests.get(f"{MCP_URL}/articles_version", headers=inject(), timeout=5)
+
+        if response.status_code == 200:
+            data = response.json()
+            return data.get('max_id', 0), data.get('count', 0)
+        else:
+            return None
+    except Exception as e:
+        print(f"❌ Ошибка MCP: {e}")
+        return None
@@ -2,12 +2,20 @@
 
 from flask import Flask, request, jsonify
 from flask_cors import CORS
+import os
 import sqlite3
 
+from http_utils import init_compression, make_etag, etag_matches, with_etag, not_modified
+from agent_system.metrics import init_metrics, DB_WRITE_SECONDS
+from agent_system.tracing import init_tracing, start_span
+
 app = Flask(__name__)
 CORS(app)
+init_compression(app)
+init_metrics(app, "mcp")
+init_tracing(app, "mcp-server")
 
-DB_FILE = "articles.db"
+DB_FILE = os.getenv("MCP_DB_FILE", "articles.db")
 
 # Инициализация БД
 conn = sqlite3.connect(DB_FILE)
@@ -38,31 +46,43 @@ conn.close()
 print("✅ БД инициализирована")
 
 
+def get_articles_version(cursor) -> tuple:
+    """
+    Дешёвая версия таблицы статей: (max id, количество строк).
+
+    Строки не изменяются после вставки, поэтому этой пары достаточно,
+    чтобы понять, изменился ли список.
+    """
+    cursor.execute("SELECT COALESCE(MAX(id), 0), COUNT(*) FROM articles")
+    return cursor.fetchone()
+
+
 @app.route('/save_article', methods=['POST'])
 def save_article():
     """Сохраняет статью в БД."""
     try:
         data = request.json
 
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
+        with DB_WRITE_SECONDS.time(), start_span("sqlite.insert"):
+            conn = sqlite3.connect(DB_FILE)
+            cursor = conn.cursor()
 
-        cursor.execute(
-            """INSERT INTO articles
-                   (article_text, rubric, keywords, summary, normalized_text)
-               VALUES (?, ?, ?, ?, ?)""",
-            (
-                data.get("article_text", ""),
-                data.get("rubric", ""),
-                data.get("keywords", ""),
-                data.get("summary", ""),
-                data.get("normalized_text", "")
+            cursor.execute(
+                """INSERT INTO articles
+                       (article_text, rubric, keywords, summary, normalized_text)
+                   VALUES (?, ?, ?, ?, ?)""",
+                (
+                    data.get("article_text", ""),
+                    data.get("rubric", ""),
+                    data.get("keywords", ""),
+                    data.get("summary", ""),
+                    data.get("normalized_text", "")
+                )
             )
-        )
 
-        conn.commit()
-        article_id = cursor.lastrowid
-        conn.close()
+            conn.commit()
+            article_id = cursor.lastrowid
+            conn.close()
 
         return jsonify({"status": "success", "article_id": article_id}), 200
 
@@ -77,12 +97,24 @@ def get_article(article_id):
         conn = sqlite3.connect(DB_FILE)
         cursor = conn.cursor()
 
+        # Сначала проверяем версию строки, не читая её текст целиком
+        cursor.execute("SELECT created_at FROM articles WHERE id = ?", (article_id,))
+        version = cursor.fetchone()
+        if version is None:
+            conn.close()
+            return jsonify({"status": "error", "message": "Article not found"}), 404
+
+        etag = make_etag("article", article_id, version[0])
+        if etag_matches(etag):
+            conn.close()
+            return not_modified(etag)
+
         cursor.execute("SELECT * FROM articles WHERE id = ?", (article_id,))
         row = cursor.fetchone()
         conn.close()
 
         if row:
-            return jsonify({
+            return with_etag(jsonify({
                 "status": "success",
                 "article": {
                     "id": row[0],
@@ -93,7 +125,7 @@ def get_article(article_id):
                     "normalized_text": row[5],
                     "created_at": row[6]
                 }
-            }), 200
+            }), etag), 200
         else:
             return jsonify({"status": "error", "message": "Article not found"}), 404
 
@@ -110,6 +142,12 @@ def list_articles():
         conn = sqlite3.connect(DB_FILE)
         cursor = conn.cursor()
 
+        max_id, count = get_articles_version(cursor)
+        etag = make_etag("list", max_id, count, limit)
+        if etag_matches(etag):
+            conn.close()
+            return not_modified(etag)
+
         cursor.execute(
             "SELECT id, rubric, keywords, created_at FROM articles ORDER BY created_at DESC LIMIT ?",
             (limit,)
@@ -127,7 +165,22 @@ def list_articles():
             for row in rows
         ]
 
-        return jsonify({"status": "success", "articles": articles, "count": len(articles)}), 200
+        return with_etag(jsonify({"status": "success", "articles": articles, "count": len(articles)}), etag), 200
+
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@app.route('/articles_version', methods=['GET'])
+def articles_version():
+    """Получить версию списка статей (max id и количество) без чтения строк."""
+    try:
+        conn = sqlite3.connect(DB_FILE)
+        cursor = conn.cursor()
+        max_id, count = get_articles_version(cursor)
+        conn.close()
+
+        return jsonify({"status": "success", "max_id": max_id, "count": count}), 200
 
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
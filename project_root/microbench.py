@@ -0,0 +1,337 @@
+"""
+Микробенчмарки горячих путей без LLM.
+
+Замеряет извлечение текста из PDF разного размера, sanitize_text,
+сборку индекса IndexerAgent.run, компиляцию графа и маршруты mcp_server
+(вставка, чтение, список) под параллельной нагрузкой через test_client
+на временной БД. GigaChat и запущенные серверы не нужны.
+
+Каждый запуск дописывается строкой в историю (MICROBENCH_HISTORY, JSONL)
+и сравнивается с предыдущим запуском по медиане.
+
+Запуск:
+    python microbench.py
+    python microbench.py --only sanitize,indexer --repeat 200 --max-regression 20
+"""
+
+import atexit
+import contextlib
+import glob
+import io
+import itertools
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from compare_reports import percentile
+
+HISTORY_FILE = os.getenv("MICROBENCH_HISTORY", "microbench_history.jsonl")
+PDF_DIR = "uploads"
+ARTICLES_DIR = "test_articles"
+MCP_CONCURRENCY = 8
+
+# Временная папка запуска: БД mcp_server и спаны трассировки не смешиваются с рабочими
+_workdir = tempfile.mkdtemp(prefix="microbench_")
+atexit.register(shutil.rmtree, _workdir, ignore_errors=True)
+os.environ["TRACE_FILE"] = os.path.join(_workdir, "traces.jsonl")
+os.environ["MCP_DB_FILE"] = os.path.join(_workdir, "articles.db")
+
+
+# ==================== ЗАМЕРЫ ====================
+
+@contextlib.contextmanager
+def quiet():
+    """Глушит print замеряемого кода, чтобы вывод не мешал отчёту."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def measure(fn: Callable, repeat: int, warmup: int = 1) -> List[float]:
+    """Длительности repeat вызовов fn в секундах (после warmup прогревочных)."""
+    with quiet():
+        for _ in range(warmup):
+            fn()
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - started)
+    return samples
+
+
+def summarize(samples: List[float], **extra) -> Dict:
+    """Сводка замеров в миллисекундах."""
+    ms = [s * 1000 for s in samples]
+    return {
+        "runs": len(ms),
+        "mean_ms": round(sum(ms) / len(ms), 4),
+        "median_ms": round(percentile(ms, 0.5), 4),
+        "p95_ms": round(percentile(ms, 0.95), 4),
+        "min_ms": round(min(ms), 4),
+        "max_ms": round(max(ms), 4),
+        **extra
+    }
+
+
+def load_article_texts(folder: str = ARTICLES_DIR) -> List[str]:
+    texts = []
+    for path in sorted(glob.glob(os.path.join(folder, "*.txt"))):
+        with open(path, "r", encoding="utf-8") as f:
+            texts.append(f.read())
+    return texts
+
+
+# ==================== БЕНЧМАРКИ ====================
+
+def bench_pdf(repeat: int) -> Dict[str, Dict]:
+    """extract_text_from_pdf: самый маленький, средний и самый большой PDF из uploads/."""
+    from server import extract_text_from_pdf
+
+    pdfs = sorted(glob.glob(os.path.join(PDF_DIR, "*.pdf")), key=os.path.getsize)
+    if len(pdfs) > 3:
+        pdfs = [pdfs[0], pdfs[len(pdfs) // 2], pdfs[-1]]
+
+    results = {}
+    for path in pdfs:
+        size_kb = os.path.getsize(path) / 1024
+        # Большие PDF разбираются секундами, им хватает нескольких повторов
+        runs = max(3, repeat // 20)
+        samples = measure(lambda: extract_text_from_pdf(path), runs)
+        results[f"extract_text_from_pdf[{os.path.basename(path)}]"] = summarize(samples, size_kb=round(size_kb, 1))
+    return results
+
+
+def bench_sanitize(repeat: int) -> Dict[str, Dict]:
+    """sanitize_text на статьях test_articles/ и на тексте длиннее лимита (обрезка)."""
+    from server import sanitize_text
+
+    texts = load_article_texts()
+    joined = "\n\n".join(texts) or "Текст статьи.\x00 " * 1000
+    long_text = (joined * (60000 // len(joined) + 1)).replace("\n\n", "\n\x00\n")
+
+    return {
+        "sanitize_text[articles]": summarize(
+            measure(lambda: [sanitize_text(t) for t in texts], repeat), texts=len(texts)
+        ),
+        "sanitize_text[truncate]": summarize(
+            measure(lambda: sanitize_text(long_text), repeat), chars=len(long_text)
+        ),
+    }
+
+
+def bench_indexer(repeat: int) -> Dict[str, Dict]:
+    """IndexerAgent.run: сборка и JSON-сериализация индекса по готовым результатам веток."""
+    from agent_system.agent_indexer import IndexerAgent
+
+    text = "\n\n".join(load_article_texts()) or "Текст статьи. " * 2000
+    state = {
+        "article_text": text,
+        "rubric_result_rubricator": "1. Введение\n2. Методы\n2.1. Эксперименты\n3. Заключение",
+        "rubric_result_keyword": "\n".join(f"термин{i} | прямое | 0.9" for i in range(15)),
+        "rubric_result_summariser": text[:1500],
+        "rubric_result_normal": text,
+    }
+    indexer = IndexerAgent()
+    return {
+        "indexer_run": summarize(measure(lambda: indexer.run(state), repeat), chars=len(text)),
+    }
+
+
+def bench_graph_compile(repeat: int) -> Dict[str, Dict]:
+    """Сборка и компиляция графа агентов (без чекпоинтера и вызовов модели)."""
+    from agent_system.graph_orchestrator import create_multi_agent_graph
+
+    runs = max(3, repeat // 10)
+    return {
+        f"graph_compile[{tier}]": summarize(
+            measure(lambda: create_multi_agent_graph(auth_key="fake", tier=tier), runs)
+        )
+        for tier in ("fast", "standard")
+    }
+
+
+def bench_mcp_routes(repeat: int, concurrency: int = MCP_CONCURRENCY) -> Dict[str, Dict]:
+    """
+    Маршруты mcp_server через test_client на временной БД:
+    каждая операция замеряется отдельно, запросы идут в concurrency потоков.
+    """
+    import mcp_server
+
+    local = threading.local()
+    text = (load_article_texts() or ["Текст статьи. " * 300])[0]
+
+    def client():
+        if not hasattr(local, "client"):
+            local.client = mcp_server.app.test_client()
+        return local.client
+
+    def timed(call):
+        started = time.perf_counter()
+        response = call(client())
+        elapsed = time.perf_counter() - started
+        if response.status_code != 200:
+            raise RuntimeError(f"mcp_server ответил {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        return elapsed, response
+
+    def run(name, call, extra=None):
+        with quiet(), ThreadPoolExecutor(max_workers=concurrency) as executor:
+            started = time.perf_counter()
+            outcomes = list(executor.map(lambda _: timed(call), range(repeat)))
+            wall = time.perf_counter() - started
+        results[name] = summarize(
+            [elapsed for elapsed, _ in outcomes],
+            concurrency=concurrency,
+            throughput_rps=round(repeat / wall, 1),
+            **(extra or {})
+        )
+        return outcomes
+
+    results = {}
+    saved = run("mcp_save_article", lambda c: c.post("/save_article", json={
+        "article_text": text, "rubric": "1. Введение", "keywords": "термин | прямое | 0.9",
+        "summary": text[:500], "normalized_text": text
+    }))
+    ids = [response.get_json()["article_id"] for _, response in saved]
+
+    positions = itertools.count()
+    run("mcp_get_article", lambda c: c.get(f"/get_article/{ids[next(positions) % len(ids)]}"))
+    run("mcp_list_articles", lambda c: c.get("/list_articles?limit=100"), {"rows": len(ids)})
+    return results
+
+
+BENCHMARKS = {
+    "pdf": bench_pdf,
+    "sanitize": bench_sanitize,
+    "indexer": bench_indexer,
+    "graph": bench_graph_compile,
+    "mcp": bench_mcp_routes,
+}
+
+
+# ==================== ИСТОРИЯ ====================
+
+def git_revision() -> str:
+    """Текущий коммит (или None вне git)."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_previous(path: str = HISTORY_FILE) -> Dict:
+    """Последний запуск из истории или пустой словарь."""
+    if not os.path.exists(path):
+        return {}
+    previous = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                previous = json.loads(line)
+    return previous
+
+
+def append_history(record: Dict, path: str = HISTORY_FILE):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def print_results(results: Dict[str, Dict], previous: Dict, max_regression: float = None) -> List[str]:
+    """Печатает замеры и разницу медиан с прошлым запуском; возвращает регрессии сверх порога."""
+    before = previous.get("results", {})
+    regressions = []
+
+    print("\n" + "=" * 80)
+    print(f"⏱️  МИКРОБЕНЧМАРКИ (прошлый запуск: {previous.get('timestamp', 'нет')}, "
+          f"коммит {previous.get('revision') or '?'})")
+    print("=" * 80)
+    for name, summary in results.items():
+        line = (f"  • {name}: медиана {summary['median_ms']:.3f} мс, P95 {summary['p95_ms']:.3f} мс "
+                f"({summary['runs']} замеров)")
+        if "throughput_rps" in summary:
+            line += f", {summary['throughput_rps']} запр/с"
+        old = before.get(name, {}).get("median_ms")
+        if old:
+            change = (summary["median_ms"] - old) / old * 100
+            marker = ""
+            if max_regression is not None and change > max_regression:
+                marker = " 🔺"
+                regressions.append(f"{name}: +{change:.1f}% (порог {max_regression:g}%)")
+            line += f" [Δ {change:+.1f}%{marker}]"
+        print(line)
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Микробенчмарки горячих путей без LLM')
+    parser.add_argument('--only', type=str, default=None,
+                        help=f"Бенчмарки через запятую: {','.join(BENCHMARKS)} (по умолчанию: все)")
+    parser.add_argument('--repeat', type=int, default=100, help='Число замеров на бенчмарк')
+    parser.add_argument('--concurrency', type=int, default=MCP_CONCURRENCY,
+                        help='Параллельных запросов к mcp_server')
+    parser.add_argument('--history', type=str, default=HISTORY_FILE, help='Файл истории запусков (JSONL)')
+    parser.add_argument('--max-regression', type=float, default=None,
+                        help='Допустимый рост медианы относительно прошлого запуска, %%; '
+                             'при превышении код возврата 1')
+    parser.add_argument('--no-save', action='store_true', help='Не дописывать запуск в историю')
+    args = parser.parse_args(argv)
+
+    names = args.only.split(',') if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        print(f"❌ Неизвестные бенчмарки: {', '.join(unknown)}")
+        return 2
+
+    results, skipped = {}, {}
+    for name in names:
+        print(f"🔧 {name}...")
+        try:
+            if name == "mcp":
+                results.update(bench_mcp_routes(args.repeat, args.concurrency))
+            else:
+                results.update(BENCHMARKS[name](args.repeat))
+        except ImportError as e:
+            # Бенчмарк требует зависимостей сервера или графа, которых нет в окружении
+            print(f"⚠️ {name} пропущен: {e}")
+            skipped[name] = str(e)
+
+    if not results:
+        print("❌ Ни один бенчмарк не выполнен")
+        return 2
+
+    previous = load_previous(args.history)
+    regressions = print_results(results, previous, args.max_regression)
+
+    if not args.no_save:
+        append_history({
+            "timestamp": datetime.now().isoformat(),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "repeat": args.repeat,
+            "results": results,
+            "skipped": skipped,
+        }, args.history)
+        print(f"\n💾 Запуск добавлен в историю: {args.history}")
+
+    if regressions:
+        print("\n❌ Регрессии сверх порога:")
+        for regression in regressions:
+            print(f"  • {regression}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
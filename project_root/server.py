@@ -10,16 +10,28 @@ from dotenv import load_dotenv
 # ЗАГРУЗКА ПЕРЕМЕННЫХ ОКРУЖЕНИЯ - САМОЕ НАЧАЛО!
 load_dotenv()
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import json
+import math
 import PyPDF2
 import tempfile
 import sys
+import threading
 import traceback
 # from datetime import datetime
 # from database import init_db, save_article, get_all_articles
-from mcp_client import save_article_via_mcp
+from mcp_client import (
+    save_article_via_mcp,
+    get_article_via_mcp,
+    get_all_articles_via_mcp,
+    get_articles_version_via_mcp
+)
+from article_cache import ArticleCache
+from http_utils import init_compression, make_etag, etag_matches, with_etag, not_modified
+from agent_system.metrics import init_metrics, PDF_EXTRACTION_SECONDS
+from agent_system.tracing import init_tracing, in_trace_context, start_span, current_span
+from agent_system.profiling import SamplingProfiler, ProfilerBusy, check_token, save_profile
 from datetime import datetime
 
 
@@ -27,13 +39,37 @@ from datetime import datetime
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'agent_system'))
 
 try:
-    from agent_system.graph_orchestrator import create_multi_agent_graph
+    from agent_system.graph_orchestrator import (
+        create_multi_agent_graph,
+        get_checkpointer,
+        job_finished,
+        saved_article_id,
+        remember_article_id,
+        saved_graph_params,
+        remember_graph_params,
+        build_initial_state,
+        new_job_id,
+        run_graph,
+        resume_graph,
+        revision_stats,
+        token_summary,
+        OUTPUT_BRANCHES
+    )
+    from agent_system.revision import revision_summary
+    from agent_system.candidates import candidate_summary
+    from agent_system.jobs import (open_channel, close_channel, publish, DONE as JOB_DONE,
+                                   start_job, finish_job, fail_job, get_job)
+    from agent_system.resilience import (CircuitOpenError, DeadlineExceeded, BREAKER_RESET_TIMEOUT,
+                                         resilience_stats)
 except ImportError as e:
     print(f"⚠️ Ошибка импорта: {e}")
     print("Убедитесь, что папка agent_system/ существует и содержит graph_orchestrator.py")
 
 app = Flask(__name__)
 CORS(app)
+init_compression(app)
+init_metrics(app, "api")
+init_tracing(app, "article-api")
 
 # Инициализация БД при запуске
 # init_db()
@@ -45,10 +81,18 @@ ALLOWED_EXTENSIONS = {'pdf', 'txt'}
 
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# Кэш чтения статей (ограничен по размеру в байтах)
+ARTICLE_CACHE_MAX_BYTES = int(os.getenv('ARTICLE_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+article_cache = ArticleCache(max_bytes=ARTICLE_CACHE_MAX_BYTES)
+
 # GigaChat Authorization Key - ПОЛУЧАЕМ ИЗ .env
 GIGACHAT_AUTH_KEY = os.getenv('GIGACHAT_AUTH_KEY', '')
 
-if not GIGACHAT_AUTH_KEY:
+if os.getenv('FAKE_GIGACHAT_URL'):
+    # Локальная заглушка (fake_gigachat.py) не требует ключа
+    GIGACHAT_AUTH_KEY = GIGACHAT_AUTH_KEY or 'fake'
+    print(f"🧪 GigaChat: используется заглушка {os.getenv('FAKE_GIGACHAT_URL')}")
+elif not GIGACHAT_AUTH_KEY:
     print("⚠️ ВНИМАНИЕ: GIGACHAT_AUTH_KEY не найден в .env!")
 else:
     print("✅ GigaChat Auth Key: успешно загружен из .env")
@@ -74,7 +118,7 @@ def extract_text_from_pdf(pdf_path: str) -> str:
     """
     try:
         print(f"📖 Извлечение текста из PDF: {pdf_path}")
-        with open(pdf_path, 'rb') as f:
+        with PDF_EXTRACTION_SECONDS.time(), open(pdf_path, 'rb') as f:
             pdf_reader = PyPDF2.PdfReader(f)
             text = ""
             total_pages = len(pdf_reader.pages)
@@ -137,6 +181,401 @@ def sanitize_text(text: str, max_length: int = 50000) -> str:
 
     return text.strip()
 
+def parse_sla(value: str):
+    """
+    SLA ответа в секундах из поля формы; пустое значение — без SLA.
+
+    Raises:
+        ValueError: Если значение не положительное конечное число
+    """
+    if not value:
+        return None
+    sla = float(value)
+    if not math.isfinite(sla) or sla <= 0:
+        raise ValueError(f"SLA должен быть положительным конечным числом: {value}")
+    return sla
+
+def parse_revision_budget(value: str):
+    """
+    Разбирает бюджет ревизий из параметра запроса.
+
+    Допускается одно число ("2") или JSON-словарь по веткам
+    ('{"normal": 0, "summariser": 2}'). Пустое значение — бюджет по умолчанию.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.startswith('{'):
+        return {branch: int(n) for branch, n in json.loads(value).items()}
+    return int(value)
+
+def graph_params_from_request() -> dict:
+    """
+    Параметры графа из полей запроса.
+
+    Поля формы:
+        tier: "fast" (один вызов без критиков), "standard" (по умолчанию)
+            или "thorough" (больше ревизий)
+        critic_mode: "separate" (по умолчанию) или "joint" — один вызов
+            критика на все ветки
+        precritic_policy: "off", "reject" или "skip" — детерминированные
+            проверки перед LLM-критиками; по умолчанию PRECRITIC_POLICY ("off")
+        candidates: число параллельных кандидатов на первом проходе ветки
+            (best-of-N), не больше MAX_CANDIDATES; по умолчанию CANDIDATES
+        outputs: нужные результаты через запятую (rubrics, keywords,
+            normalization, summary); по умолчанию все. При tier=fast
+            только фильтрует ответ, normalization недоступна
+
+    Raises:
+        ValueError: Если параметры некорректны
+    """
+    return {
+        "critic_mode": request.form.get('critic_mode') or None,
+        "tier": request.form.get('tier') or "standard",
+        "precritic_policy": request.form.get('precritic_policy') or None,
+        "candidates": int(request.form['candidates']) if request.form.get('candidates') else None,
+        "outputs": request.form.get('outputs') or None,
+    }
+
+def create_graph_for_request(params: dict):
+    """
+    Создаёт граф с параметрами graph_params_from_request.
+
+    Raises:
+        ValueError: Если параметры некорректны
+    """
+    return create_multi_agent_graph(
+        auth_key=GIGACHAT_AUTH_KEY,
+        checkpointer=get_checkpointer(),
+        **params
+    )
+
+# ========== КЭШ СТАТЕЙ ==========
+
+def get_article_cached(article_id: int):
+    """Read-through чтение статьи по ID через кэш."""
+    return article_cache.get_or_load(
+        ("article", article_id),
+        lambda: get_article_via_mcp(article_id)
+    )
+
+def get_all_articles_cached(limit: int = 100, version: tuple = None):
+    """
+    Read-through чтение списка статей через кэш.
+
+    Ключ включает версию списка (max id, count) — ту же, что в ETag, поэтому
+    запись другим процессом не отдаётся из кэша под новым ETag. Без версии
+    (MCP не ответил) кэш не используется. None — MCP недоступен.
+    """
+    if version is None:
+        return get_all_articles_via_mcp(limit=limit)
+    return article_cache.get_or_load(
+        ("list", *version, limit),
+        lambda: get_all_articles_via_mcp(limit=limit)
+    )
+
+def save_article_cached(**fields):
+    """Сохраняет статью через MCP и сбрасывает закэшированные списки."""
+    article_id = save_article_via_mcp(**fields)
+    article_cache.invalidate(lambda key: key[0] == "list" or key == ("article", article_id))
+    return article_id
+
+# ========== РЕЗУЛЬТАТЫ ГРАФА ==========
+
+def save_final_state(final_state: dict):
+    """
+    Сохраняет результаты работы графа в БД через MCP.
+
+    Returns:
+        ID статьи в БД или None при ошибке
+    """
+    try:
+        data = json.loads(final_state.get("indexed_data") or "{}")
+
+        article_id = save_article_cached(
+            article_text=data.get("article_text", ""),
+            rubric=data.get("rubric", ""),
+            keywords=data.get("keywords", ""),
+            summary=data.get("summary", ""),
+            normalized_text=data.get("normalized", "")
+        )
+
+        if article_id:
+            print(f"✅ Сохранено через MCP: ID {article_id}")
+        else:
+            print("⚠️ Ошибка сохранения через MCP")
+        return article_id
+
+    except Exception as e:
+        print(f"⚠️ Ошибка MCP: {e}")
+        return None
+
+def save_job_result(final_state: dict, job_id: str):
+    """
+    Сохраняет результат задачи в БД один раз.
+
+    Повторный запуск или возобновление уже завершённой задачи возвращает
+    ID статьи, сохранённой в первый раз, без новой записи.
+    """
+    article_id = saved_article_id(job_id) if job_id else None
+    if article_id is not None:
+        print(f"♻️  Результат задачи {job_id} уже сохранён: ID {article_id}")
+        return article_id
+
+    article_id = save_final_state(final_state)
+    if article_id and job_id:
+        remember_article_id(job_id, article_id)
+    return article_id
+
+# Поля результатов ответа и ключи состояния графа, из которых они берутся
+RESULT_FIELDS = {
+    "rubrics": "rubric_result_rubricator",
+    "keywords": "rubric_result_keyword",
+    "normalization": "rubric_result_normal",
+    "summary": "rubric_result_summariser",
+}
+
+def collect_results(values: dict, outputs=None) -> tuple:
+    """
+    Результаты запрошенных веток для ответа и список ещё не готовых полей.
+
+    Args:
+        values: Состояние графа или частичные результаты из реестра задачи
+        outputs: Запрошенные ветки; по умолчанию все
+    """
+    outputs = outputs or list(OUTPUT_BRANCHES.values())
+    results = {
+        field: (values.get(key) or "").strip()
+        for field, key in RESULT_FIELDS.items()
+        if OUTPUT_BRANCHES[field] in outputs
+    }
+    missing = [field for field, text in results.items() if not text]
+    return results, missing
+
+def build_result(final_state: dict, job_id: str, article_id, tier: str = "standard") -> dict:
+    """Формирует JSON-ответ по итоговому состоянию графа."""
+    results, missing = collect_results(final_state, final_state.get("outputs"))
+    return {
+        "status": "success",
+        "job_id": job_id,
+        "tier": tier,
+        "processing_time": "~1-3 минуты",
+        "timestamp": datetime.now().isoformat(),
+        "db_id": article_id,
+        "results": results,
+        "missing": missing,
+        "metadata": {
+            "text_length": len(final_state.get("article_text", "")),
+            "revision_count": final_state.get("revision_count", 0),
+            "revisions": revision_stats(final_state),
+            "revision_cost": revision_summary(final_state),
+            "candidates": candidate_summary(final_state),
+            "tokens": token_summary(final_state),
+            "status": final_state.get("status", []),
+        }
+    }
+
+def build_partial_result(job_id: str) -> dict:
+    """
+    Частичный ответ по истечении SLA: готовые ветки из реестра задачи.
+
+    unreviewed — поля с черновиком, который критик ещё не одобрил
+    (не успел проверить, отклонил или проверка пропущена по SLA).
+    """
+    job = get_job(job_id) or {"partial": {}, "approved": {}}
+    results, missing = collect_results(job["partial"], job.get("outputs"))
+    unreviewed = [field for field, text in results.items() if text and not job["approved"].get(RESULT_FIELDS[field])]
+    return {
+        "status": "partial",
+        "job_id": job_id,
+        "tier": job.get("tier"),
+        "timestamp": datetime.now().isoformat(),
+        "results": results,
+        "missing": missing,
+        "unreviewed": unreviewed,
+        "message": f"SLA истёк, обработка продолжается. Итог: GET /jobs/{job_id}"
+    }
+
+def run_article_pipeline(graph, initial_state: dict, job_id: str, tier: str, file_info: dict) -> dict:
+    """
+    Этапы 5-7: запуск графа, сохранение в БД и формирование ответа.
+
+    Не использует контекст запроса Flask, поэтому может работать в фоновом потоке.
+    Итог задачи записывается в реестр (GET /jobs/<job_id>); саму задачу
+    регистрирует start_job до запуска, в том числе до старта фонового потока.
+
+    Raises:
+        Exception: Если граф завершился с ошибкой
+    """
+    try:
+        result = _run_article_pipeline(graph, initial_state, job_id, tier, file_info)
+    except Exception as e:
+        fail_job(job_id, str(e))
+        raise
+    finish_job(job_id, result)
+    return result
+
+def _run_article_pipeline(graph, initial_state: dict, job_id: str, tier: str, file_info: dict) -> dict:
+    # ========== ЭТАП 5: ЗАПУСК ГРАФА ==========
+    print("\n[5/7] Запуск обработки агентной системой...")
+    print("-" * 80)
+
+    final_state = run_graph(graph, initial_state, job_id=job_id)
+    print("-" * 80)
+    print("✅ Обработка агентной системой завершена!")
+
+    # ========== ЭТАП 6: СОХРАНЕНИЕ В БД ЧЕРЕЗ MCP ==========
+    print("\n[6/7] Сохранение в БД через MCP...")
+
+    with start_span("mcp.save"):
+        article_id = save_job_result(final_state, job_id)
+
+    # ========== ЭТАП 7: ФОРМИРОВАНИЕ РЕЗУЛЬТАТОВ ==========
+    print("\n[7/7] Формирование результатов...")
+
+    with start_span("build_result") as span:
+        result = build_result(final_state, job_id, article_id, tier)
+        result.update({
+            "filename": file_info["filename"],
+            "file_type": file_info["file_type"],
+        })
+        result["metadata"]["file_size_kb"] = file_info["file_size_kb"]
+        result["metadata"]["trace_id"] = span.trace_id
+
+    print("✅ Результаты сформированы")
+    return result
+
+def pipeline_error_response(error: Exception, job_id: str):
+    """
+    Ответ на ошибку графа: 503 при разомкнутом circuit breaker,
+    504 при исчерпанном дедлайне, иначе 500 с подсказкой о возобновлении.
+    """
+    body = {
+        "status": "error",
+        "job_id": job_id,
+        "message": f"Ошибка обработки графа: {str(error)}. "
+                   f"Продолжить: POST /jobs/{job_id}/resume"
+    }
+    if isinstance(error, CircuitOpenError):
+        response = jsonify(body)
+        response.status_code = 503
+        response.headers['Retry-After'] = str(int(BREAKER_RESET_TIMEOUT))
+        return response
+    if isinstance(error, DeadlineExceeded):
+        return jsonify(body), 504
+    return jsonify(body), 500
+
+def run_profiled(handler):
+    """
+    Выполняет обработчик запроса под сэмплирующим профайлером.
+
+    Профиль (collapsed stacks) сохраняется в PROFILE_DIR, а сводка —
+    горячие функции и пик памяти — добавляется в metadata.profile ответа.
+    В профиль попадают только потоки этого запроса (по trace_id), а пик
+    памяти — по всему процессу (memory_scope: "process").
+    Профилирование доступно только с токеном PROFILE_TOKEN и только
+    для синхронных запросов: в фоновом режиме запрос завершается раньше графа.
+    """
+    if not check_token(request.headers.get('X-Profile-Token', '')):
+        return jsonify({
+            "status": "error",
+            "message": "Профилирование недоступно: неверный X-Profile-Token или PROFILE_TOKEN не задан"
+        }), 403
+    if request.form.get('stream') or request.form.get('sla'):
+        return jsonify({
+            "status": "error",
+            "message": "Профилирование несовместимо с stream и sla"
+        }), 400
+
+    try:
+        profiler = SamplingProfiler(trace_id=current_span().trace_id).start()
+    except ProfilerBusy as e:
+        return jsonify({"status": "error", "message": str(e)}), 409
+
+    try:
+        response = handler()
+    finally:
+        report = profiler.stop()
+
+    profile = save_profile(report, f"profile_{current_span().trace_id}")
+    print(f"🔬 Профиль запроса: {profile['file']} ({profile['samples']} сэмплов, "
+          f"пик памяти процесса {profile['peak_memory_mb']} МБ)")
+
+    response, status = response if isinstance(response, tuple) else (response, response.status_code)
+    body = response.get_json(silent=True)
+    if not isinstance(body, dict):
+        return response, status
+    body.setdefault("metadata", {})["profile"] = profile
+    return jsonify(body), status
+
+def run_with_sla(graph, initial_state: dict, job_id: str, tier: str, file_info: dict, sla: float):
+    """
+    Запускает граф в фоне и ждёт не дольше SLA.
+
+    Если граф не успел, отдаёт готовые ветки (202), а обработка
+    продолжается: итог сохраняется в БД и доступен по GET /jobs/<job_id>.
+    """
+    finished = threading.Event()
+    outcome = {}
+
+    def worker():
+        try:
+            outcome["result"] = run_article_pipeline(graph, initial_state, job_id, tier, file_info)
+        except Exception as e:
+            print(f"❌ Ошибка при обработке: {str(e)}")
+            traceback.print_exc()
+            outcome["error"] = e
+        finally:
+            finished.set()
+
+    threading.Thread(target=in_trace_context(worker), daemon=True).start()
+
+    if not finished.wait(sla):
+        print(f"⏱️  SLA {sla:.0f} сек истёк, отдаём частичный результат (job_id: {job_id})")
+        return jsonify(build_partial_result(job_id)), 202
+    if "error" in outcome:
+        return pipeline_error_response(outcome["error"], job_id)
+    return jsonify(outcome["result"]), 200
+
+def stream_article_pipeline(graph, initial_state: dict, job_id: str, tier: str, file_info: dict):
+    """
+    Потоковый ответ: граф работает в фоне, а события канала задачи
+    (токены агентов, итог или ошибка) отдаются клиенту построчно в NDJSON.
+    """
+    channel = open_channel(job_id)
+
+    def worker():
+        try:
+            result = run_article_pipeline(graph, initial_state, job_id, tier, file_info)
+            publish(job_id, {"type": "result", **result})
+        except Exception as e:
+            print(f"❌ Ошибка при обработке: {str(e)}")
+            traceback.print_exc()
+            publish(job_id, {
+                "type": "error",
+                "job_id": job_id,
+                "message": f"Ошибка обработки графа: {str(e)}. "
+                           f"Продолжить: POST /jobs/{job_id}/resume"
+            })
+        finally:
+            close_channel(job_id)
+
+    threading.Thread(target=in_trace_context(worker), daemon=True).start()
+
+    def events():
+        yield json.dumps({"type": "started", "job_id": job_id}, ensure_ascii=False) + "\n"
+        while True:
+            event = channel.get()
+            if event is JOB_DONE:
+                break
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+
+    return Response(
+        events(),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 # ========== ОСНОВНЫЕ ЭНДПОИНТЫ ==========
 
 @app.route('/health', methods=['GET'])
@@ -162,10 +601,27 @@ def process_article():
 
     Принимает:
         - PDF или TXT файл в поле 'pdf'
+        - необязательные поля: job_id, tier, critic_mode, precritic_policy,
+          revision_budget, revision_mode, candidates
+        - outputs — нужные результаты через запятую (rubrics, keywords,
+          normalization, summary); остальные ветки не запускаются
+        - sla — бюджет ответа в секундах, после него отдаётся частичный результат
+        - token_budget — бюджет токенов на статью, после него ревизии не запускаются
+        - stream=1 — потоковый ответ NDJSON с токенами агентов; событие
+          agent_restarted (с номером попытки) означает, что полученные
+          токены агента устарели и он начинает заново
+        - profile=1 — профилировать запрос (нужен заголовок X-Profile-Token);
+          профиль и пик памяти попадают в metadata.profile
 
     Возвращает:
-        - JSON с результатами работы всех агентов
+        - JSON с результатами запрошенных агентов
+          (или поток событий NDJSON, последнее — "result")
     """
+    if request.form.get('profile', '').lower() not in ('1', 'true', 'yes'):
+        return _process_article()
+    return run_profiled(_process_article)
+
+def _process_article():
     try:
         print("\n" + "=" * 80)
         print("🚀 НОВАЯ СЕССИЯ ОБРАБОТКИ СТАТЬИ")
@@ -207,7 +663,8 @@ def process_article():
 
         # Сохраняем файл
         filepath = os.path.join(UPLOAD_FOLDER, file.filename)
-        file.save(filepath)
+        with start_span("upload.save", file_size=file_size):
+            file.save(filepath)
         print(f"✅ Файл сохранён: {file.filename} ({file_size / 1024:.2f} KB)")
 
         # ========== ЭТАП 2: ИЗВЛЕЧЕНИЕ ТЕКСТА ==========
@@ -215,10 +672,11 @@ def process_article():
         file_type = "PDF" if file.filename.lower().endswith('.pdf') else "TXT"
 
         try:
-            if file_type == "PDF":
-                article_text = extract_text_from_pdf(filepath)
-            else:
-                article_text = extract_text_from_txt(filepath)
+            with start_span("extract_text", file_type=file_type):
+                if file_type == "PDF":
+                    article_text = extract_text_from_pdf(filepath)
+                else:
+                    article_text = extract_text_from_txt(filepath)
         except Exception as e:
             return jsonify({
                 "status": "error",
@@ -232,7 +690,8 @@ def process_article():
             }), 400
 
         # Очищаем текст
-        article_text = sanitize_text(article_text)
+        with start_span("sanitize_text"):
+            article_text = sanitize_text(article_text)
         print(f"✅ Текст готов к обработке ({len(article_text)} символов)")
 
         # ========== ЭТАП 3: ИНИЦИАЛИЗАЦИЯ ГРАФА ==========
@@ -244,9 +703,21 @@ def process_article():
                 "message": "GigaChat Auth Key не установлен. Установите переменную окружения GIGACHAT_AUTH_KEY"
             }), 500
 
+        # Повторная отправка с тем же job_id продолжает прерванный запуск
+        job_id = request.form.get('job_id') or new_job_id()
+        current_span().set_attribute("job_id", job_id)
+
         try:
-            graph = create_multi_agent_graph(auth_key=GIGACHAT_AUTH_KEY)
+            # Продолжение собирает граф с параметрами исходного запуска, а не нового запроса
+            params = (request.form.get('job_id') and saved_graph_params(job_id)) or graph_params_from_request()
+            with start_span("graph.compile"):
+                graph = create_graph_for_request(params)
             print("✅ Граф агентов инициализирован")
+        except ValueError as e:
+            return jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 400
         except Exception as e:
             print(f"❌ Ошибка инициализации: {str(e)}")
             return jsonify({
@@ -257,92 +728,63 @@ def process_article():
         # ========== ЭТАП 4: ПОДГОТОВКА НАЧАЛЬНОГО СОСТОЯНИЯ ==========
         print("\n[4/7] Подготовка начального состояния...")
 
-        initial_state = {
-            "article_text": article_text,
-            "rubric_result_rubricator": "",
-            "rubric_result_keyword": "",
-            "rubric_result_normal": "",
-            "rubric_result_summariser": "",
-            "critique": "",
-            "critique_key": "",
-            "critique_sum": "",
-            "critique_nor": "",
-            "revision_count": 0,
-            "revision_count_key": 0,
-            "revision_count_sum": 0,
-            "revision_count_nor": 0,
-            "indexed_data": "",
-            "status": ["started", "text_extracted"]
-        }
-
-        print("✅ Начальное состояние готово")
-
-        # ========== ЭТАП 5: ЗАПУСК ГРАФА ==========
-        print("\n[5/7] Запуск обработки агентной системой...")
-        print("-" * 80)
+        # Завершённую задачу новым файлом не перезапускаем: загрузка была бы молча проигнорирована
+        if request.form.get('job_id') and job_finished(graph, job_id):
+            return jsonify({
+                "status": "error",
+                "job_id": job_id,
+                "message": f"Задача {job_id} уже завершена. Результат: POST /jobs/{job_id}/resume; "
+                           "для нового файла не передавайте job_id"
+            }), 409
 
         try:
-            final_state = graph.invoke(initial_state)
-            print("-" * 80)
-            print("✅ Обработка агентной системой завершена!")
-        except Exception as e:
-            print(f"❌ Ошибка при обработке: {str(e)}")
-            traceback.print_exc()
+            revision_budget = parse_revision_budget(request.form.get('revision_budget', ''))
+            sla = parse_sla(request.form.get('sla', ''))
+            with start_span("build_initial_state"):
+                initial_state = build_initial_state(
+                    article_text,
+                    status=["started", "text_extracted"],
+                    job_id=job_id,
+                    revision_budget=revision_budget,
+                    revision_mode=request.form.get('revision_mode') or None,
+                    sla=sla,
+                    outputs=request.form.get('outputs') or None,
+                    tier=params["tier"],
+                    token_budget=int(request.form['token_budget']) if request.form.get('token_budget') else None
+                )
+        except ValueError as e:
             return jsonify({
                 "status": "error",
-                "message": f"Ошибка обработки графа: {str(e)}"
-            }), 500
-
-        # После: final_state = graph.invoke(initial_state)
+                "message": f"Некорректные параметры обработки: {str(e)}"
+            }), 400
 
-        # ========== ЭТАП 6: СОХРАНЕНИЕ В БД ЧЕРЕЗ MCP ==========
-        print("\n[6/7] Сохранение в БД через MCP...")
+        remember_graph_params(job_id, params)
+        print(f"✅ Начальное состояние готово (job_id: {job_id})")
 
-        try:
-            data = json.loads(final_state.get("indexed_data", "{}"))
+        file_info = {
+            "filename": file.filename,
+            "file_type": file_type,
+            "file_size_kb": file_size / 1024
+        }
+        tier = params["tier"]
+        # Регистрация до фонового потока: GET /jobs/<job_id> сразу видит задачу
+        start_job(job_id, tier=tier, outputs=initial_state.get("outputs"))
 
-            article_id = save_article_via_mcp(
-                article_text=data.get("article_text", ""),  # ← ПЕРВЫЙ аргумент
-                rubric=data.get("rubric", ""),
-                keywords=data.get("keywords", ""),
-                summary=data.get("summary", ""),
-                normalized_text=data.get("normalized", "")
-            )
+        # Потоковый режим: токены агентов отдаются клиенту по мере генерации (NDJSON)
+        if request.form.get('stream', '').lower() in ('1', 'true', 'yes'):
+            return stream_article_pipeline(graph, initial_state, job_id, tier, file_info)
 
-            if article_id:
-                print(f"✅ Сохранено через MCP: ID {article_id}")
-            else:
-                print("⚠️ Ошибка сохранения через MCP")
+        # SLA: по истечении клиент получает готовые ветки, остальное — через GET /jobs/<job_id>
+        if sla is not None:
+            return run_with_sla(graph, initial_state, job_id, tier, file_info, sla)
 
+        try:
+            result = run_article_pipeline(graph, initial_state, job_id, tier, file_info)
         except Exception as e:
-            print(f"⚠️ Ошибка MCP: {e}")
-            article_id = None
-
-        # ========== ЭТАП 7: ФОРМИРОВАНИЕ РЕЗУЛЬТАТОВ ==========
-        print("\n[7/7] Формирование результатов...")
-
-        result = {
-            "status": "success",
-            "filename": file.filename,
-            "file_type": file_type,
-            "processing_time": "~1-3 минуты",
-            "timestamp": datetime.now().isoformat(),
-            "db_id": article_id,
-            "results": {
-                "rubrics": final_state.get("rubric_result_rubricator", "").strip(),
-                "keywords": final_state.get("rubric_result_keyword", "").strip(),
-                "normalization": final_state.get("rubric_result_normal", "").strip(),
-                "summary": final_state.get("rubric_result_summariser", "").strip(),
-            },
-            "metadata": {
-                "text_length": len(article_text),
-                "revision_count": final_state.get("revision_count", 0),
-                "status": final_state.get("status", []),
-                "file_size_kb": file_size / 1024
-            }
-        }
+            print(f"❌ Ошибка при обработке: {str(e)}")
+            traceback.print_exc()
+            return pipeline_error_response(e, job_id)
 
-        print("✅ Результаты сформированы")
         print("\n" + "=" * 80)
         print("✅ СЕССИЯ ЗАВЕРШЕНА УСПЕШНО")
         print("=" * 80 + "\n")
@@ -357,20 +799,79 @@ def process_article():
             "message": f"Внутренняя ошибка сервера: {str(e)}"
         }), 500
 
-@app.route('/articles', methods=['GET'])
-def list_articles():
-    """Список всех статей из БД."""
-    try:
-        articles = get_all_articles()
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """
+    Состояние задачи: итоговый результат, если граф завершился,
+    иначе готовые на данный момент ветки и список недостающих.
+    """
+    job = get_job(job_id)
+    if job is None:
         return jsonify({
-            "status": "success",
-            "count": len(articles),
-            "articles": articles
-        }), 200
+            "status": "error",
+            "message": f"Задача {job_id} не найдена"
+        }), 404
+
+    if job["state"] == "done":
+        return jsonify(job["result"]), 200
+    if job["state"] == "failed":
+        return jsonify({
+            "status": "error",
+            "job_id": job_id,
+            "message": f"Ошибка обработки графа: {job['error']}. "
+                       f"Продолжить: POST /jobs/{job_id}/resume"
+        }), 500
+
+    partial = build_partial_result(job_id)
+    partial["message"] = "Обработка продолжается"
+    return jsonify(partial), 202
+
+@app.route('/jobs/<job_id>/resume', methods=['POST'])
+def resume_job(job_id):
+    """
+    Продолжает упавшую обработку статьи с последнего завершённого узла.
+
+    Уже выполненные вызовы агентов берутся из чекпоинта и не повторяются.
+    """
+    try:
+        if not GIGACHAT_AUTH_KEY:
+            return jsonify({
+                "status": "error",
+                "message": "GigaChat Auth Key не установлен. Установите переменную окружения GIGACHAT_AUTH_KEY"
+            }), 500
+
+        # Граф собирается с параметрами исходного запуска; поля формы — только для
+        # задач, параметры которых не сохранены
+        try:
+            params = saved_graph_params(job_id) or graph_params_from_request()
+            graph = create_graph_for_request(params)
+        except ValueError as e:
+            return jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 400
+
+        try:
+            final_state = resume_graph(graph, job_id)
+        except KeyError as e:
+            return jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 404
+        except (CircuitOpenError, DeadlineExceeded) as e:
+            print(f"❌ Ошибка возобновления задачи {job_id}: {str(e)}")
+            return pipeline_error_response(e, job_id)
+
+        article_id = save_job_result(final_state, job_id)
+        return jsonify(build_result(final_state, job_id, article_id, params["tier"])), 200
+
     except Exception as e:
+        print(f"❌ Ошибка возобновления задачи {job_id}: {str(e)}")
+        traceback.print_exc()
         return jsonify({
             "status": "error",
-            "message": str(e)
+            "job_id": job_id,
+            "message": f"Ошибка возобновления: {str(e)}"
         }), 500
 
 @app.route('/status', methods=['GET'])
@@ -381,22 +882,44 @@ def status():
         "uploads_folder": UPLOAD_FOLDER,
         "upload_count": len(os.listdir(UPLOAD_FOLDER)),
         "gigachat_available": bool(GIGACHAT_AUTH_KEY),
+        "article_cache": article_cache.stats(),
+        "llm_resilience": resilience_stats(),
         "timestamp": datetime.now().isoformat()
     }), 200
+
 @app.route('/articles', methods=['GET'])
 def get_articles():
     """
     Получить список всех обработанных статей из БД.
+
+    Поддерживает условный GET: ETag строится из версии списка (max id, count),
+    поэтому при неизменном списке клиент получает 304 без чтения строк.
+
     Returns:
         JSON со списком статей
     """
     try:
-        from mcp_client import get_all_articles_via_mcp
-        articles = get_all_articles_via_mcp()
-        return jsonify({
+        limit = request.args.get('limit', 100, type=int)
+
+        version = get_articles_version_via_mcp()
+        etag = make_etag("list", *version, limit) if version else None
+        if etag and etag_matches(etag):
+            return not_modified(etag)
+
+        articles = get_all_articles_cached(limit=limit, version=version)
+        if articles is None:
+            return jsonify({
+                "status": "error",
+                "message": "MCP сервер недоступен"
+            }), 503
+        response = jsonify({
             "status": "success",
+            "count": len(articles),
             "articles": articles
-        }), 200
+        })
+        if etag:
+            with_etag(response, etag)
+        return response, 200
     except Exception as e:
         print(f"Ошибка получения статей: {str(e)}")
         return jsonify({
@@ -404,6 +927,37 @@ def get_articles():
             "message": str(e)
         }), 500
 
+@app.route('/articles/<int:article_id>', methods=['GET'])
+def get_article(article_id):
+    """
+    Получить статью по ID (через кэш чтения).
+
+    Returns:
+        JSON со статьёй, 304 при совпадении ETag или 404
+    """
+    try:
+        article = get_article_cached(article_id)
+        if article is None:
+            return jsonify({
+                "status": "error",
+                "message": "Статья не найдена"
+            }), 404
+
+        etag = make_etag("article", article_id, article.get("created_at"))
+        if etag_matches(etag):
+            return not_modified(etag)
+
+        return with_etag(jsonify({
+            "status": "success",
+            "article": article
+        }), etag), 200
+    except Exception as e:
+        print(f"Ошибка получения статьи: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+
 # ========== ERROR HANDLERS ==========
 
 @app.errorhandler(413)
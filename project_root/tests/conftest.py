@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Модули проекта (server, agent_system, ...) лежат в корне project_root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
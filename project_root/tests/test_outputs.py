@@ -0,0 +1,57 @@
+"""Запрошенные результаты (outputs) и уровень fast."""
+
+import json
+
+import pytest
+
+from agent_system.agent_indexer import IndexerAgent
+
+FAST_RESULTS = {
+    "rubric_result_rubricator": "Рубрика",
+    "rubric_result_keyword": "ключ, слово",
+    "rubric_result_summariser": "Резюме",
+}
+
+
+def test_indexer_fast_outputs_have_no_missing():
+    state = {"article_text": "Текст", "outputs": ["rubricator", "keyword", "summariser"], **FAST_RESULTS}
+
+    data = json.loads(IndexerAgent().run(state)["indexed_data"])
+
+    assert data["missing"] == []
+
+
+def test_fast_tier_initial_state_requests_fast_branches():
+    pytest.importorskip("langgraph")
+    from agent_system.graph_orchestrator import build_initial_state, FAST_BRANCHES
+
+    assert build_initial_state("Текст", tier="fast")["outputs"] == FAST_BRANCHES
+    assert "outputs" not in build_initial_state("Текст", tier="standard")
+    assert build_initial_state("Текст", tier="fast", outputs="summary")["outputs"] == ["summariser"]
+
+
+def test_fast_tier_response_reports_no_missing_outputs():
+    pytest.importorskip("langgraph")
+    pytest.importorskip("flask")
+    server = pytest.importorskip("server")
+
+    final_state = server.build_initial_state("Текст", tier="fast")
+    final_state.update(FAST_RESULTS)
+    result = server.build_result(final_state, "job", None, tier="fast")
+
+    assert result["missing"] == []
+    assert set(result["results"]) == {"rubrics", "keywords", "summary"}
+
+
+def test_revision_stats_only_requested_branches():
+    pytest.importorskip("langgraph")
+    from agent_system.graph_orchestrator import build_initial_state, revision_stats
+
+    state = build_initial_state("Текст", outputs="summary,keywords")
+    state.update(revision_count_key=1, revision_count_sum=2)
+
+    stats = revision_stats(state)
+
+    assert set(stats) == {"keyword", "summariser"}
+    assert stats["summariser"]["revisions"] == 1
+    assert set(revision_stats(build_initial_state("Текст", tier="fast"))) == {"rubricator", "keyword", "summariser"}
@@ -0,0 +1,50 @@
+"""Circuit breaker: какие ошибки считаются сбоем провайдера."""
+
+import pytest
+
+from agent_system import resilience
+
+
+class ProviderError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    breaker = resilience.CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    monkeypatch.setattr(resilience, "breaker", breaker)
+    return breaker
+
+
+def fail_with(error):
+    def call():
+        raise error
+    return call
+
+
+def test_local_error_does_not_open_breaker(breaker):
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            resilience.call_with_resilience(fail_with(ValueError("No model specified")), agent="test")
+
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+
+
+def test_rate_limit_does_not_open_breaker(breaker):
+    for _ in range(3):
+        with pytest.raises(ProviderError):
+            resilience.call_with_resilience(fail_with(ProviderError(429)), agent="test")
+
+    assert breaker.state == "closed"
+
+
+@pytest.mark.parametrize("error", [ProviderError(503), ConnectionError("reset")])
+def test_provider_failure_opens_breaker(breaker, error):
+    for _ in range(2):
+        with pytest.raises(type(error)):
+            resilience.call_with_resilience(fail_with(error), agent="test")
+
+    assert breaker.state == "open"